@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-call OpenAI client vs the pooled client_manager
+Runs against the local OpenAI-compatible stub server, so no API key or network is needed
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+import openai
+import llm_client
+from llm_client import LLMClientManager, get_llm_responses_async
+from stub_server import start_stub_server
+
+MESSAGES = [{"role": "user", "content": "Explain the concept of 'distributed consensus' in a simple way."}]
+
+def run_per_call_client(base_url, iterations):
+    """Old behaviour: build a fresh client (and connection) for every request"""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        client = openai.OpenAI(api_key="stub-key", base_url=base_url)
+        client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES, max_tokens=150)
+        client.close()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run_pooled_client(manager, iterations):
+    """New behaviour: reuse the manager's long-lived client and keep-alive pool"""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        client = manager.get_client()
+        client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES, max_tokens=150)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run_async_batch(iterations, concurrency):
+    """Fan the same prompts out through get_llm_responses_async; returns (wall-clock ms, results)"""
+    start = time.perf_counter()
+    results = asyncio.run(get_llm_responses_async([MESSAGES[0]["content"]] * iterations, concurrency=concurrency))
+    return (time.perf_counter() - start) * 1000, results
+
+def summarize(name, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<18} mean {statistics.mean(latencies):7.2f}ms | "
+          f"p50 {statistics.median(latencies):7.2f}ms | p99 {p99:7.2f}ms")
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server, base_url = start_stub_server()
+    print(f"\033[0;34m--- Client Pool Benchmark ({iterations} requests against {base_url}) ---\033[0m")
+
+    try:
+        summarize("Per-call client", run_per_call_client(base_url, iterations))
+
+        manager = LLMClientManager(api_key="stub-key", base_url=base_url)
+        manager.warm_up()
+        summarize("Pooled client", run_pooled_client(manager, iterations))
+
+        stats = manager.pool_stats()
+        print(f"\nPool stats: {stats['requests']} requests, {stats['new_connections']} new connections, "
+              f"{stats['reused_connections']} reused")
+        manager.close()
+    finally:
+        server.shutdown()
+
+    # Batch section: the stub sleeps per request to stand in for network/model time
+    server, base_url = start_stub_server(latency=0.05)
+    os.environ["OPENAI_API_KEY"] = "stub-key"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    print(f"\n\033[0;34m--- Batch Benchmark ({iterations} prompts, 50ms simulated latency) ---\033[0m")
+    try:
+        manager = LLMClientManager(api_key="stub-key", base_url=base_url)
+        start = time.perf_counter()
+        run_pooled_client(manager, iterations)
+        print(f"Sequential         total {(time.perf_counter() - start) * 1000:9.2f}ms")
+        manager.close()
+
+        for concurrency in (10, 50):
+            elapsed_ms, results = run_async_batch(iterations, concurrency)
+            failures = sum(1 for r in results if r["error"])
+            print(f"Async (c={concurrency:<3})     total {elapsed_ms:9.2f}ms | failures {failures}")
+        print(f"Async pool stats: {llm_client.client_manager.pool_stats()}")
+    finally:
+        server.shutdown()
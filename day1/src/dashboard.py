@@ -6,10 +6,12 @@ Tracks metrics and displays them in a web interface
 import os
 import json
 import time
+import hashlib
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import threading
+from histogram import CumulativeHistogram, WindowedHistogram
 
 # Metrics storage
 metrics = {
@@ -17,193 +19,511 @@ metrics = {
     "successful_requests": 0,
     "failed_requests": 0,
     "total_tokens": 0,
+    "streamed_requests": 0,
+    "total_ttft_ms": 0.0,
+    "total_tokens_per_sec": 0.0,
+    "tokens_per_sec_samples": 0,
+    "last_ttft_ms": None,
+    "last_tokens_per_sec": None,
     "last_request_time": None,
     "requests": []
 }
 
-def update_metrics(response_data=None, success=True, tokens=0):
-    """Update metrics with new request data"""
+# Guards every read and write of `metrics` and `histograms`; handlers run on their own threads
+metrics_lock = threading.Lock()
+# Notified (with metrics_lock held) whenever metrics change, to wake /events streams
+metrics_changed = threading.Condition(metrics_lock)
+metrics_version = 0
+
+# /events: minimum gap between pushes (coalesces bursts) and idle heartbeat interval
+SSE_MIN_INTERVAL = 0.5
+SSE_HEARTBEAT_SECONDS = 5
+
+# Sliding-window distributions: 1m = 12 x 5s slots, 15m = 15 x 60s slots (fixed memory)
+HISTOGRAM_WINDOWS = {"1m": (60, 12), "15m": (900, 15)}
+PERCENTILE_STATS = ("count", "p50", "p90", "p99", "max")
+histograms = {
+    "latency_ms": {name: WindowedHistogram(seconds, slots, scale=10) for name, (seconds, slots) in HISTOGRAM_WINDOWS.items()},
+    "tokens": {name: WindowedHistogram(seconds, slots) for name, (seconds, slots) in HISTOGRAM_WINDOWS.items()}
+}
+
+# All-time latency distribution for /metrics/prometheus, in seconds (Prometheus base unit)
+LATENCY_BUCKETS_SECONDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+latency_histogram = CumulativeHistogram(LATENCY_BUCKETS_SECONDS)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Rendered exposition text, reused until metrics_version moves on
+_prometheus_cache = {"version": None, "body": None}
+
+# Upper bound on events accepted by one POST /update/batch
+MAX_BATCH_EVENTS = 10000
+
+def update_metrics(response_data=None, success=True, tokens=0, ttft_ms=None, tokens_per_sec=None, latency_ms=None):
+    """Update metrics with new request data; ttft_ms/tokens_per_sec come from streamed requests"""
+    with metrics_lock:
+        _apply_update(response_data, success, tokens, ttft_ms, tokens_per_sec, latency_ms)
+        _notify_changed()
+
+def update_metrics_batch(events):
+    """Apply many events under a single lock acquisition. Each event takes update_metrics' keyword arguments."""
+    with metrics_lock:
+        for event in events:
+            _apply_update(**event)
+        _notify_changed()
+
+def _notify_changed():
+    # Caller must hold metrics_lock
+    global metrics_version
+    metrics_version += 1
+    metrics_changed.notify_all()
+
+def snapshot_metrics():
+    """Return a consistent copy of metrics for rendering or serialization"""
+    with metrics_lock:
+        snapshot = metrics.copy()
+        snapshot["requests"] = list(metrics["requests"])
+        snapshot["percentiles"] = {
+            name: {window: histogram.percentiles() for window, histogram in windows.items()}
+            for name, windows in histograms.items()
+        }
+    return snapshot
+
+def prometheus_metrics():
+    """
+    Render counters, gauges and the latency histogram in the Prometheus text format.
+    Scrapes between updates return the cached body without re-rendering.
+    """
+    with metrics_lock:
+        if _prometheus_cache["version"] == metrics_version:
+            return _prometheus_cache["body"]
+        lines = []
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+        metric("llm_day1_requests_total", "counter", "LLM requests reported to the dashboard, by result.", [
+            ('{result="success"}', metrics["successful_requests"]),
+            ('{result="failure"}', metrics["failed_requests"])
+        ])
+        metric("llm_day1_tokens_total", "counter", "Tokens used by successful requests.", [("", metrics["total_tokens"])])
+        metric("llm_day1_streamed_requests_total", "counter", "Requests made in streaming mode.", [("", metrics["streamed_requests"])])
+        metric("llm_day1_ttft_seconds_total", "counter", "Cumulative time to first token of streamed requests.",
+               [("", metrics["total_ttft_ms"] / 1000)])
+        metric("llm_day1_last_ttft_seconds", "gauge", "Time to first token of the latest streamed request.",
+               [("", (metrics["last_ttft_ms"] or 0) / 1000)])
+        metric("llm_day1_last_tokens_per_second", "gauge", "Generation rate of the latest streamed request.",
+               [("", metrics["last_tokens_per_sec"] or 0)])
+        name = "llm_day1_request_latency_seconds"
+        lines.append(f"# HELP {name} End-to-end request latency.")
+        lines.append(f"# TYPE {name} histogram")
+        for bound, count in latency_histogram.cumulative_buckets():
+            lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{name}_sum {latency_histogram.sum}")
+        lines.append(f"{name}_count {latency_histogram.count}")
+        body = ("\n".join(lines) + "\n").encode()
+        _prometheus_cache["version"] = metrics_version
+        _prometheus_cache["body"] = body
+        return body
+
+def dashboard_view(m):
+    """
+    Flatten a metrics snapshot into the display strings shown on the page,
+    keyed by the data-field names used in DASHBOARD_HTML.
+    """
+    success_rate = 0
+    if m["total_requests"] > 0:
+        success_rate = (m["successful_requests"] / m["total_requests"]) * 100
+    avg_ttft_ms = 0
+    avg_tokens_per_sec = 0
+    if m["streamed_requests"] > 0:
+        avg_ttft_ms = m["total_ttft_ms"] / m["streamed_requests"]
+    # Streams that ended before a second token carry no rate; average only those that did
+    if m["tokens_per_sec_samples"] > 0:
+        avg_tokens_per_sec = m["total_tokens_per_sec"] / m["tokens_per_sec_samples"]
+    view = {
+        "status": "Active" if m["total_requests"] > 0 else "Waiting for requests",
+        "total_requests": str(m["total_requests"]),
+        "successful_requests": str(m["successful_requests"]),
+        "failed_requests": str(m["failed_requests"]),
+        "success_rate": f"{success_rate:.1f}%",
+        "total_tokens": str(m["total_tokens"]),
+        "avg_ttft": f"{avg_ttft_ms:.0f}ms",
+        "avg_tokens_per_sec": f"{avg_tokens_per_sec:.1f}",
+        "last_request_time": m["last_request_time"] or "Never"
+    }
+    for name, windows in m["percentiles"].items():
+        for window, stats in windows.items():
+            for stat in PERCENTILE_STATS:
+                value = stats[stat]
+                view[f"{name}.{window}.{stat}"] = "-" if value is None else f"{value:g}"
+    return view
+
+def parse_event(values):
+    """
+    Normalize an event from query params or a JSON body into update_metrics keyword arguments.
+    Raises ValueError on malformed fields.
+    """
+    success = values.get("success", True)
+    if isinstance(success, str):
+        success = success.lower() == "true"
+    ttft_ms = values.get("ttft_ms")
+    tokens_per_sec = values.get("tokens_per_sec")
+    latency_ms = values.get("latency_ms")
+    return {
+        "success": bool(success),
+        "tokens": int(values.get("tokens") or 0),
+        "ttft_ms": float(ttft_ms) if ttft_ms not in (None, "") else None,
+        "tokens_per_sec": float(tokens_per_sec) if tokens_per_sec not in (None, "") else None,
+        "latency_ms": float(latency_ms) if latency_ms not in (None, "") else None
+    }
+
+def _apply_update(response_data=None, success=True, tokens=0, ttft_ms=None, tokens_per_sec=None, latency_ms=None):
+    # Caller must hold metrics_lock
+    now = time.monotonic()
+    if latency_ms is not None:
+        for histogram in histograms["latency_ms"].values():
+            histogram.record(latency_ms, now)
+        latency_histogram.record(latency_ms / 1000)
+    if success and tokens:
+        for histogram in histograms["tokens"].values():
+            histogram.record(tokens, now)
     metrics["total_requests"] += 1
     if success:
         metrics["successful_requests"] += 1
         metrics["total_tokens"] += tokens
     else:
         metrics["failed_requests"] += 1
+    if ttft_ms is not None:
+        metrics["streamed_requests"] += 1
+        metrics["total_ttft_ms"] += ttft_ms
+        metrics["last_ttft_ms"] = ttft_ms
+        if tokens_per_sec is not None:
+            metrics["total_tokens_per_sec"] += tokens_per_sec
+            metrics["tokens_per_sec_samples"] += 1
+            metrics["last_tokens_per_sec"] = tokens_per_sec
     metrics["last_request_time"] = datetime.now().isoformat()
     if response_data:
         metrics["requests"].append({
             "time": datetime.now().isoformat(),
             "success": success,
             "tokens": tokens,
+            "ttft_ms": ttft_ms,
+            "tokens_per_sec": tokens_per_sec,
+            "latency_ms": latency_ms,
             "data": response_data
         })
     # Keep only last 50 requests
     if len(metrics["requests"]) > 50:
-        metrics["requests"] = metrics["requests"][-50:]
+        del metrics["requests"][:-50]
 
-class DashboardHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        parsed_path = urlparse(self.path)
-        if parsed_path.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(self.get_dashboard_html().encode())
-        elif parsed_path.path == '/metrics':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(metrics, indent=2).encode())
-        elif parsed_path.path == '/update':
-            # Update metrics endpoint
-            query_params = parse_qs(parsed_path.query)
-            success = query_params.get('success', ['true'])[0].lower() == 'true'
-            tokens = int(query_params.get('tokens', ['0'])[0])
-            update_metrics(success=success, tokens=tokens)
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"status": "updated"}).encode())
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def get_dashboard_html(self):
-        success_rate = 0
-        if metrics["total_requests"] > 0:
-            success_rate = (metrics["successful_requests"] / metrics["total_requests"]) * 100
-        
-        html = f"""
+# Static page shell: rendered once at import, values are filled in by the /events stream.
+# Every element with data-field="<key>" is updated in place from dashboard_view() deltas.
+PERCENTILE_ROWS = "\n".join(
+    f'''            <tr><td>{label}</td><td>{window}</td>''' + "".join(
+        f'<td data-field="{name}.{window}.{stat}">-</td>' for stat in PERCENTILE_STATS) + "</tr>"
+    for name, label in (("latency_ms", "Latency (ms)"), ("tokens", "Tokens"))
+    for window in HISTOGRAM_WINDOWS
+)
+
+DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>LLM Day 1 Dashboard</title>
-    <meta http-equiv="refresh" content="5">
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             margin: 20px;
             background: #f5f5f5;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             background: white;
             padding: 20px;
             border-radius: 8px;
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        h1 {{
+        }
+        h1 {
             color: #333;
             border-bottom: 3px solid #4CAF50;
             padding-bottom: 10px;
-        }}
-        .metrics-grid {{
+        }
+        .metrics-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 20px;
             margin: 20px 0;
-        }}
-        .metric-card {{
+        }
+        .metric-card {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 20px;
             border-radius: 8px;
             text-align: center;
-        }}
-        .metric-card.success {{
+        }
+        .metric-card.success {
             background: linear-gradient(135deg, #4CAF50 0%, #45a049 100%);
-        }}
-        .metric-card.warning {{
+        }
+        .metric-card.warning {
             background: linear-gradient(135deg, #ff9800 0%, #f57c00 100%);
-        }}
-        .metric-card.error {{
+        }
+        .metric-card.error {
             background: linear-gradient(135deg, #f44336 0%, #d32f2f 100%);
-        }}
-        .metric-value {{
+        }
+        .metric-value {
             font-size: 2.5em;
             font-weight: bold;
             margin: 10px 0;
-        }}
-        .metric-label {{
+        }
+        .metric-label {
             font-size: 0.9em;
             opacity: 0.9;
-        }}
-        .status {{
+        }
+        .status {
             padding: 10px;
             margin: 10px 0;
             border-radius: 4px;
             background: #e8f5e9;
             color: #2e7d32;
-        }}
-        .last-update {{
+        }
+        .percentiles {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+        }
+        .percentiles th, .percentiles td {
+            padding: 8px 12px;
+            text-align: right;
+            border-bottom: 1px solid #ddd;
+        }
+        .percentiles th:first-child, .percentiles td:first-child {
+            text-align: left;
+        }
+        .percentiles th {
+            background: #667eea;
+            color: white;
+        }
+        .status.disconnected {
+            background: #ffebee;
+            color: #c62828;
+        }
+        .last-update {
             text-align: right;
             color: #666;
             font-size: 0.9em;
             margin-top: 20px;
-        }}
+        }
     </style>
 </head>
 <body>
     <div class="container">
         <h1>LLM Day 1 Demo Dashboard</h1>
-        <div class="status">
-            <strong>Status:</strong> {'Active' if metrics['total_requests'] > 0 else 'Waiting for requests'}
+        <div class="status" id="status">
+            <strong>Status:</strong> <span data-field="status">Connecting...</span>
         </div>
         <div class="metrics-grid">
             <div class="metric-card">
                 <div class="metric-label">Total Requests</div>
-                <div class="metric-value">{metrics['total_requests']}</div>
+                <div class="metric-value" data-field="total_requests">0</div>
             </div>
             <div class="metric-card success">
                 <div class="metric-label">Successful</div>
-                <div class="metric-value">{metrics['successful_requests']}</div>
+                <div class="metric-value" data-field="successful_requests">0</div>
             </div>
             <div class="metric-card error">
                 <div class="metric-label">Failed</div>
-                <div class="metric-value">{metrics['failed_requests']}</div>
+                <div class="metric-value" data-field="failed_requests">0</div>
             </div>
             <div class="metric-card">
                 <div class="metric-label">Success Rate</div>
-                <div class="metric-value">{success_rate:.1f}%</div>
+                <div class="metric-value" data-field="success_rate">0.0%</div>
             </div>
             <div class="metric-card">
                 <div class="metric-label">Total Tokens</div>
-                <div class="metric-value">{metrics['total_tokens']}</div>
+                <div class="metric-value" data-field="total_tokens">0</div>
+            </div>
+            <div class="metric-card warning">
+                <div class="metric-label">Avg Time to First Token</div>
+                <div class="metric-value" data-field="avg_ttft">0ms</div>
+            </div>
+            <div class="metric-card warning">
+                <div class="metric-label">Avg Tokens/sec (streamed)</div>
+                <div class="metric-value" data-field="avg_tokens_per_sec">0.0</div>
             </div>
         </div>
+        <h2>Percentiles (sliding windows)</h2>
+        <table class="percentiles">
+            <tr><th>Metric</th><th>Window</th><th>Count</th><th>p50</th><th>p90</th><th>p99</th><th>Max</th></tr>
+__PERCENTILE_ROWS__
+        </table>
         <div class="last-update">
-            Last Request: {metrics['last_request_time'] or 'Never'}
-            <br>Auto-refresh: Every 5 seconds
+            Last Request: <span data-field="last_request_time">Never</span>
+            <br>Live updates: pushed over Server-Sent Events
         </div>
     </div>
+    <script>
+        const statusBox = document.getElementById('status');
+        const source = new EventSource('/events');
+        source.onmessage = (event) => {
+            const delta = JSON.parse(event.data);
+            for (const [field, value] of Object.entries(delta)) {
+                document.querySelectorAll(`[data-field="${field}"]`).forEach((el) => { el.textContent = value; });
+            }
+            statusBox.classList.remove('disconnected');
+        };
+        // EventSource reconnects by itself; the first event after reconnecting is a full snapshot
+        source.onerror = () => { statusBox.classList.add('disconnected'); };
+    </script>
 </body>
 </html>
-"""
-        return html
+""".replace("__PERCENTILE_ROWS__", PERCENTILE_ROWS)
+DASHBOARD_HTML_BYTES = DASHBOARD_HTML.encode()
+DASHBOARD_ETAG = f'"{hashlib.sha1(DASHBOARD_HTML_BYTES).hexdigest()[:16]}"'
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parsed_path = urlparse(self.path)
+        if parsed_path.path == '/':
+            if self.headers.get('If-None-Match') == DASHBOARD_ETAG:
+                self.send_response(304)
+                self.send_header('ETag', DASHBOARD_ETAG)
+                self.end_headers()
+                return
+            page = self.get_dashboard_html()
+            self.send_response(200)
+            self.send_header('Content-type', 'text/html')
+            self.send_header('Content-Length', str(len(page)))
+            self.send_header('ETag', DASHBOARD_ETAG)
+            self.end_headers()
+            self.wfile.write(page)
+        elif parsed_path.path == '/events':
+            self.stream_events()
+        elif parsed_path.path == '/metrics':
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(snapshot_metrics(), indent=2).encode())
+        elif parsed_path.path == '/metrics/prometheus':
+            body = prometheus_metrics()
+            self.send_response(200)
+            self.send_header('Content-type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif parsed_path.path == '/update':
+            # Update metrics endpoint
+            query_params = parse_qs(parsed_path.query)
+            try:
+                event = parse_event({key: values[0] for key, values in query_params.items()})
+            except ValueError as e:
+                self.send_json(400, {"status": "error", "error": str(e)})
+                return
+            update_metrics(**event)
+            self.send_json(200, {"status": "updated"})
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def do_POST(self):
+        parsed_path = urlparse(self.path)
+        if parsed_path.path == '/update/batch':
+            # Batched ingestion: {"events": [{"success": true, "tokens": 42, ...}, ...]} or a bare list
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b"[]")
+                raw_events = body.get("events", []) if isinstance(body, dict) else body
+                if not isinstance(raw_events, list):
+                    raise ValueError("'events' must be a list")
+                if len(raw_events) > MAX_BATCH_EVENTS:
+                    raise ValueError(f"Batch exceeds {MAX_BATCH_EVENTS} events")
+                events = [parse_event(event) for event in raw_events]
+            except (ValueError, TypeError, AttributeError) as e:
+                self.send_json(400, {"status": "error", "error": str(e)})
+                return
+            update_metrics_batch(events)
+            self.send_json(200, {"status": "updated", "events": len(events)})
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def stream_events(self):
+        """
+        Server-Sent Events feed. The first message is the full view; after that
+        only fields whose display value changed are sent. Idle connections get
+        a comment heartbeat, which also refreshes percentiles as windows slide.
+        """
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        last_view = {}
+        last_version = None
+        try:
+            while True:
+                with metrics_changed:
+                    if metrics_version == last_version:
+                        metrics_changed.wait(timeout=SSE_HEARTBEAT_SECONDS)
+                    version = metrics_version
+                view = dashboard_view(snapshot_metrics())
+                delta = {key: value for key, value in view.items() if last_view.get(key) != value}
+                if delta:
+                    self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode())
+                else:
+                    self.wfile.write(b": heartbeat\n\n")
+                self.wfile.flush()
+                last_view = view
+                last_version = version
+                # Updates arriving during this pause are folded into the next push
+                time.sleep(SSE_MIN_INTERVAL)
+        except (BrokenPipeError, ConnectionResetError):
+            # Browser tab closed or navigated away
+            pass
+
+    def send_json(self, status, payload):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(payload).encode())
+    
+    def get_dashboard_html(self):
+        # The page is a static shell; values arrive over /events
+        return DASHBOARD_HTML_BYTES
     
     def log_message(self, format, *args):
         # Suppress default logging
         pass
 
+class DashboardServer(ThreadingHTTPServer):
+    # One thread per connection, so a slow page render never blocks /update
+    daemon_threads = True
+    request_queue_size = 128
+
+def create_dashboard_server(port=8080, host='0.0.0.0'):
+    """Create (but don't start) the dashboard server; port 0 picks a free port"""
+    return DashboardServer((host, port), DashboardHandler)
+
 def start_dashboard_server(port=8080):
     """Start the dashboard server"""
-    server = HTTPServer(('0.0.0.0', port), DashboardHandler)
+    server = create_dashboard_server(port)
     print(f"Dashboard server starting on http://0.0.0.0:{port}")
     print(f"Metrics API: http://localhost:{port}/metrics")
+    print(f"Live events: http://localhost:{port}/events")
+    print(f"Prometheus: http://localhost:{port}/metrics/prometheus")
     import signal
-    import sys
     def signal_handler(sig, frame):
         print("\nShutting down dashboard server...")
-        server.shutdown()
-        sys.exit(0)
+        # shutdown() blocks until serve_forever() returns, so it can't run on this (serving) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down dashboard server...")
-        server.shutdown()
+    finally:
+        server.server_close()
 
 if __name__ == "__main__":
     import sys
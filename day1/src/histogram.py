@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Fixed-memory log-bucketed histograms (HDR-style) for the Day 1 dashboard
+Values below 32 units get exact buckets; above that each power of two is split into
+16 linear sub-buckets, so any recorded value is reported within ~6% of its true size.
+"""
+import bisect
+import time
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS            # exact buckets for 0..31
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1            # 16 sub-buckets per power of two above that
+MAX_SHIFT = 31 - SUB_BUCKET_BITS                   # tracks values up to 2**31 - 1 units
+BUCKET_COUNT = SUB_BUCKET_COUNT + MAX_SHIFT * SUB_BUCKET_HALF
+MAX_TRACKABLE = (1 << 31) - 1
+
+def bucket_index(value):
+    """Map a non-negative integer to its bucket index"""
+    if value < SUB_BUCKET_COUNT:
+        return max(value, 0)
+    value = min(value, MAX_TRACKABLE)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + ((value >> shift) - SUB_BUCKET_HALF)
+
+def bucket_upper_bound(index):
+    """Highest integer value that falls into bucket `index`"""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+    mantissa = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    return ((mantissa + 1) << shift) - 1
+
+class WindowedHistogram:
+    """
+    Sliding-window histogram made of `slots` ring-buffered sub-histograms,
+    each covering `slot_seconds`. Memory is slots * BUCKET_COUNT counters,
+    independent of how many values are recorded. `scale` converts recorded
+    values to integer units (e.g. scale=10 keeps 0.1ms resolution for latency).
+    """
+
+    def __init__(self, window_seconds, slots, scale=1.0):
+        self.window_seconds = window_seconds
+        self.slot_seconds = window_seconds / slots
+        self.scale = scale
+        self._counts = [[0] * BUCKET_COUNT for _ in range(slots)]
+        self._slot_ids = [None] * slots
+        self._totals = [0] * slots
+        self._maxima = [0.0] * slots
+
+    def _slot_id(self, now):
+        return int(now // self.slot_seconds)
+
+    def record(self, value, now=None):
+        """Record one value (in the caller's units)."""
+        now = time.monotonic() if now is None else now
+        slot_id = self._slot_id(now)
+        position = slot_id % len(self._counts)
+        if self._slot_ids[position] != slot_id:
+            # The slot last held data from an older rotation: reuse it in place
+            counts = self._counts[position]
+            for i in range(BUCKET_COUNT):
+                counts[i] = 0
+            self._slot_ids[position] = slot_id
+            self._totals[position] = 0
+            self._maxima[position] = 0.0
+        self._counts[position][bucket_index(int(round(value * self.scale)))] += 1
+        self._totals[position] += 1
+        if value > self._maxima[position]:
+            self._maxima[position] = value
+
+    def _live_positions(self, now):
+        current = self._slot_id(now)
+        oldest = current - len(self._counts) + 1
+        return [position for position, slot_id in enumerate(self._slot_ids)
+                if slot_id is not None and oldest <= slot_id <= current]
+
+    def percentiles(self, quantiles=(50, 90, 99), now=None):
+        """
+        Return {"count", "p50", "p90", "p99", "max"} for values recorded inside the window.
+        Percentiles report the upper bound of the matching bucket, capped at the observed max.
+        """
+        now = time.monotonic() if now is None else now
+        positions = self._live_positions(now)
+        total = sum(self._totals[position] for position in positions)
+        maximum = max((self._maxima[position] for position in positions), default=0.0)
+        result = {"count": total}
+        if total == 0:
+            result.update({f"p{q}": None for q in quantiles})
+            result["max"] = None
+            return result
+
+        merged = [0] * BUCKET_COUNT
+        for position in positions:
+            for i, count in enumerate(self._counts[position]):
+                if count:
+                    merged[i] += count
+
+        targets = sorted((max(1, -(-q * total // 100)), q) for q in quantiles)
+        seen = 0
+        target_index = 0
+        for index, count in enumerate(merged):
+            seen += count
+            while target_index < len(targets) and seen >= targets[target_index][0]:
+                value = bucket_upper_bound(index) / self.scale
+                result[f"p{targets[target_index][1]}"] = round(min(value, maximum), 2)
+                target_index += 1
+            if target_index == len(targets):
+                break
+        result["max"] = round(maximum, 2)
+        return result
+
+class CumulativeHistogram:
+    """
+    All-time histogram over fixed upper bounds, in the shape Prometheus expects:
+    per-bound counts (non-cumulative here, summed at export), plus count and sum.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * len(self.bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        if index < len(self.bounds):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_buckets(self):
+        """Return [(upper_bound, count <= bound), ...] ending with ("+Inf", count)."""
+        buckets = []
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            buckets.append((bound, running))
+        buckets.append(("+Inf", self.count))
+        return buckets
@@ -1,25 +1,162 @@
 import os
+import time
+import atexit
+import asyncio
+import threading
+import httpx
 import openai
 from dotenv import load_dotenv
 import sys
 
+DOTENV_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', '.env')
+
+class LLMClientManager:
+    """
+    Owns one long-lived OpenAI client backed by a bounded HTTP keep-alive pool.
+    Config is loaded once and the client is built lazily on first use (or by warm_up()),
+    so repeated calls skip the .env read and the TCP/TLS handshake.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_connections=None,
+                 max_keepalive_connections=None, keepalive_expiry=30.0, timeout=60.0):
+        self._api_key = api_key
+        self._base_url = base_url
+        self.max_connections = max_connections or int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._config_loaded = False
+        self._client = None
+        self._http_client = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._new_connections = 0
+
+    def _load_config(self):
+        """Read config/.env once; explicit constructor arguments take precedence."""
+        if not self._config_loaded:
+            load_dotenv(DOTENV_PATH)
+            self._config_loaded = True
+        api_key = self._api_key or os.getenv("OPENAI_API_KEY")
+        base_url = self._base_url or os.getenv("OPENAI_BASE_URL")
+        return api_key, base_url
+
+    def _on_request(self, request):
+        # httpcore reports connection setup through the "trace" extension
+        request.extensions["trace"] = self._trace
+        with self._stats_lock:
+            self._requests += 1
+
+    def _trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            with self._stats_lock:
+                self._new_connections += 1
+
+    async def _on_async_request(self, request):
+        request.extensions["trace"] = self._async_trace
+        with self._stats_lock:
+            self._requests += 1
+
+    async def _async_trace(self, event_name, info):
+        self._trace(event_name, info)
+
+    def get_client(self):
+        """Return the shared client, or None if no API key is configured."""
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None:
+                api_key, base_url = self._load_config()
+                if not api_key:
+                    return None
+                self._http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_expiry
+                    ),
+                    timeout=self.timeout,
+                    event_hooks={"request": [self._on_request]}
+                )
+                self._client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=self._http_client)
+        return self._client
+
+    def create_async_client(self, max_connections=None, max_retries=2):
+        """
+        Build an AsyncOpenAI client sharing this manager's config and pool stats.
+        Async pools are bound to their event loop, so the caller owns the client and must close it.
+        Returns None if no API key is configured.
+        """
+        api_key, base_url = self._load_config()
+        if not api_key:
+            return None
+        max_connections = max_connections or self.max_connections
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=self.timeout,
+            event_hooks={"request": [self._on_async_request]}
+        )
+        return openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                                  max_retries=max_retries)
+
+    def warm_up(self):
+        """
+        Build the client and open a pooled connection ahead of the first real request.
+        Returns True if the endpoint answered.
+        """
+        client = self.get_client()
+        if client is None:
+            return False
+        try:
+            client.with_options(max_retries=0).models.list()
+            return True
+        except openai.APIError as e:
+            print(f"\033[1;33mWarm-up request failed: {e}\033[0m")
+            return False
+
+    def pool_stats(self):
+        """Return request and connection counters for the shared pool."""
+        with self._stats_lock:
+            requests = self._requests
+            new_connections = self._new_connections
+        return {
+            "requests": requests,
+            "new_connections": new_connections,
+            "reused_connections": max(requests - new_connections, 0),
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections
+        }
+
+    def close(self):
+        """Close pooled connections; the next get_client() call rebuilds the client."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._client = None
+            self._http_client = None
+
+# Shared by every get_llm_response call in this process
+client_manager = LLMClientManager()
+atexit.register(client_manager.close)
+
 def get_llm_response(prompt_message: str, model: str = "gpt-3.5-turbo", temperature: float = 0.7, max_tokens: int = 150):
     """
     Makes an API call to a foundational LLM (OpenAI Chat API) and returns its raw output.
+    Uses the pooled client from client_manager instead of building one per call.
     """
-    # Load environment variables from .env file in the config directory
-    dotenv_path = os.path.join(os.path.dirname(__file__), '..', 'config', '.env')
-    load_dotenv(dotenv_path)
-    openai_api_key = os.getenv("OPENAI_API_KEY")
+    client = client_manager.get_client()
 
-    if not openai_api_key:
+    if client is None:
         print("\033[0;31mError: OPENAI_API_KEY not found in environment or config/.env file.\033[0m")
         print("\033[1;33mPlease set it before running the script (e.g., in config/.env).\033[0m")
         return None
 
     try:
-        client = openai.OpenAI(api_key=openai_api_key)
-        
         print(f"\n--- Sending request to LLM (Model: {model}) ---")
         print(f"Prompt: '{prompt_message}'")
         print(f"Temperature: {temperature}, Max Tokens: {max_tokens}")
@@ -43,6 +180,125 @@ def get_llm_response(prompt_message: str, model: str = "gpt-3.5-turbo", temperat
         print(f"\033[0;31mAn unexpected error occurred: {e}\033[0m")
         return None
 
+def stream_llm_response(prompt_message: str, model: str = "gpt-3.5-turbo", temperature: float = 0.7,
+                        max_tokens: int = 150, stats: dict = None):
+    """
+    Streaming variant of get_llm_response: yields content deltas as they arrive.
+    If a `stats` dict is passed it is filled in once the stream ends with
+    ttft_ms (time to first content token), total_ms, completion_tokens,
+    tokens_per_sec (tokens after the first over the time after it; None for
+    replies of a single token) and success.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({"success": False, "ttft_ms": None, "total_ms": None, "completion_tokens": 0,
+                  "total_tokens": 0, "tokens_per_sec": None})
+    client = client_manager.get_client()
+
+    if client is None:
+        print("\033[0;31mError: OPENAI_API_KEY not found in environment or config/.env file.\033[0m")
+        print("\033[1;33mPlease set it before running the script (e.g., in config/.env).\033[0m")
+        return
+
+    start = time.perf_counter()
+    first_token_at = None
+    delta_count = 0
+    usage = None
+    stream = None
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": prompt_message}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    stats["ttft_ms"] = (first_token_at - start) * 1000
+                delta_count += 1
+                yield content
+        stats["success"] = True
+    except openai.APIError as e:
+        print(f"\033[0;31mOpenAI API Error: {e}\033[0m")
+    except Exception as e:
+        print(f"\033[0;31mAn unexpected error occurred: {e}\033[0m")
+    finally:
+        # Also runs when the caller stops iterating early; closing releases the pooled connection
+        if stream is not None:
+            stream.close()
+        end = time.perf_counter()
+        stats["total_ms"] = (end - start) * 1000
+        # Fall back to one token per delta when the server doesn't report usage
+        stats["completion_tokens"] = usage.completion_tokens if usage else delta_count
+        stats["total_tokens"] = usage.total_tokens if usage else delta_count
+        # The first token arrived at first_token_at, so only the rest were generated after it
+        if first_token_at is not None and stats["completion_tokens"] > 1:
+            generation_seconds = end - first_token_at
+            if generation_seconds > 0:
+                stats["tokens_per_sec"] = (stats["completion_tokens"] - 1) / generation_seconds
+
+async def get_llm_responses_async(prompts, concurrency: int = 10, model: str = "gpt-3.5-turbo",
+                                  temperature: float = 0.7, max_tokens: int = 150, max_retries: int = 2):
+    """
+    Sends many prompts concurrently, with at most `concurrency` requests in flight.
+    Returns one result dict per prompt, in input order:
+    {"prompt", "response", "error", "latency_ms"}. A failed prompt sets "error"
+    and leaves "response" as None; it never aborts the rest of the batch.
+    Raises ValueError if concurrency is not a positive integer.
+    """
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    prompts = list(prompts)
+    client = client_manager.create_async_client(max_connections=concurrency, max_retries=max_retries)
+
+    if client is None:
+        print("\033[0;31mError: OPENAI_API_KEY not found in environment or config/.env file.\033[0m")
+        return [{"prompt": prompt, "response": None, "error": "OPENAI_API_KEY not configured", "latency_ms": 0.0}
+                for prompt in prompts]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(prompt):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                error = None
+            except Exception as e:
+                response = None
+                error = f"{type(e).__name__}: {e}"
+            return {
+                "prompt": prompt,
+                "response": response,
+                "error": error,
+                "latency_ms": (time.perf_counter() - start) * 1000
+            }
+
+    try:
+        return await asyncio.gather(*(run_one(prompt) for prompt in prompts))
+    finally:
+        await client.close()
+
 if __name__ == "__main__":
     print("\033[0;34m--- LLM Interaction Demo ---\033[0m")
     
@@ -4,37 +4,101 @@ Enhanced LLM client that updates dashboard metrics
 """
 import os
 import sys
+import asyncio
 import requests
 import time
-from llm_client import get_llm_response
+from llm_client import get_llm_response, get_llm_responses_async, stream_llm_response
 
 DASHBOARD_URL = os.getenv("DASHBOARD_URL", "http://localhost:8080")
 
-def update_dashboard(success=True, tokens=0):
+def update_dashboard(success=True, tokens=0, ttft_ms=None, tokens_per_sec=None, latency_ms=None):
     """Update dashboard metrics"""
+    params = {
+        "success": "true" if success else "false",
+        "tokens": str(tokens)
+    }
+    if latency_ms is not None:
+        params["latency_ms"] = f"{latency_ms:.2f}"
+    if ttft_ms is not None:
+        params["ttft_ms"] = f"{ttft_ms:.2f}"
+    if tokens_per_sec is not None:
+        params["tokens_per_sec"] = f"{tokens_per_sec:.2f}"
     try:
-        requests.get(f"{DASHBOARD_URL}/update", params={
-            "success": "true" if success else "false",
-            "tokens": str(tokens)
-        }, timeout=1)
+        requests.get(f"{DASHBOARD_URL}/update", params=params, timeout=1)
     except:
         # Dashboard might not be running, that's okay
         pass
 
+def update_dashboard_batch(events):
+    """Report many events in one POST /update/batch round trip"""
+    if not events:
+        return
+    try:
+        requests.post(f"{DASHBOARD_URL}/update/batch", json={"events": events}, timeout=2)
+    except:
+        # Dashboard might not be running, that's okay
+        pass
+
+def run_batch(prompt, count, concurrency=10):
+    """Send `count` copies of the prompt concurrently and report all results in one batch"""
+    print(f"\n--- Sending {count} requests (concurrency {concurrency}) ---")
+    results = asyncio.run(get_llm_responses_async([prompt] * count, concurrency=concurrency))
+    events = []
+    for result in results:
+        response = result["response"]
+        tokens = response.usage.total_tokens if response is not None and response.usage else 0
+        events.append({"success": result["error"] is None, "tokens": tokens, "latency_ms": result["latency_ms"]})
+    update_dashboard_batch(events)
+    succeeded = sum(1 for event in events if event["success"])
+    print(f"\n✅ {succeeded}/{count} requests successful - {sum(e['tokens'] for e in events)} tokens used")
+
+def run_streaming(prompt):
+    """Print deltas as they arrive, then report TTFT and tokens/sec to the dashboard"""
+    stats = {}
+    print("\n--- Streaming LLM Response ---")
+    for delta in stream_llm_response(prompt, stats=stats):
+        print(delta, end="", flush=True)
+    print()
+    update_dashboard(success=stats["success"], tokens=stats["total_tokens"], ttft_ms=stats["ttft_ms"],
+                     tokens_per_sec=stats["tokens_per_sec"], latency_ms=stats["total_ms"])
+    if stats["success"]:
+        tokens_per_sec = f"{stats['tokens_per_sec']:.1f}" if stats["tokens_per_sec"] else "n/a"
+        ttft = f"{stats['ttft_ms']:.0f}ms" if stats["ttft_ms"] is not None else "n/a"
+        print(f"\n✅ Streamed {stats['completion_tokens']} tokens - TTFT {ttft}, {tokens_per_sec} tokens/sec")
+    else:
+        print("\n❌ Request failed")
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        prompt = " ".join(sys.argv[1:])
+    args = sys.argv[1:]
+    stream = "--stream" in args
+    args = [arg for arg in args if arg != "--stream"]
+    batch_count = 0
+    if "--batch" in args:
+        index = args.index("--batch")
+        batch_count = int(args[index + 1])
+        del args[index:index + 2]
+    if args:
+        prompt = " ".join(args)
     else:
         prompt = "Explain the concept of 'distributed consensus' in a simple way."
-    
+
+    if stream:
+        run_streaming(prompt)
+        sys.exit(0)
+    if batch_count:
+        run_batch(prompt, batch_count)
+        sys.exit(0)
+
+    start = time.perf_counter()
     response = get_llm_response(prompt)
+    latency_ms = (time.perf_counter() - start) * 1000
     
     if response:
         tokens = 0
         if hasattr(response, 'usage') and hasattr(response.usage, 'total_tokens'):
             tokens = response.usage.total_tokens
-        update_dashboard(success=True, tokens=tokens)
+        update_dashboard(success=True, tokens=tokens, latency_ms=latency_ms)
         print(f"\n✅ Request successful - {tokens} tokens used")
     else:
-        update_dashboard(success=False, tokens=0)
+        update_dashboard(success=False, tokens=0, latency_ms=latency_ms)
         print("\n❌ Request failed")
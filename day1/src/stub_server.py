@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server for Day 1 benchmarks and tests
+Answers /v1/chat/completions and /v1/models with canned responses over HTTP/1.1 keep-alive
+"""
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STUB_REPLY = "Distributed consensus is how a group of machines agrees on one value, even when some of them fail."
+# Prompts containing this marker get a 500 response, for exercising error paths
+ERROR_MARKER = "stub:error"
+
+def build_completion(model, content=STUB_REPLY):
+    """Build a chat.completion payload shaped like the real API response"""
+    prompt_tokens = 20
+    completion_tokens = len(content.split())
+    return {
+        "id": f"chatcmpl-stub-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+def build_stream_chunks(model, content=STUB_REPLY, include_usage=False):
+    """Split a reply into chat.completion.chunk payloads, one word per delta"""
+    chunk_id = f"chatcmpl-stub-{time.time_ns()}"
+    created = int(time.time())
+    words = content.split(" ")
+    chunks = []
+    for i, word in enumerate(words):
+        delta = {"content": word if i == len(words) - 1 else word + " "}
+        if i == 0:
+            delta["role"] = "assistant"
+        chunks.append({"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+    chunks.append({"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    if include_usage:
+        usage = build_completion(model, content)["usage"]
+        chunks.append({"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [], "usage": usage})
+    return chunks
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this Nagle + delayed ACK adds ~40ms per reused connection
+    disable_nagle_algorithm = True
+    latency = 0.0
+    token_latency = 0.0
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self.send_json(200, {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]})
+        else:
+            self.send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {"error": {"message": "Not found"}})
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        if any(ERROR_MARKER in str(m.get("content", "")) for m in body.get("messages", [])):
+            self.send_json(500, {"error": {"message": "Stub server error", "type": "server_error"}})
+            return
+        model = body.get("model", "gpt-3.5-turbo")
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            self.send_stream(build_stream_chunks(model, include_usage=include_usage))
+        else:
+            self.send_json(200, build_completion(model))
+
+    def send_stream(self, chunks):
+        # Server-sent events over chunked transfer encoding, so the connection stays reusable
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        events = [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks] + ["data: [DONE]\n\n"]
+        for i, event in enumerate(events):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            data = event.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Suppress default logging
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops SYNs when a batch opens many connections at once
+    request_queue_size = 128
+
+def start_stub_server(port=0, latency=0.0, token_latency=0.0):
+    """
+    Start the stub server on a background thread.
+    `latency` delays every completion; `token_latency` spaces out streamed deltas.
+    Returns (server, base_url); call server.shutdown() to stop it.
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"latency": latency, "token_latency": token_latency})
+    server = StubServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return server, base_url
+
+if __name__ == "__main__":
+    import sys
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
+    server, base_url = start_stub_server(port)
+    print(f"Stub OpenAI server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\nShutting down stub server...")
+        server.shutdown()
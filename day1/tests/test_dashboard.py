@@ -0,0 +1,177 @@
+import copy
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+import pytest
+
+# dashboard.py imports its siblings directly, as it does when run from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import dashboard
+
+INITIAL_METRICS = copy.deepcopy(dashboard.metrics)
+
+INITIAL_HISTOGRAMS = copy.deepcopy(dashboard.histograms)
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    dashboard.metrics.clear()
+    dashboard.metrics.update(copy.deepcopy(INITIAL_METRICS))
+    dashboard.histograms.clear()
+    dashboard.histograms.update(copy.deepcopy(INITIAL_HISTOGRAMS))
+    dashboard.latency_histogram = dashboard.CumulativeHistogram(dashboard.LATENCY_BUCKETS_SECONDS)
+    dashboard._prometheus_cache.update({"version": None, "body": None})
+    yield
+
+@pytest.fixture
+def server_url():
+    server = dashboard.create_dashboard_server(port=0, host='127.0.0.1')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+def test_update_metrics_is_thread_safe():
+    def worker():
+        for _ in range(1000):
+            dashboard.update_metrics(success=True, tokens=1)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert dashboard.metrics["total_requests"] == 8000
+    assert dashboard.metrics["total_tokens"] == 8000
+
+def test_batch_endpoint_applies_all_events(server_url):
+    events = [{"success": True, "tokens": 10}] * 99 + [{"success": False, "tokens": 0}]
+    status, body = post_json(f"{server_url}/update/batch", {"events": events})
+    assert status == 200
+    assert body == {"status": "updated", "events": 100}
+
+    with urllib.request.urlopen(f"{server_url}/metrics", timeout=5) as response:
+        metrics = json.loads(response.read())
+    assert metrics["total_requests"] == 100
+    assert metrics["successful_requests"] == 99
+    assert metrics["failed_requests"] == 1
+    assert metrics["total_tokens"] == 990
+
+def test_batch_endpoint_rejects_malformed_events(server_url):
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        post_json(f"{server_url}/update/batch", {"events": [{"tokens": "many"}]})
+    assert exc_info.value.code == 400
+    # A rejected batch is not partially applied
+    assert dashboard.metrics["total_requests"] == 0
+
+def test_slow_render_does_not_block_updates(server_url, monkeypatch):
+    original = dashboard.DashboardHandler.get_dashboard_html
+    def slow_render(self):
+        time.sleep(1)
+        return original(self)
+    monkeypatch.setattr(dashboard.DashboardHandler, "get_dashboard_html", slow_render)
+
+    page = threading.Thread(target=lambda: urllib.request.urlopen(f"{server_url}/", timeout=5).read())
+    page.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    with urllib.request.urlopen(f"{server_url}/update?success=true&tokens=5", timeout=5) as response:
+        assert response.status == 200
+    assert time.perf_counter() - start < 0.5
+    page.join()
+
+def test_metrics_endpoint_reports_latency_percentiles(server_url):
+    events = [{"success": True, "tokens": 100, "latency_ms": float(ms)} for ms in range(1, 101)]
+    post_json(f"{server_url}/update/batch", {"events": events})
+
+    with urllib.request.urlopen(f"{server_url}/metrics", timeout=5) as response:
+        percentiles = json.loads(response.read())["percentiles"]
+    for window in ("1m", "15m"):
+        latency = percentiles["latency_ms"][window]
+        assert latency["count"] == 100
+        assert latency["p50"] == pytest.approx(50, rel=0.07)
+        assert latency["p99"] == pytest.approx(99, rel=0.07)
+        assert latency["max"] == 100
+        assert percentiles["tokens"][window]["p90"] == pytest.approx(100, rel=0.07)
+
+def read_event(response):
+    """Read one SSE message, skipping heartbeats; returns the decoded data payload"""
+    while True:
+        line = response.readline().decode()
+        if line.startswith("data: "):
+            response.readline()  # blank line terminating the event
+            return json.loads(line[len("data: "):])
+
+def test_page_is_a_cached_static_shell(server_url):
+    with urllib.request.urlopen(f"{server_url}/", timeout=5) as response:
+        etag = response.headers["ETag"]
+        page = response.read()
+    assert b'http-equiv="refresh"' not in page
+    assert b"EventSource('/events')" in page
+
+    dashboard.update_metrics(success=True, tokens=5)
+    with urllib.request.urlopen(f"{server_url}/", timeout=5) as response:
+        assert response.read() == page
+
+    request = urllib.request.Request(f"{server_url}/", headers={"If-None-Match": etag})
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        urllib.request.urlopen(request, timeout=5)
+    assert exc_info.value.code == 304
+
+def test_events_stream_pushes_only_changed_fields(server_url, monkeypatch):
+    monkeypatch.setattr(dashboard, "SSE_MIN_INTERVAL", 0.01)
+    with urllib.request.urlopen(f"{server_url}/events", timeout=5) as response:
+        assert response.headers["Content-type"] == "text/event-stream"
+        snapshot = read_event(response)
+        assert snapshot["total_requests"] == "0"
+        assert snapshot["latency_ms.1m.p50"] == "-"
+
+        dashboard.update_metrics(success=True, tokens=7, latency_ms=120.0)
+        delta = read_event(response)
+    assert delta["total_requests"] == "1"
+    assert delta["total_tokens"] == "7"
+    assert delta["latency_ms.1m.p50"] == "120"
+    # Unchanged fields are not resent
+    assert "failed_requests" not in delta
+    assert "avg_ttft" not in delta
+
+def test_prometheus_endpoint_exposes_counters_and_histogram(server_url):
+    events = [{"success": True, "tokens": 10, "latency_ms": 80.0}] * 3 + [{"success": False, "tokens": 0, "latency_ms": 3000.0}]
+    post_json(f"{server_url}/update/batch", {"events": events})
+
+    with urllib.request.urlopen(f"{server_url}/metrics/prometheus", timeout=5) as response:
+        assert response.headers["Content-type"].startswith("text/plain; version=0.0.4")
+        lines = response.read().decode().splitlines()
+    assert "# TYPE llm_day1_requests_total counter" in lines
+    assert 'llm_day1_requests_total{result="success"} 3' in lines
+    assert 'llm_day1_requests_total{result="failure"} 1' in lines
+    assert "llm_day1_tokens_total 30" in lines
+    assert 'llm_day1_request_latency_seconds_bucket{le="0.05"} 0' in lines
+    assert 'llm_day1_request_latency_seconds_bucket{le="0.1"} 3' in lines
+    assert 'llm_day1_request_latency_seconds_bucket{le="2.5"} 3' in lines
+    assert 'llm_day1_request_latency_seconds_bucket{le="5.0"} 4' in lines
+    assert 'llm_day1_request_latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "llm_day1_request_latency_seconds_count 4" in lines
+
+def test_prometheus_body_is_reused_until_metrics_change():
+    first = dashboard.prometheus_metrics()
+    assert dashboard.prometheus_metrics() is first
+    dashboard.update_metrics(success=True, tokens=1)
+    assert dashboard.prometheus_metrics() is not first
+
+def test_avg_tokens_per_sec_ignores_streams_without_a_rate():
+    dashboard.update_metrics(success=True, tokens=50, ttft_ms=100, tokens_per_sec=40.0)
+    dashboard.update_metrics(success=True, tokens=1, ttft_ms=120, tokens_per_sec=None)
+    view = dashboard.dashboard_view(dashboard.snapshot_metrics())
+    assert view["avg_tokens_per_sec"] == "40.0"
+    assert view["avg_ttft"] == "110ms"
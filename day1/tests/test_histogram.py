@@ -0,0 +1,41 @@
+import os
+import sys
+import random
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from histogram import WindowedHistogram, bucket_index, bucket_upper_bound, BUCKET_COUNT, MAX_TRACKABLE
+
+def test_buckets_cover_values_within_relative_error():
+    rng = random.Random(1)
+    values = list(range(2000)) + [rng.randint(0, MAX_TRACKABLE) for _ in range(5000)]
+    for value in values:
+        index = bucket_index(value)
+        assert 0 <= index < BUCKET_COUNT
+        assert value <= bucket_upper_bound(index) <= value * 1.0625 + 1
+
+def test_percentiles_track_exact_values_within_error():
+    histogram = WindowedHistogram(60, 12, scale=10)
+    rng = random.Random(2)
+    values = [rng.expovariate(1 / 200) for _ in range(20000)]
+    for value in values:
+        histogram.record(value, now=1.0)
+    ordered = sorted(values)
+    result = histogram.percentiles(now=1.0)
+    assert result["count"] == len(values)
+    assert result["p50"] == pytest.approx(ordered[len(values) // 2 - 1], rel=0.07)
+    assert result["p99"] == pytest.approx(ordered[int(len(values) * 0.99) - 1], rel=0.07)
+    assert result["max"] == pytest.approx(ordered[-1], abs=0.01)
+
+def test_old_slots_expire_and_memory_stays_fixed():
+    histogram = WindowedHistogram(60, 12)
+    for second in range(600):
+        histogram.record(second, now=float(second))
+    # Only the last 12 five-second slots (t=540..599) are still inside the window
+    result = histogram.percentiles(now=599.0)
+    assert result["count"] == 60
+    assert result["max"] == 599
+    assert len(histogram._counts) == 12
+    assert all(len(counts) == BUCKET_COUNT for counts in histogram._counts)
+    assert histogram.percentiles(now=1000.0)["count"] == 0
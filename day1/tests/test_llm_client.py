@@ -1,7 +1,11 @@
 import pytest
 import os
+import time
+import asyncio
 import openai
-from src.llm_client import get_llm_response
+import src.llm_client as llm_client
+from src.llm_client import get_llm_response, get_llm_responses_async, stream_llm_response, LLMClientManager
+from src.stub_server import start_stub_server, ERROR_MARKER, STUB_REPLY
 
 # This is a very basic test. In a real system, you'd mock the OpenAI API.
 # For this hands-on lesson, we'll just check if the function runs without immediate errors.
@@ -45,3 +49,109 @@ def test_get_llm_response_basic_call():
             del os.environ["OPENAI_API_KEY"]
         if original_api_key:
             os.environ["OPENAI_API_KEY"] = original_api_key # Restore original
+
+def test_client_manager_reuses_pooled_connections():
+    # Runs against the local stub server, so no API key or network access is needed.
+    server, base_url = start_stub_server()
+    manager = LLMClientManager(api_key="stub-key", base_url=base_url)
+    try:
+        assert manager.warm_up() is True
+        client = manager.get_client()
+        for _ in range(5):
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": "ping"}]
+            )
+            assert response.choices[0].message.content
+        # The same client instance is handed out on every call
+        assert manager.get_client() is client
+        stats = manager.pool_stats()
+        assert stats["requests"] == 6
+        assert stats["new_connections"] == 1
+        assert stats["reused_connections"] == 5
+    finally:
+        manager.close()
+        server.shutdown()
+
+def test_client_manager_without_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    manager = LLMClientManager()
+    manager._config_loaded = True  # skip config/.env so a local key file can't leak in
+    assert manager.get_client() is None
+    assert manager.warm_up() is False
+
+def test_get_llm_responses_async_keeps_order_and_isolates_failures(monkeypatch):
+    server, base_url = start_stub_server(latency=0.05)
+    monkeypatch.setattr(llm_client, "client_manager", LLMClientManager(api_key="stub-key", base_url=base_url))
+    prompts = [f"prompt {i}" for i in range(20)]
+    prompts[7] = f"prompt 7 {ERROR_MARKER}"
+    try:
+        results = asyncio.run(get_llm_responses_async(prompts, concurrency=10, max_retries=0))
+    finally:
+        server.shutdown()
+
+    assert [r["prompt"] for r in results] == prompts
+    assert results[7]["response"] is None
+    assert "InternalServerError" in results[7]["error"]
+    for i, result in enumerate(results):
+        assert result["latency_ms"] >= 50
+        if i != 7:
+            assert result["error"] is None
+            assert result["response"].choices[0].message.content
+
+def test_get_llm_responses_async_runs_concurrently(monkeypatch):
+    server, base_url = start_stub_server(latency=0.1)
+    monkeypatch.setattr(llm_client, "client_manager", LLMClientManager(api_key="stub-key", base_url=base_url))
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(get_llm_responses_async([f"prompt {i}" for i in range(20)], concurrency=10))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+    assert all(r["error"] is None for r in results)
+    # 20 requests of 100ms each with 10 in flight: ~0.2s, far below the 2s sequential cost
+    assert elapsed < 1.0
+
+@pytest.mark.parametrize("concurrency", [0, -1, None])
+def test_get_llm_responses_async_rejects_invalid_concurrency(concurrency):
+    with pytest.raises(ValueError, match="concurrency must be >= 1"):
+        asyncio.run(get_llm_responses_async(["prompt"], concurrency=concurrency))
+
+def test_stream_llm_response_yields_deltas_and_measures_ttft(monkeypatch):
+    server, base_url = start_stub_server(latency=0.05, token_latency=0.005)
+    manager = LLMClientManager(api_key="stub-key", base_url=base_url)
+    monkeypatch.setattr(llm_client, "client_manager", manager)
+    stats = {}
+    try:
+        deltas = list(stream_llm_response("Explain consensus", stats=stats))
+    finally:
+        manager.close()
+        server.shutdown()
+
+    assert len(deltas) > 1
+    assert "".join(deltas) == STUB_REPLY
+    assert stats["success"] is True
+    assert 50 <= stats["ttft_ms"] < stats["total_ms"]
+    # Usage comes from the final chunk requested through stream_options
+    assert stats["completion_tokens"] == len(STUB_REPLY.split())
+    # The first token is excluded: it arrived at ttft, not during the measured interval
+    generation_seconds = (stats["total_ms"] - stats["ttft_ms"]) / 1000
+    assert stats["tokens_per_sec"] == pytest.approx((stats["completion_tokens"] - 1) / generation_seconds)
+
+def test_stream_llm_response_stopped_early_releases_connection(monkeypatch):
+    server, base_url = start_stub_server(token_latency=0.005)
+    manager = LLMClientManager(api_key="stub-key", base_url=base_url)
+    monkeypatch.setattr(llm_client, "client_manager", manager)
+    stats = {}
+    try:
+        stream = stream_llm_response("Explain consensus", stats=stats)
+        first = next(stream)
+        stream.close()
+        assert first
+        assert stats["success"] is False
+        assert stats["ttft_ms"] is not None
+        # The pool is still usable after an abandoned stream
+        assert "".join(stream_llm_response("again")) == STUB_REPLY
+    finally:
+        manager.close()
+        server.shutdown()
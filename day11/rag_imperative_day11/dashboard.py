@@ -1,8 +1,9 @@
 import json
 import os
 from datetime import datetime as dt
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string
 from flask_cors import CORS
+from prometheus_text import PROMETHEUS_CONTENT_TYPE, MetricsCache, append_metric, file_version, timestamp_seconds
 
 app = Flask(__name__)
 CORS(app)
@@ -105,6 +106,25 @@ def save_metrics(metrics):
     with open(METRICS_FILE, "w") as f:
         json.dump(metrics, f, indent=2)
 
+# --- Prometheus exposition ---
+def render_prometheus(metrics):
+    """Render counters and gauges in the Prometheus text format."""
+    lines = []
+    append_metric(lines, "rag_questions_total", "counter", "Questions asked.", [
+        ("", metrics.get("total_questions_asked", 0)),
+    ])
+    append_metric(lines, "rag_responses_total", "counter", "Responses returned.", [
+        ("", metrics.get("total_responses", 0)),
+    ])
+    append_metric(lines, "rag_last_activity_timestamp_seconds", "gauge", "Unix time of the most recent question.", [
+        ("", timestamp_seconds(metrics.get("last_activity"))),
+    ])
+    return "\n".join(lines) + "\n"
+
+# Scrapes are answered from metrics.json as parsed on its last change: the file is only
+# re-read when its mtime or size differs, and the rendered text is reused until then
+_metrics_cache = MetricsCache(lambda: file_version(METRICS_FILE), load_metrics, render_prometheus)
+
 @app.route("/")
 def dashboard():
     return render_template_string(DASHBOARD_HTML)
@@ -141,6 +161,11 @@ def op_demo_batch():
     save_metrics(metrics)
     return jsonify({"ok": True, "message": "3 demo questions sent. Metrics updated."})
 
+@app.route('/metrics/prometheus')
+def prometheus_metrics():
+    """Prometheus text-format exposition of the cached metrics."""
+    return Response(_metrics_cache.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     print("Dashboard: http://localhost:5000")
     app.run(host="0.0.0.0", port=5000, debug=False)
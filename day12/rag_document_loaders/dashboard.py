@@ -3,8 +3,9 @@ import json
 import subprocess
 import signal
 import sys
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from datetime import datetime
+from prometheus_text import PROMETHEUS_CONTENT_TYPE, MetricsCache, append_metric, file_version, timestamp_seconds
 
 app = Flask(__name__)
 METRICS_FILE = "metrics.json"
@@ -30,6 +31,35 @@ def load_metrics():
         "documents_per_type": {"text": 0, "pdf": 0, "web": 0}
     }
 
+# --- Prometheus exposition ---
+def render_prometheus(metrics):
+    """Render gauges for the latest loader run in the Prometheus text format."""
+    lines = []
+    per_type = metrics.get("documents_per_type", {})
+    append_metric(lines, "document_loader_documents_loaded", "gauge", "Documents loaded in the latest run, by source type.", [
+        (f'{{type="{source}"}}', per_type.get(source, 0)) for source in ("text", "pdf", "web")
+    ])
+    append_metric(lines, "document_loader_load_time_seconds", "gauge", "Load time in the latest run, by source type.", [
+        (f'{{type="{source}"}}', metrics.get(f"load_time_{source}_ms", 0) / 1000) for source in ("text", "pdf", "web")
+    ])
+    append_metric(lines, "document_loader_characters_processed", "gauge", "Characters processed in the latest run.", [
+        ("", metrics.get("total_characters_processed", 0)),
+    ])
+    append_metric(lines, "document_loader_errors", "gauge", "Loader errors in the latest run.", [
+        ("", metrics.get("errors", 0)),
+    ])
+    append_metric(lines, "document_loader_success_rate_percent", "gauge", "Share of loader steps that succeeded in the latest run.", [
+        ("", metrics.get("success_rate", 0.0)),
+    ])
+    append_metric(lines, "document_loader_last_update_timestamp_seconds", "gauge", "Unix time the metrics were last written.", [
+        ("", timestamp_seconds(metrics.get("last_update"))),
+    ])
+    return "\n".join(lines) + "\n"
+
+# Scrapes are answered from metrics.json as parsed on its last change: the file is only
+# re-read when its mtime or size differs, and the rendered text is reused until then
+_metrics_cache = MetricsCache(lambda: file_version(METRICS_FILE), load_metrics, render_prometheus)
+
 @app.route('/')
 def dashboard():
     """Main dashboard page"""
@@ -77,6 +107,11 @@ def signal_handler(sig, frame):
     print("\nShutting down dashboard...")
     sys.exit(0)
 
+@app.route('/metrics/prometheus')
+def prometheus_metrics():
+    """Prometheus text-format exposition of the cached metrics."""
+    return Response(_metrics_cache.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Bulk feedback summarization
+Streams a JSONL or CSV file of feedback records through few_shot_structured_summarize
+and appends one JSON result per record to an output JSONL file.
+
+Results are written in input order, so the output always ends at a record boundary:
+--resume picks up after the last result already in the output file.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from prompt_engineer_app import few_shot_structured_summarize
+
+# Field names tried, in order, when a record doesn't name its text column explicitly
+TEXT_FIELDS = ("feedback", "text", "content", "review")
+
+class TokenBucket:
+    """
+    Client-side rate limiter: `rate` tokens are added per second, up to `capacity`.
+    acquire() blocks until a token is available; safe to share between threads.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            # Sleep outside the lock so other threads can refill/check concurrently
+            time.sleep(wait)
+
+def _record_text(record, text_field=None):
+    if isinstance(record, str):
+        return record
+    if text_field:
+        return record.get(text_field)
+    for field in TEXT_FIELDS:
+        if record.get(field):
+            return record[field]
+    return None
+
+def _parse_jsonl(lines):
+    """Yields (record, error) per non-blank line; a malformed line becomes (None, message)."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), None
+        except json.JSONDecodeError as e:
+            yield None, f"Malformed JSON record: {e}"
+
+def iter_feedback_records(path, text_field=None):
+    """
+    Yield (offset, record_id, text, error) for each record in a .jsonl or .csv file, one line at a time.
+    JSONL lines may be objects or bare strings; record_id is the record's "id" field when present.
+    A line that isn't valid JSON, or holds some other JSON value, keeps its offset and comes
+    with an error message instead of text, so one bad line doesn't stop the run.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = ((row, None) for row in csv.DictReader(f))
+        else:
+            rows = _parse_jsonl(f)
+        for offset, (record, error) in enumerate(rows):
+            if error is None and not isinstance(record, (dict, str)):
+                error = f"Record is not a JSON object or string: {type(record).__name__}"
+            if error is not None:
+                yield offset, None, None, error
+                continue
+            record_id = record.get("id") if isinstance(record, dict) else None
+            yield offset, record_id, _record_text(record, text_field), None
+
+def resume_offset(output_path, default=0):
+    """
+    Offset following the last complete result in output_path (`default` if there is none).
+    A trailing partial line left by a crash mid-write is cut off so appends start clean.
+    """
+    if not os.path.exists(output_path):
+        return default
+    next_offset = default
+    complete_bytes = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            complete_bytes += len(line)
+            if line.strip():
+                next_offset = json.loads(line)["offset"] + 1
+    if complete_bytes < os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(complete_bytes)
+    return next_offset
+
+def _summarize_record(offset, record_id, text, limiter, use_cache=None, error=None):
+    result = {"offset": offset, "id": record_id, "summary": None, "raw": None, "error": error}
+    if error is not None:
+        return result
+    if not text:
+        result["error"] = "Record has no feedback text"
+        return result
+    if limiter:
+        limiter.acquire()
+    try:
+        summary = few_shot_structured_summarize(text, verbose=False, use_cache=use_cache)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    if isinstance(summary, dict):
+        result["summary"] = summary
+    else:
+        result["raw"] = summary
+        result["error"] = "Could not parse JSON from response"
+    return result
+
+def summarize_file(input_path, output_path, workers=4, rate=None, burst=None, start_offset=0,
+                   limit=None, text_field=None, progress=None, use_cache=None):
+    """
+    Summarize records [start_offset, start_offset + limit) of input_path into output_path.
+
+    At most `workers` requests run at once and at most 2 * workers records are held in
+    memory; `rate` (requests/second) caps the request rate across all workers.
+    Each result is appended and flushed as soon as it and every earlier record are done.
+    use_cache=True also caches the sampled summarization calls, so re-running unchanged
+    records costs no requests.
+    Returns {"processed", "succeeded", "failed", "next_offset"}.
+    """
+    limiter = TokenBucket(rate, burst) if rate else None
+    stats = {"processed": 0, "succeeded": 0, "failed": 0, "next_offset": start_offset}
+    window = deque()
+
+    def write_next(out):
+        result = window.popleft().result()
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        stats["processed"] += 1
+        stats["succeeded" if result["error"] is None else "failed"] += 1
+        stats["next_offset"] = result["offset"] + 1
+        if progress:
+            progress(result, stats)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            open(output_path, "a", encoding="utf-8") as out:
+        for offset, record_id, text, error in iter_feedback_records(input_path, text_field):
+            if offset < start_offset:
+                continue
+            if limit is not None and offset >= start_offset + limit:
+                break
+            window.append(pool.submit(_summarize_record, offset, record_id, text, limiter, use_cache, error))
+            if len(window) >= 2 * workers:
+                write_next(out)
+        while window:
+            write_next(out)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a JSONL/CSV file of customer feedback")
+    parser.add_argument("input", help="Input .jsonl or .csv file")
+    parser.add_argument("output", help="Output .jsonl file (appended to)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent LLM requests")
+    parser.add_argument("--rate", type=float, default=None, help="Max requests per second")
+    parser.add_argument("--burst", type=float, default=None, help="Token bucket capacity (default: rate)")
+    parser.add_argument("--text-field", default=None, help="Field holding the feedback text")
+    parser.add_argument("--offset", type=int, default=None, help="First record to process")
+    parser.add_argument("--resume", action="store_true", help="Continue after the records already in output")
+    parser.add_argument("--limit", type=int, default=None, help="Process at most this many records")
+    parser.add_argument("--cache-sampled", action="store_true",
+                        help="Cache the sampled (temperature > 0) summaries so re-runs are free")
+    args = parser.parse_args(argv)
+
+    start_offset = args.offset or 0
+    if args.resume:
+        start_offset = resume_offset(args.output, default=start_offset)
+        print(f"Resuming at record {start_offset}")
+
+    def progress(result, stats):
+        status = "ok" if result["error"] is None else f"error: {result['error']}"
+        print(f"[{result['offset']}] {status} ({stats['processed']} done)")
+
+    stats = summarize_file(args.input, args.output, workers=args.workers, rate=args.rate, burst=args.burst,
+                           start_offset=start_offset, limit=args.limit, text_field=args.text_field,
+                           progress=progress, use_cache=True if args.cache_sampled else None)
+    print(f"\nProcessed {stats['processed']} records: {stats['succeeded']} succeeded, "
+          f"{stats['failed']} failed. Next offset: {stats['next_offset']}")
+    return 0 if stats["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
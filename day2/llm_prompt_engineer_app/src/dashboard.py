@@ -19,12 +19,32 @@ metrics = {
     "total_tokens": 0,
     "zero_shot_requests": 0,
     "few_shot_requests": 0,
+    "dropped_events": 0,
     "last_request_time": None,
     "requests": []
 }
 
+# Guards `metrics`: /update and /update/batch can arrive while /metrics is being served
+metrics_lock = threading.Lock()
+
+# Upper bound on events accepted by one POST /update/batch
+MAX_BATCH_EVENTS = 10000
+
+def update_metrics_batch(events, dropped=0):
+    """Apply a batch of {"success", "tokens", "type"} events; `dropped` counts events the sender discarded"""
+    with metrics_lock:
+        for event in events:
+            _apply_update(success=event.get("success", True), tokens=int(event.get("tokens") or 0),
+                          request_type=event.get("type") or None)
+        metrics["dropped_events"] += dropped
+
 def update_metrics(response_data=None, success=True, tokens=0, request_type=None):
     """Update metrics with new request data"""
+    with metrics_lock:
+        _apply_update(response_data, success, tokens, request_type)
+
+def _apply_update(response_data=None, success=True, tokens=0, request_type=None):
+    # Caller must hold metrics_lock
     metrics["total_requests"] += 1
     if success:
         metrics["successful_requests"] += 1
@@ -62,7 +82,9 @@ class DashboardHandler(BaseHTTPRequestHandler):
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps(metrics, indent=2).encode())
+            with metrics_lock:
+                body = json.dumps(metrics, indent=2)
+            self.wfile.write(body.encode())
         elif parsed_path.path == '/update':
             # Update metrics endpoint
             query_params = parse_qs(parsed_path.query)
@@ -77,6 +99,34 @@ class DashboardHandler(BaseHTTPRequestHandler):
         else:
             self.send_response(404)
             self.end_headers()
+
+    def do_POST(self):
+        parsed_path = urlparse(self.path)
+        if parsed_path.path == '/update/batch':
+            # Batched ingestion from MetricsEmitter: {"events": [{"success": true, "tokens": 42, "type": "few_shot"}], "dropped": 0}
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                events = body.get("events", [])
+                if not isinstance(events, list) or len(events) > MAX_BATCH_EVENTS:
+                    raise ValueError(f"'events' must be a list of at most {MAX_BATCH_EVENTS} events")
+                for event in events:
+                    int(event.get("tokens") or 0)
+                dropped = int(body.get("dropped") or 0)
+            except (ValueError, TypeError, AttributeError) as e:
+                self.send_response(400)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({"status": "error", "error": str(e)}).encode())
+                return
+            update_metrics_batch(events, dropped)
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({"status": "updated", "events": len(events)}).encode())
+        else:
+            self.send_response(404)
+            self.end_headers()
     
     def get_dashboard_html(self):
         success_rate = 0
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON object extraction from streamed LLM output
+Tracks brace depth while skipping over string literals (and escapes inside them),
+so braces in values like "use {name}" don't confuse it. Each top-level {...} is
+parsed and returned the moment its closing brace arrives.
+"""
+import json
+
+class JSONObjectStream:
+    """
+    Feed text deltas in order; feed() returns the objects completed by that delta.
+    Text outside top-level objects (prose, code fences) is skipped. Candidates that
+    fail to parse are counted in `invalid` and scanning continues after them.
+    Only the text of the object currently open is buffered.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.invalid = 0
+
+    def feed(self, delta):
+        objects = []
+        start = 0 if self._depth else None
+        for i, char in enumerate(delta):
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    start = i
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(delta[start:i + 1])
+                    text = "".join(self._buffer)
+                    self._buffer = []
+                    start = None
+                    try:
+                        objects.append(json.loads(text))
+                    except json.JSONDecodeError:
+                        self.invalid += 1
+        if self._depth and start is not None:
+            self._buffer.append(delta[start:])
+        return objects
+
+def extract_json_objects(text):
+    """All complete top-level JSON objects in `text`, in order."""
+    return JSONObjectStream().feed(text)
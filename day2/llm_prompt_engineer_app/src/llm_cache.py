@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Response cache for call_llm
+An in-memory LRU sits in front of a SQLite file, so identical requests are answered
+locally within a run and across runs. Keys are (model, prompt hash, temperature, max_tokens).
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def cache_key(model, prompt, temperature, max_tokens):
+    """Stable key for one request; the prompt is hashed so keys stay small."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    # float() so 0 and 0.0 (or 1 and 1.0) name the same request
+    return f"{model}|{float(temperature)!r}|{max_tokens}|{prompt_hash}"
+
+class ResponseCache:
+    """
+    Two-level response cache.
+
+    - Memory: LRU of up to `max_entries` responses.
+    - Disk: SQLite at `path` (None keeps the cache in memory only), trimmed to
+      `max_bytes` of response text by evicting least recently used rows.
+
+    Responses to requests with temperature > 0 are sampled, so they are not cached
+    unless `cache_sampled` is set. Safe to share between threads.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 cache_sampled=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_sampled = cache_sampled
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+    def _connect(self):
+        # Caller must hold self._lock; opened lazily so importing the app never touches disk
+        if self._db is None and self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._db.commit()
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self._db
+
+    def should_cache(self, temperature):
+        return temperature == 0 or self.cache_sampled
+
+    def count_bypass(self):
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+            db = self._connect()
+            row = db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone() if db else None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            self.stats["disk_hits"] += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key, response):
+        with self._lock:
+            self._remember(key, response)
+            db = self._connect()
+            if db is None:
+                return
+            size = len(response.encode("utf-8"))
+            previous = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            db.execute("INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                       (key, response, size, time.time()))
+            self._disk_bytes += size - (previous[0] if previous else 0)
+            if self._disk_bytes > self.max_bytes:
+                self._evict_disk(db)
+            db.commit()
+
+    def _remember(self, key, response):
+        # Caller must hold self._lock
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, db):
+        # Caller must hold self._lock; trims to 90% of the cap so eviction doesn't run on every put
+        target = self.max_bytes * 0.9
+        while self._disk_bytes > target:
+            rows = db.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._disk_bytes <= target:
+                    break
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._memory.pop(key, None)
+                self._disk_bytes -= size
+                self.stats["evictions"] += 1
+
+    def hit_rate(self):
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+            self._disk_bytes = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
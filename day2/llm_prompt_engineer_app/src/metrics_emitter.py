@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Background metrics emitter for the dashboard
+emit() only enqueues; a flush thread drains the queue and sends the events in
+batches to POST /update/batch, so a slow or missing dashboard never blocks an LLM call.
+"""
+import queue
+import atexit
+import threading
+import requests
+
+class MetricsEmitter:
+    """
+    Non-blocking dashboard reporter.
+
+    Events wait in a queue of at most `max_queue` entries; when it is full new events
+    are dropped and counted rather than blocking the caller. The flush thread sends
+    whatever has arrived every `flush_interval` seconds (or sooner once `max_batch`
+    events are waiting) over one reused HTTP session. Batches that fail to send are
+    discarded too (metrics are best-effort) and counted in `failed`; `dropped` counts
+    only queue-full drops. The next successful post reports both to the dashboard as
+    dropped events.
+    """
+
+    def __init__(self, base_url, max_queue=1000, max_batch=200, flush_interval=1.0, timeout=1.0):
+        self.url = f"{base_url.rstrip('/')}/update/batch"
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.stats = {"emitted": 0, "dropped": 0, "sent": 0, "failed": 0, "batches": 0}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._lost_reported = 0
+        self._stopping = threading.Event()
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="metrics-emitter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, **event):
+        """Queue one event (e.g. success=True, tokens=120, type="few_shot"); never blocks."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._stats_lock:
+                self.stats["dropped"] += 1
+            return
+        with self._stats_lock:
+            self.stats["emitted"] += 1
+
+    def _next_batch(self):
+        """Wait up to flush_interval for events, then take whatever is queued (up to max_batch)."""
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+        # Final drain on close()
+        while True:
+            batch = self._next_batch() if not self._queue.empty() else []
+            if not batch:
+                break
+            self._send(batch)
+
+    def _send(self, batch):
+        # Events dropped or failed since the last successful post ride along so the dashboard can show them
+        with self._stats_lock:
+            lost = self.stats["dropped"] + self.stats["failed"] - self._lost_reported
+        try:
+            response = self._session.post(self.url, json={"events": batch, "dropped": lost}, timeout=self.timeout)
+            response.raise_for_status()
+            outcome = "sent"
+        except requests.RequestException:
+            outcome = "failed"
+        with self._stats_lock:
+            self.stats[outcome] += len(batch)
+            self.stats["batches"] += 1
+            if outcome == "sent":
+                self._lost_reported += lost
+
+    def close(self, timeout=2.0):
+        """Flush queued events (waiting at most `timeout` seconds) and stop the thread."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._session.close()
@@ -2,6 +2,9 @@ import os
 import openai
 import json
 from dotenv import load_dotenv
+from llm_cache import ResponseCache, cache_key
+from retry_policy import RetryBudget, RetryPolicy
+from json_stream import JSONObjectStream
 
 # Load environment variables
 load_dotenv()
@@ -10,6 +13,29 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 if not openai.api_key:
     raise ValueError("OPENAI_API_KEY not found in .env file. Please set it.")
 
+# call_llm owns retries; turn off the SDK's built-in ones so attempts don't multiply
+openai.max_retries = 0
+
+# --- Retry Policy ---
+# One budget for the whole process: during an outage retries stop once they would
+# add more than ~20% on top of first attempts
+retry_budget = RetryBudget(ratio=0.2, max_tokens=10)
+retry_policy = RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=20.0, budget=retry_budget)
+
+# --- Response Cache ---
+# LLM_CACHE=0 disables it; LLM_CACHE_SAMPLED=1 (or --cache-sampled on the command line,
+# which passes use_cache=True) also caches temperature > 0 responses, e.g. to make
+# re-runs of a nightly batch free when the inputs haven't changed
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "llm_responses.sqlite")
+response_cache = None
+if os.getenv("LLM_CACHE", "1") != "0":
+    response_cache = ResponseCache(
+        path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        cache_sampled=os.getenv("LLM_CACHE_SAMPLED", "0") == "1",
+    )
+
 # --- Customer Feedback Data ---
 CUSTOMER_FEEDBACK_TEXT = """
 The new XYZ-Pro vacuum cleaner worked perfectly for the first two weeks,
@@ -19,50 +45,120 @@ is not as advertised; it only lasts about 20 minutes on full power.
 The mobile app for scheduling cleans is intuitive though, that's a plus.
 """
 
-def call_llm(prompt, model="gpt-3.5-turbo", max_tokens=150, temperature=0.7):
+def call_llm(prompt, model="gpt-3.5-turbo", max_tokens=150, temperature=0.7, use_cache=None):
     """
     Generic function to call the LLM API.
-    Includes basic error handling and retry mechanism.
+    Transient errors (429, 5xx, connection failures) are retried by retry_policy.
+    Responses go through response_cache: use_cache=None follows the cache's temperature
+    policy, True forces caching and False skips the cache for this call.
+    """
+    key, cached = _cache_lookup(prompt, model, max_tokens, temperature, use_cache)
+    if cached is not None:
+        return cached
+
+    def request():
+        return openai.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+
+    response = _call_with_retries(request)
+    content = response.choices[0].message.content.strip()
+    if key is not None:
+        response_cache.put(key, content)
+    return content
+
+def call_llm_stream(prompt, model="gpt-3.5-turbo", max_tokens=150, temperature=0.7, use_cache=None,
+                    stop_when=None):
+    """
+    Streaming variant of call_llm: yields text deltas as they arrive.
+    Closing the generator early cancels the request, so unneeded output tokens are
+    never generated. stop_when, if given, is called with each delta (a cached response
+    arrives as one delta); once it returns True the request is cancelled after that
+    delta and the text so far counts as the full response. Only streams that run to
+    completion or are ended by stop_when are stored in the cache.
     """
-    for attempt in range(3): # Retry up to 3 times
-        try:
-            response = openai.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
-            return response.choices[0].message.content.strip()
-        except openai.APIError as e:
-            print(f"API Error on attempt {attempt + 1}: {e}")
-            if attempt < 2:
-                print("Retrying in 2 seconds...")
-                import time
-                time.sleep(2)
-            else:
-                raise
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            raise
-    return None
-
-def zero_shot_summarize(feedback_text):
+    key, cached = _cache_lookup(prompt, model, max_tokens, temperature, use_cache)
+    if cached is not None:
+        if stop_when is not None:
+            stop_when(cached)
+        yield cached
+        return
+
+    def request():
+        return openai.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+
+    stream = _call_with_retries(request)
+    parts = []
+    completed = False
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                delta = chunk.choices[0].delta.content
+                parts.append(delta)
+                stop = stop_when is not None and stop_when(delta)
+                yield delta
+                if stop:
+                    break
+        completed = True
+    finally:
+        stream.close()
+        if completed and key is not None:
+            response_cache.put(key, "".join(parts).strip())
+
+def _cache_lookup(prompt, model, max_tokens, temperature, use_cache):
+    """Returns (key, cached response); key is None when this call shouldn't be cached."""
+    if response_cache is None or use_cache is False:
+        return None, None
+    if not (use_cache or response_cache.should_cache(temperature)):
+        response_cache.count_bypass()
+        return None, None
+    key = cache_key(model, prompt, temperature, max_tokens)
+    return key, response_cache.get(key)
+
+def _call_with_retries(request):
+    def report_retry(attempt, error, delay):
+        print(f"API Error on attempt {attempt}: {error}")
+        print(f"Retrying in {delay:.2f} seconds...")
+
+    try:
+        return retry_policy.call(request, on_retry=report_retry)
+    except openai.APIError as e:
+        print(f"API Error (giving up): {e}")
+        raise
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        raise
+
+def zero_shot_summarize(feedback_text, use_cache=None):
     """
     Demonstrates zero-shot prompting for summarization.
+    use_cache is passed to call_llm (True caches this sampled call).
     """
     print("\\n--- Zero-Shot Summarization ---")
     prompt = f"Summarize the following customer feedback:\\n\\n{feedback_text}"
-    summary = call_llm(prompt)
+    summary = call_llm(prompt, use_cache=use_cache)
     print("Zero-shot Summary:")
     print(summary)
     return summary
 
-def few_shot_structured_summarize(feedback_text):
+def few_shot_structured_summarize(feedback_text, verbose=True, use_cache=None):
     """
     Demonstrates few-shot prompting with structured output and persona.
     Includes the assignment's new requirements (priority, max length for issue).
+    Pass verbose=False to skip the console output (used by batch mode); use_cache is
+    passed to call_llm_stream (True caches this sampled call).
     """
-    print("\\n--- Few-Shot Structured Summarization (with persona, delimiters, JSON output) ---")
+    if verbose:
+        print("\\n--- Few-Shot Structured Summarization (with persona, delimiters, JSON output) ---")
     prompt = f"""
 You are an expert product analyst, highly skilled in identifying critical product issues from customer feedback.
 Your task is to summarize the provided customer feedback into a structured JSON object.
@@ -86,32 +182,48 @@ Customer Feedback to summarize:
 
 Please provide the output in JSON format only.
 """
-    result = call_llm(prompt, max_tokens=200, temperature=0.3)
-    print("Few-shot Structured Summary:")
-    print(result)
-    try:
-        # Try to parse JSON from the response
-        json_start = result.find("{")
-        json_end = result.rfind("}") + 1
-        if json_start >= 0 and json_end > json_start:
-            json_str = result[json_start:json_end]
-            parsed = json.loads(json_str)
+    # Stream the reply and stop as soon as the first JSON object closes; stopping through
+    # stop_when (rather than closing the stream) lets the reply so far be cached
+    extractor = JSONObjectStream()
+    objects = []
+    def first_object_closed(delta):
+        objects.extend(extractor.feed(delta))
+        return bool(objects)
+    parts = list(call_llm_stream(prompt, max_tokens=200, temperature=0.3, use_cache=use_cache,
+                                 stop_when=first_object_closed))
+    parsed = objects[0] if objects else None
+    result = "".join(parts).strip()
+    if verbose:
+        print("Few-shot Structured Summary:")
+        print(result)
+    if parsed is not None:
+        if verbose:
             print("\\nParsed JSON:")
             print(json.dumps(parsed, indent=2))
-            return parsed
-    except json.JSONDecodeError:
+        return parsed
+    if verbose:
         print("Warning: Could not parse JSON from response")
     return result
 
 if __name__ == "__main__":
+    import sys
+
+    # Cache these sampled (temperature > 0) calls too, so an unchanged re-run is free
+    use_cache = True if "--cache-sampled" in sys.argv else None
+
     print("=" * 60)
     print("LLM Prompt Engineering Demo")
     print("=" * 60)
     
     # Zero-shot summarization
-    zero_shot_summarize(CUSTOMER_FEEDBACK_TEXT)
+    zero_shot_summarize(CUSTOMER_FEEDBACK_TEXT, use_cache=use_cache)
     
     print("\\n" + "=" * 60)
     
     # Few-shot structured summarization
-    few_shot_structured_summarize(CUSTOMER_FEEDBACK_TEXT)
+    few_shot_structured_summarize(CUSTOMER_FEEDBACK_TEXT, use_cache=use_cache)
+
+    if response_cache is not None:
+        stats = response_cache.stats
+        print(f"\\nResponse cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+              f"{stats['misses']} misses, {stats['bypassed']} bypassed (temperature > 0; see --cache-sampled)")
@@ -2,6 +2,7 @@ import os
 import sys
 import requests
 import json
+from metrics_emitter import MetricsEmitter
 from prompt_engineer_app import (
     CUSTOMER_FEEDBACK_TEXT,
     zero_shot_summarize,
@@ -11,19 +12,14 @@ from prompt_engineer_app import (
 
 DASHBOARD_URL = os.getenv("DASHBOARD_URL", "http://localhost:8080")
 
+# Reports are queued and posted in batches from a background thread
+metrics_emitter = MetricsEmitter(DASHBOARD_URL)
+
 def update_dashboard(success=True, tokens=0, request_type=None):
-    """Update dashboard metrics"""
-    try:
-        requests.get(f"{DASHBOARD_URL}/update", params={
-            "success": "true" if success else "false",
-            "tokens": str(tokens),
-            "type": request_type or ""
-        }, timeout=1)
-    except:
-        # Dashboard might not be running, that's okay
-        pass
+    """Queue a dashboard metrics update; returns immediately even if the dashboard is down"""
+    metrics_emitter.emit(success=success, tokens=int(tokens), type=request_type or "")
 
-def zero_shot_summarize_with_dashboard(feedback_text, demo_mode=False):
+def zero_shot_summarize_with_dashboard(feedback_text, demo_mode=False, use_cache=None):
     """Zero-shot summarization with dashboard integration"""
     try:
         if demo_mode:
@@ -38,7 +34,7 @@ def zero_shot_summarize_with_dashboard(feedback_text, demo_mode=False):
             update_dashboard(success=True, tokens=tokens, request_type="zero_shot")
             return summary
         else:
-            summary = zero_shot_summarize(feedback_text)
+            summary = zero_shot_summarize(feedback_text, use_cache=use_cache)
             # Estimate tokens (rough approximation)
             tokens = len(feedback_text.split()) + len(summary.split()) if summary else 0
             update_dashboard(success=True, tokens=tokens, request_type="zero_shot")
@@ -48,7 +44,7 @@ def zero_shot_summarize_with_dashboard(feedback_text, demo_mode=False):
         update_dashboard(success=False, tokens=0, request_type="zero_shot")
         return None
 
-def few_shot_structured_summarize_with_dashboard(feedback_text, demo_mode=False):
+def few_shot_structured_summarize_with_dashboard(feedback_text, demo_mode=False, use_cache=None):
     """Few-shot structured summarization with dashboard integration"""
     try:
         if demo_mode:
@@ -68,7 +64,7 @@ def few_shot_structured_summarize_with_dashboard(feedback_text, demo_mode=False)
             update_dashboard(success=True, tokens=tokens, request_type="few_shot")
             return result_json
         else:
-            result = few_shot_structured_summarize(feedback_text)
+            result = few_shot_structured_summarize(feedback_text, use_cache=use_cache)
             # Estimate tokens (rough approximation)
             tokens = len(feedback_text.split()) * 3  # Few-shot uses more tokens
             update_dashboard(success=True, tokens=tokens, request_type="few_shot")
@@ -83,6 +79,8 @@ if __name__ == "__main__":
     
     # Check for demo mode flag
     demo_mode = "--demo" in sys.argv or os.getenv("DEMO_MODE", "false").lower() == "true"
+    # Cache the sampled (temperature > 0) calls too, so an unchanged re-run is free
+    use_cache = True if "--cache-sampled" in sys.argv else None
     
     print("=" * 60)
     print("LLM Prompt Engineering Demo with Dashboard")
@@ -102,7 +100,7 @@ if __name__ == "__main__":
     
     # Zero-shot summarization
     try:
-        zero_shot_summarize_with_dashboard(CUSTOMER_FEEDBACK_TEXT, demo_mode=demo_mode)
+        zero_shot_summarize_with_dashboard(CUSTOMER_FEEDBACK_TEXT, demo_mode=demo_mode, use_cache=use_cache)
     except Exception as e:
         print(f"Zero-shot summarization failed: {e}")
         # Dashboard already updated with failure
@@ -111,10 +109,13 @@ if __name__ == "__main__":
     
     # Few-shot structured summarization
     try:
-        few_shot_structured_summarize_with_dashboard(CUSTOMER_FEEDBACK_TEXT, demo_mode=demo_mode)
+        few_shot_structured_summarize_with_dashboard(CUSTOMER_FEEDBACK_TEXT, demo_mode=demo_mode, use_cache=use_cache)
     except Exception as e:
         print(f"Few-shot summarization failed: {e}")
         # Dashboard already updated with failure
     
+    metrics_emitter.close()
+    stats = metrics_emitter.stats
+    print(f"\\nDashboard reports: {stats['sent']} sent, {stats['failed']} failed, {stats['dropped']} dropped")
     print("\\n" + "=" * 60)
     print("Demo completed! Check dashboard at:", DASHBOARD_URL)
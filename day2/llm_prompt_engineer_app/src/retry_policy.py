@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Retry policy for call_llm
+Decorrelated-jitter exponential backoff that honors Retry-After, retries only errors
+that can succeed on a second try (429, 408/409, 5xx, connection failures), and draws
+from a process-wide retry budget so retries can't multiply load during an outage.
+"""
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+import openai
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+class RetryBudget:
+    """
+    Token bucket shared by every caller: each first attempt deposits `ratio` tokens
+    (up to `max_tokens`), each retry withdraws one. With ratio=0.2 retries can add at
+    most ~20% on top of normal traffic once the initial `max_tokens` are spent.
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self):
+        """Take one retry token; returns False (and counts it) when the budget is spent."""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+def is_retryable(error):
+    """True for transient failures: timeouts, connection errors, 408/409/429 and 5xx."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+def retry_after_seconds(error):
+    """Server-requested delay from retry-after-ms / Retry-After headers, or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Runs a call with up to `max_attempts` attempts.
+
+    Delays follow decorrelated jitter: next = uniform(base_delay, 3 * previous), capped
+    at max_delay. A Retry-After from the server is used as a floor; if it asks for more
+    than max_retry_after we give up instead of holding the caller.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=20.0, max_retry_after=60.0,
+                 budget=None, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self.sleep = sleep
+
+    def next_delay(self, previous_delay, error=None):
+        delay = min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous_delay * 3)))
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, fn, on_retry=None):
+        """
+        Call fn() until it succeeds or a non-retryable error, the attempt limit, an
+        oversized Retry-After or an empty retry budget stops us; the last error is re-raised.
+        on_retry(attempt, error, delay) is called before each sleep.
+        """
+        if self.budget is not None:
+            self.budget.record_request()
+        delay = self.base_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.max_attempts or not is_retryable(e):
+                    raise
+                retry_after = retry_after_seconds(e)
+                if retry_after is not None and retry_after > self.max_retry_after:
+                    raise
+                if self.budget is not None and not self.budget.try_acquire():
+                    raise
+                delay = self.next_delay(delay, e)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                self.sleep(delay)
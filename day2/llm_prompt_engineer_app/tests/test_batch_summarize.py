@@ -0,0 +1,103 @@
+import pytest
+import os
+import sys
+import json
+import time
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import batch_summarize
+from batch_summarize import TokenBucket, summarize_file, resume_offset
+
+def fake_summarize(feedback_text, verbose=True, use_cache=None):
+    if "unparseable" in feedback_text:
+        return "not json"
+    return {"issue": feedback_text, "sentiment": "Negative", "product_area": "Hardware", "priority": "High"}
+
+@pytest.fixture
+def feedback_file(tmp_path):
+    path = tmp_path / "feedback.jsonl"
+    with open(path, "w") as f:
+        for i in range(10):
+            f.write(json.dumps({"id": f"fb-{i}", "feedback": f"complaint {i}"}) + "\n")
+    return str(path)
+
+def read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_summarize_file_writes_results_in_input_order(feedback_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_summarize, "few_shot_structured_summarize", fake_summarize)
+    output = str(tmp_path / "out.jsonl")
+    stats = summarize_file(feedback_file, output, workers=3)
+    assert stats == {"processed": 10, "succeeded": 10, "failed": 0, "next_offset": 10}
+    results = read_results(output)
+    assert [r["id"] for r in results] == [f"fb-{i}" for i in range(10)]
+    assert results[4]["summary"]["issue"] == "complaint 4"
+
+def test_summarize_file_reads_csv_and_records_failures(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_summarize, "few_shot_structured_summarize", fake_summarize)
+    source = tmp_path / "feedback.csv"
+    source.write_text("id,text\na,fine\nb,unparseable reply\nc,\n")
+    output = str(tmp_path / "out.jsonl")
+    stats = summarize_file(str(source), output, workers=2)
+    assert stats["succeeded"] == 1 and stats["failed"] == 2
+    results = read_results(output)
+    assert results[1]["raw"] == "not json"
+    assert results[2]["error"] == "Record has no feedback text"
+
+def test_resume_continues_after_last_written_result(feedback_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_summarize, "few_shot_structured_summarize", fake_summarize)
+    output = str(tmp_path / "out.jsonl")
+    summarize_file(feedback_file, output, workers=2, limit=4)
+    # Simulate a crash in the middle of writing the next line
+    with open(output, "a") as f:
+        f.write('{"offset": 4, "id": "fb-')
+
+    start = resume_offset(output)
+    assert start == 4
+    summarize_file(feedback_file, output, workers=2, start_offset=start)
+    assert [r["offset"] for r in read_results(output)] == list(range(10))
+
+def test_bad_jsonl_lines_become_error_results_and_resume_moves_past_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_summarize, "few_shot_structured_summarize", fake_summarize)
+    source = tmp_path / "feedback.jsonl"
+    source.write_text('{"id": "a", "feedback": "fine"}\n'
+                      '{"id": "b", "feedback": \n'
+                      '[1, 2]\n'
+                      '42\n'
+                      '{"id": "e", "feedback": "also fine"}\n')
+    output = str(tmp_path / "out.jsonl")
+    stats = summarize_file(str(source), output, workers=2, limit=3)
+    assert stats == {"processed": 3, "succeeded": 1, "failed": 2, "next_offset": 3}
+    summarize_file(str(source), output, workers=2, start_offset=resume_offset(output))
+    results = read_results(output)
+    assert [r["offset"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[1]["error"].startswith("Malformed JSON record")
+    assert results[2]["error"] == "Record is not a JSON object or string: list"
+    assert results[3]["error"] == "Record is not a JSON object or string: int"
+    assert results[4]["summary"]["issue"] == "also fine"
+
+def test_cache_sampled_flag_caches_the_summarization_calls(feedback_file, tmp_path, monkeypatch):
+    use_cache_seen = []
+    def recording_summarize(feedback_text, verbose=True, use_cache=None):
+        use_cache_seen.append(use_cache)
+        return fake_summarize(feedback_text)
+    monkeypatch.setattr(batch_summarize, "few_shot_structured_summarize", recording_summarize)
+    output = str(tmp_path / "out.jsonl")
+    assert batch_summarize.main([feedback_file, output, "--limit", "2"]) == 0
+    assert batch_summarize.main([feedback_file, output, "--resume", "--limit", "2", "--cache-sampled"]) == 0
+    assert use_cache_seen == [None, None, True, True]
+
+def test_token_bucket_limits_rate_across_threads():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 acquisitions with one token up front need at least 19 refills at 50/s
+    assert time.monotonic() - start >= 19 / 50 * 0.9
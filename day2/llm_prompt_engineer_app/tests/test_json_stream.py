@@ -0,0 +1,82 @@
+import pytest
+import os
+import sys
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import prompt_engineer_app
+from json_stream import JSONObjectStream, extract_json_objects
+
+def test_objects_are_emitted_as_soon_as_they_close():
+    stream = JSONObjectStream()
+    assert stream.feed('Sure! Here is the JSON:\n```json\n{"issue": "Bat') == []
+    assert stream.feed('tery drain", "meta": {"score": 3}') == []
+    assert stream.feed('}\n``` {"second": true}') == [
+        {"issue": "Battery drain", "meta": {"score": 3}},
+        {"second": True}
+    ]
+
+def test_braces_and_quotes_inside_strings_are_ignored():
+    text = r'{"issue": "App shows {name} instead of \"}\" text", "tags": ["a}", "{b"]}'
+    assert extract_json_objects(text) == [{"issue": 'App shows {name} instead of "}" text', "tags": ["a}", "{b"]}]
+
+def test_escape_split_across_deltas():
+    stream = JSONObjectStream()
+    assert stream.feed('{"quote": "say \\') == []
+    assert stream.feed('"hi\\"", "n": 1}') == [{"quote": 'say "hi"', "n": 1}]
+
+def test_invalid_candidates_are_skipped():
+    stream = JSONObjectStream()
+    assert stream.feed("{'single': 'quotes'} then {\"ok\": 1}") == [{"ok": 1}]
+    assert stream.invalid == 1
+
+def test_few_shot_summarize_stops_streaming_after_first_object(monkeypatch):
+    deltas = ['{"issue": "Brush stops", ', '"sentiment": "Negative", "product_area": "Hardware", ',
+              '"priority": "High"}', "\nLet me know if you need anything else", " more tokens"]
+    consumed = []
+    closed = []
+
+    class FakeStream:
+        def __iter__(self):
+            for delta in deltas:
+                consumed.append(delta)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+        def close(self):
+            closed.append(True)
+
+    monkeypatch.setattr(prompt_engineer_app.openai.chat.completions, "create", lambda **kwargs: FakeStream())
+    monkeypatch.setattr(prompt_engineer_app, "response_cache", None)
+
+    result = prompt_engineer_app.few_shot_structured_summarize("feedback", verbose=False)
+    assert result == {"issue": "Brush stops", "sentiment": "Negative", "product_area": "Hardware", "priority": "High"}
+    assert consumed == deltas[:3]
+    assert closed == [True]
+
+def test_few_shot_summarize_caches_the_reply_it_stopped_on(monkeypatch):
+    deltas = ['{"issue": "Brush stops", "sentiment": "Negative", ', '"product_area": "Hardware", "priority": "High"}',
+              "\nAnything else?"]
+    calls = []
+
+    class FakeStream:
+        def __iter__(self):
+            for delta in deltas:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+        def close(self):
+            pass
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return FakeStream()
+
+    monkeypatch.setattr(prompt_engineer_app.openai.chat.completions, "create", create)
+    cache = prompt_engineer_app.ResponseCache(cache_sampled=True)
+    monkeypatch.setattr(prompt_engineer_app, "response_cache", cache)
+
+    first = prompt_engineer_app.few_shot_structured_summarize("feedback", verbose=False)
+    second = prompt_engineer_app.few_shot_structured_summarize("feedback", verbose=False)
+    assert first == second == {"issue": "Brush stops", "sentiment": "Negative", "product_area": "Hardware", "priority": "High"}
+    assert len(calls) == 1
+    assert cache.stats["memory_hits"] == 1
+    assert cache.stats["misses"] == 1
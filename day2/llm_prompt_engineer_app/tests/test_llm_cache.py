@@ -0,0 +1,88 @@
+import pytest
+import os
+import sys
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import prompt_engineer_app
+from llm_cache import ResponseCache, cache_key
+
+def test_cache_key_covers_every_request_parameter():
+    base = cache_key("gpt-3.5-turbo", "prompt", 0, 150)
+    assert base == cache_key("gpt-3.5-turbo", "prompt", 0, 150)
+    assert base != cache_key("gpt-4", "prompt", 0, 150)
+    assert base != cache_key("gpt-3.5-turbo", "other prompt", 0, 150)
+    assert base != cache_key("gpt-3.5-turbo", "prompt", 0.3, 150)
+    assert base != cache_key("gpt-3.5-turbo", "prompt", 0, 200)
+
+def test_cache_key_normalizes_numeric_temperature():
+    assert cache_key("gpt-3.5-turbo", "prompt", 0, 150) == cache_key("gpt-3.5-turbo", "prompt", 0.0, 150)
+    assert cache_key("gpt-3.5-turbo", "prompt", 1, 150) == cache_key("gpt-3.5-turbo", "prompt", 1.0, 150)
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats["memory_hits"] == 2
+    assert cache.stats["misses"] == 1
+
+def test_disk_store_survives_restart_and_respects_size_cap(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path, max_entries=1, max_bytes=1000)
+    for i in range(20):
+        cache.put(f"key-{i}", "x" * 100)
+    assert cache.stats["evictions"] > 0
+    cache.close()
+
+    reopened = ResponseCache(path=path, max_entries=1, max_bytes=1000)
+    assert reopened.get("key-19") == "x" * 100
+    assert reopened.stats["disk_hits"] == 1
+    assert reopened.get("key-0") is None
+    reopened.close()
+
+def test_call_llm_serves_repeats_from_cache(tmp_path, monkeypatch):
+    calls = []
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=" summary "))])
+    monkeypatch.setattr(prompt_engineer_app.openai.chat.completions, "create", fake_create)
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(prompt_engineer_app, "response_cache", cache)
+
+    assert prompt_engineer_app.call_llm("prompt", temperature=0) == "summary"
+    assert prompt_engineer_app.call_llm("prompt", temperature=0) == "summary"
+    assert len(calls) == 1
+
+    # Sampled responses skip the cache unless the caller opts in
+    prompt_engineer_app.call_llm("prompt", temperature=0.7)
+    prompt_engineer_app.call_llm("prompt", temperature=0.7)
+    assert len(calls) == 3
+    assert cache.stats["bypassed"] == 2
+    prompt_engineer_app.call_llm("prompt", temperature=0.7, use_cache=True)
+    prompt_engineer_app.call_llm("prompt", temperature=0.7, use_cache=True)
+    assert len(calls) == 4
+    cache.close()
+
+def test_summarizers_pass_use_cache_through(tmp_path, monkeypatch):
+    calls = []
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=" summary "))])
+    monkeypatch.setattr(prompt_engineer_app.openai.chat.completions, "create", fake_create)
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(prompt_engineer_app, "response_cache", cache)
+
+    # The app's own calls are sampled (temperature 0.7), so only an explicit opt-in caches them
+    prompt_engineer_app.zero_shot_summarize("feedback")
+    prompt_engineer_app.zero_shot_summarize("feedback")
+    assert len(calls) == 2
+    prompt_engineer_app.zero_shot_summarize("feedback", use_cache=True)
+    prompt_engineer_app.zero_shot_summarize("feedback", use_cache=True)
+    assert len(calls) == 3
+    cache.close()
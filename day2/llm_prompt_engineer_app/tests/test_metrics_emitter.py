@@ -0,0 +1,86 @@
+import pytest
+import os
+import sys
+import copy
+import socket
+import time
+import threading
+import requests
+from http.server import HTTPServer
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import dashboard
+from metrics_emitter import MetricsEmitter
+
+INITIAL_METRICS = copy.deepcopy(dashboard.metrics)
+
+@pytest.fixture
+def dashboard_url():
+    dashboard.metrics.clear()
+    dashboard.metrics.update(copy.deepcopy(INITIAL_METRICS))
+    server = HTTPServer(('127.0.0.1', 0), dashboard.DashboardHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_events_are_delivered_in_batches(dashboard_url):
+    emitter = MetricsEmitter(dashboard_url, flush_interval=0.05)
+    for i in range(50):
+        emitter.emit(success=i % 10 != 0, tokens=10, type="few_shot")
+    emitter.close()
+
+    assert emitter.stats["sent"] == 50
+    assert emitter.stats["batches"] < 50
+    assert dashboard.metrics["total_requests"] == 50
+    assert dashboard.metrics["failed_requests"] == 5
+    assert dashboard.metrics["total_tokens"] == 450
+    assert dashboard.metrics["few_shot_requests"] == 50
+
+def test_unresponsive_dashboard_never_blocks_emit():
+    # Accepts connections but never answers, so every post hangs until its timeout
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    emitter = MetricsEmitter(f"http://127.0.0.1:{listener.getsockname()[1]}", max_queue=5,
+                             flush_interval=0.01, timeout=0.5)
+    try:
+        start = time.perf_counter()
+        for _ in range(200):
+            emitter.emit(success=True, tokens=1, type="zero_shot")
+        assert time.perf_counter() - start < 0.1
+        assert emitter.stats["dropped"] > 0
+        assert emitter.stats["emitted"] + emitter.stats["dropped"] == 200
+    finally:
+        emitter.close(timeout=0)
+        listener.close()
+
+def test_failed_batches_are_counted_once_and_reported_as_dropped(dashboard_url):
+    emitter = MetricsEmitter(dashboard_url, flush_interval=0.05)
+    post = emitter._session.post
+    attempts = []
+
+    def fail_first_post(*args, **kwargs):
+        attempts.append(True)
+        if len(attempts) == 1:
+            raise requests.ConnectionError("dashboard restarting")
+        return post(*args, **kwargs)
+
+    emitter._session.post = fail_first_post
+    for _ in range(5):
+        emitter.emit(success=True, tokens=1, type="few_shot")
+    deadline = time.monotonic() + 2
+    while not emitter.stats["failed"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    emitter.emit(success=True, tokens=1, type="few_shot")
+    emitter.close()
+
+    # Failed posts count in "failed" only; "dropped" is for queue-full drops
+    assert emitter.stats["failed"] == 5
+    assert emitter.stats["dropped"] == 0
+    assert emitter.stats["sent"] == 1
+    assert dashboard.metrics["total_requests"] == 1
+    assert dashboard.metrics["dropped_events"] == 5
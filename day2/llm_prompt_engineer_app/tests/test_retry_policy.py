@@ -0,0 +1,79 @@
+import pytest
+import os
+import sys
+import httpx
+import openai
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from retry_policy import RetryBudget, RetryPolicy, is_retryable, retry_after_seconds
+
+def status_error(status_code, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, request=request, headers=headers or {})
+    error_class = {400: openai.BadRequestError, 429: openai.RateLimitError}.get(status_code, openai.InternalServerError)
+    return error_class(f"HTTP {status_code}", response=response, body=None)
+
+def failing(errors, result="ok"):
+    """Callable raising each error in turn, then returning `result`."""
+    remaining = list(errors)
+    calls = []
+    def fn():
+        calls.append(1)
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    fn.calls = calls
+    return fn
+
+def test_only_transient_errors_are_retryable():
+    assert is_retryable(status_error(429))
+    assert is_retryable(status_error(503))
+    assert is_retryable(openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com")))
+    assert not is_retryable(status_error(400))
+    assert not is_retryable(ValueError("bad input"))
+
+def test_retry_after_headers_are_parsed():
+    assert retry_after_seconds(status_error(429, {"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(status_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(status_error(429)) is None
+
+def test_policy_retries_transient_errors_with_bounded_delays():
+    sleeps = []
+    policy = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=2.0, sleep=sleeps.append)
+    fn = failing([status_error(500), status_error(502), status_error(503)])
+    assert policy.call(fn) == "ok"
+    assert len(fn.calls) == 4
+    assert len(sleeps) == 3
+    assert all(0.5 <= delay <= 2.0 for delay in sleeps)
+
+def test_policy_honors_retry_after_and_gives_up_when_it_is_too_long():
+    sleeps = []
+    policy = RetryPolicy(base_delay=0.1, max_delay=1.0, max_retry_after=10, sleep=sleeps.append)
+    assert policy.call(failing([status_error(429, {"retry-after": "5"})])) == "ok"
+    assert sleeps == [5.0]
+
+    fn = failing([status_error(429, {"retry-after": "120"})])
+    with pytest.raises(openai.RateLimitError):
+        policy.call(fn)
+    assert len(fn.calls) == 1
+
+def test_non_retryable_errors_are_raised_immediately():
+    policy = RetryPolicy(sleep=lambda delay: None)
+    fn = failing([status_error(400)])
+    with pytest.raises(openai.BadRequestError):
+        policy.call(fn)
+    assert len(fn.calls) == 1
+
+def test_budget_stops_retry_storms():
+    budget = RetryBudget(ratio=0.0, max_tokens=2)
+    policy = RetryPolicy(max_attempts=3, budget=budget, sleep=lambda delay: None)
+    fn = failing([status_error(503)] * 10)
+    with pytest.raises(openai.InternalServerError):
+        policy.call(fn)
+    with pytest.raises(openai.InternalServerError):
+        policy.call(fn)
+    # Two retry tokens: the first call retries twice, the second gets none
+    assert len(fn.calls) == 4
+    assert budget.exhausted == 1
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# benchmark.py
+"""
+Tokenization benchmark harness.
+Generates corpora of different sizes and script mixes (modeled on the short, long and
+mixed texts of the demo), runs count_tokens, truncate_text_to_fit_context and the batch
+and stream counters over them for each model's encoding, and prints tokens/sec and
+latency percentiles as JSON.
+
+    python benchmark.py --docs 500 --models gpt-4 gpt-4o --output results.json
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+import tiktoken
+
+from main import count_tokens, count_tokens_batch, count_tokens_stream, truncate_text_to_fit_context
+from token_cache import token_count_cache
+from tokenizer_registry import get_encoding
+
+WORDS = {
+    "latin": ("the quick brown fox jumps over lazy dog context window tokens model language "
+              "architecture production system prompt engineering latency throughput").split(),
+    "cyrillic": "привет мир модель контекст окно токен язык система задача ответ".split(),
+    "cjk": ["こんにちは", "世界", "大規模", "言語", "モデル", "文脈", "窓", "トークン"],
+    "emoji": ["😊", "🚀", "👍", "🎉", "🔥"],
+    "digits": ["2024", "3.14", "42", "1,299.99", "1234567890"],
+}
+PUNCTUATION = [".", ",", "!", "?", ";"]
+
+# name -> (approximate characters per document, script weights)
+PROFILES = {
+    "short": (40, {"latin": 1.0}),
+    "medium": (200, {"latin": 0.95, "digits": 0.05}),
+    "long": (2500, {"latin": 0.95, "digits": 0.05}),
+    "mixed": (100, {"latin": 0.5, "cyrillic": 0.2, "cjk": 0.2, "emoji": 0.05, "digits": 0.05}),
+}
+DEFAULT_MODELS = ("gpt-4", "gpt-4o", "text-davinci-003")
+PERCENTILES = (50, 90, 99)
+
+def generate_document(rng, target_chars, weights):
+    """One pseudo-random document of about target_chars characters in the given script mix."""
+    scripts = list(weights)
+    script_weights = [weights[script] for script in scripts]
+    words = []
+    length = 0
+    while length < target_chars:
+        word = rng.choice(WORDS[rng.choices(scripts, script_weights)[0]])
+        if rng.random() < 0.1:
+            word += rng.choice(PUNCTUATION)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+def generate_corpus(profile, docs, seed=0):
+    """`docs` distinct documents for a PROFILES entry; distinct so the token cache can't serve repeats."""
+    target_chars, weights = PROFILES[profile]
+    rng = random.Random(f"{profile}-{seed}")
+    return [f"{i}: {generate_document(rng, target_chars, weights)}" for i in range(docs)]
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, tokens, chars):
+    """Throughput and latency percentiles (milliseconds) for one measured run."""
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    result = {
+        "calls": len(latencies),
+        "tokens": tokens,
+        "chars": chars,
+        "seconds": round(total, 6),
+        "tokens_per_sec": round(tokens / total, 1) if total else None,
+        "chars_per_sec": round(chars / total, 1) if total else None,
+    }
+    for pct in PERCENTILES:
+        result[f"p{pct}_ms"] = round(percentile(ordered, pct) * 1000, 4)
+    result["max_ms"] = round(ordered[-1] * 1000, 4) if ordered else 0.0
+    return result
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def bench_count_tokens(corpus, model_name):
+    token_count_cache.clear()
+    latencies, tokens = [], 0
+    for text in corpus:
+        count, elapsed = _timed(count_tokens, text, model_name)
+        latencies.append(elapsed)
+        tokens += count
+    return summarize(latencies, tokens, sum(map(len, corpus)))
+
+def bench_truncate(corpus, model_name, max_tokens, strategy):
+    token_count_cache.clear()
+    latencies, tokens = [], 0
+    for text in corpus:
+        (_, count), elapsed = _timed(truncate_text_to_fit_context, text, max_tokens, model_name,
+                                     return_count=True, strategy=strategy)
+        latencies.append(elapsed)
+        tokens += count
+    return summarize(latencies, tokens, sum(map(len, corpus)))
+
+def bench_count_tokens_batch(corpus, model_name, workers, chunk_size):
+    counts, elapsed = _timed(count_tokens_batch, corpus, model_name, workers=workers, chunk_size=chunk_size)
+    return summarize([elapsed], sum(counts), sum(map(len, corpus)))
+
+def bench_count_tokens_stream(corpus, model_name):
+    # The corpus as one long stream, in document-sized chunks
+    count, elapsed = _timed(count_tokens_stream, (text + "\n" for text in corpus), model_name)
+    return summarize([elapsed], count, sum(len(text) + 1 for text in corpus))
+
+def run(models=DEFAULT_MODELS, profiles=tuple(PROFILES), docs=200, max_tokens=64, strategies=("tail", "head_tail"),
+        workers=4, chunk_size=1000, seed=0):
+    """Runs every benchmark for every model and corpus profile; returns the JSON-ready report."""
+    corpora = {profile: generate_corpus(profile, docs, seed) for profile in profiles}
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "tiktoken": getattr(tiktoken, "__version__", "unknown"),
+            "platform": platform.platform(),
+        },
+        "parameters": {"docs": docs, "max_tokens": max_tokens, "workers": workers, "chunk_size": chunk_size, "seed": seed},
+        "results": [],
+    }
+    for model_name in models:
+        encoding = get_encoding(model_name)
+        # Warm up: encoding load, thread pool start-up, the tail window's chars/token estimate
+        count_tokens_batch(corpora[profiles[0]][:10], model_name, workers=workers)
+        truncate_text_to_fit_context(corpora[profiles[0]][0], max_tokens, model_name)
+        for profile, corpus in corpora.items():
+            benchmarks = {"count_tokens": bench_count_tokens(corpus, model_name)}
+            for strategy in strategies:
+                benchmarks[f"truncate_{strategy}"] = bench_truncate(corpus, model_name, max_tokens, strategy)
+            benchmarks["count_tokens_batch"] = bench_count_tokens_batch(corpus, model_name, workers, chunk_size)
+            benchmarks["count_tokens_stream"] = bench_count_tokens_stream(corpus, model_name)
+            report["results"].append({
+                "model": model_name,
+                "encoding": encoding.name,
+                "corpus": profile,
+                "docs": len(corpus),
+                "benchmarks": benchmarks,
+            })
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark token counting and truncation.")
+    parser.add_argument("--models", nargs="+", default=list(DEFAULT_MODELS), help="Model names to resolve encodings for")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES), help="Corpus profiles")
+    parser.add_argument("--docs", type=int, default=200, help="Documents per corpus")
+    parser.add_argument("--max-tokens", type=int, default=64, help="Truncation budget")
+    parser.add_argument("--strategies", nargs="+", default=["tail", "head_tail"], help="Truncation strategies")
+    parser.add_argument("--workers", type=int, default=4, help="Threads for count_tokens_batch")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Texts per encode_batch call")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus generator seed")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.models, tuple(args.profiles), args.docs, args.max_tokens, tuple(args.strategies),
+                 args.workers, args.chunk_size, args.seed)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# context_packer.py
+"""
+Packs prioritized prompt segments into a token budget in one pass.
+A request is rarely one string: a system prompt, conversation turns, retrieved
+documents and the user's question compete for the same window. Segments are placed
+highest priority first; one that doesn't fit is tail-truncated to at most the space
+left (if it allows truncation) or dropped, and lower-priority segments still get a
+chance to fill whatever remains, so the budget isn't wasted on a single overflow.
+"""
+from collections import namedtuple
+
+from truncation import truncate
+
+# priority: higher is placed first; truncatable: may be cut to its last tokens instead of dropped
+Segment = namedtuple("Segment", ["name", "text", "priority", "truncatable"], defaults=(0, False))
+# tokens: sum of the kept segments' counts, each segment being encoded on its own like a chat message
+PackedContext = namedtuple("PackedContext", ["segments", "tokens", "budget", "dropped", "truncated"])
+
+# A truncated segment shorter than this is dropped instead; a few tokens of a document are noise
+MIN_TRUNCATED_TOKENS = 8
+
+def pack_segments(segments, budget: int, encoding, count=None, min_truncated_tokens: int = MIN_TRUNCATED_TOKENS) -> PackedContext:
+    """
+    Fits `segments` into `budget` tokens. Returns a PackedContext whose `segments` are
+    the kept (name, text, tokens) in their original order, with `dropped` listing
+    (name, tokens) and `truncated` listing (name, original_tokens, kept_tokens).
+    `count` counts one segment (default: len(encoding.encode(text))); pass a cached
+    counter so system prompts and history turns aren't re-encoded on every request.
+    """
+    count = count or (lambda text: len(encoding.encode(text)))
+    order = sorted(range(len(segments)), key=lambda i: -segments[i].priority)  # stable: ties keep input order
+    kept = {}
+    dropped = []
+    truncated = []
+    remaining = budget
+    for i in order:
+        segment = segments[i]
+        tokens = count(segment.text)
+        if tokens <= remaining:
+            kept[i] = (segment.name, segment.text, tokens)
+            remaining -= tokens
+        elif segment.truncatable and remaining >= min_truncated_tokens:
+            text, kept_tokens = truncate(segment.text, remaining, encoding, "tail")
+            kept[i] = (segment.name, text, kept_tokens)
+            truncated.append((segment.name, tokens, kept_tokens))
+            remaining -= kept_tokens
+        else:
+            dropped.append((segment.name, tokens))
+    return PackedContext([kept[i] for i in sorted(kept)], budget - remaining, budget, dropped, truncated)
+
+def history_segments(turns, priority: int, name: str = "history"):
+    """
+    One segment per conversation turn, oldest first, with priorities falling with age
+    so the packer keeps the most recent turns when history doesn't fit.
+    Priorities step by 1/len(turns), staying within (priority - 1, priority].
+    """
+    step = 1 / max(1, len(turns))
+    return [Segment(f"{name}[{i}]", turn, priority - (len(turns) - 1 - i) * step)
+            for i, turn in enumerate(turns)]
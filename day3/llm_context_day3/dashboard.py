@@ -17,11 +17,117 @@ metrics = {
     "total_tokens_truncated": 0,
     "total_context_utilization": 0.0,
     "average_chars_per_token": 0.0,
+    "token_cache_hits": 0,
+    "token_cache_misses": 0,
+    "token_cache_hit_rate": 0.0,
     "last_update_time": time.time()
 }
 
 metrics_lock = Lock()
 
+class SecondsRing:
+    """
+    Per-second time series over the last `seconds` completed seconds, in fixed memory.
+    Each column is a list indexed by (second % slots), with one slot more than `seconds`
+    for the second in progress; a slot whose stamp is stale is zeroed when its second
+    comes round again, so record() is O(1). Rollups and the series leave out the second
+    in progress, which would otherwise pull every rate down early in each second.
+    Not thread-safe by itself: callers hold metrics_lock.
+    """
+
+    COLUMNS = ("tokens", "truncations", "truncated_tokens", "utilization_sum", "utilization_count")
+    ROLLUPS = (("1s", 1), ("10s", 10), ("1m", 60))
+
+    def __init__(self, seconds=60):
+        self.seconds = seconds
+        self.slots = seconds + 1
+        self.stamps = [-1] * self.slots
+        self.columns = {name: [0] * self.slots for name in self.COLUMNS}
+
+    def _slot(self, second):
+        index = second % self.slots
+        if self.stamps[index] != second:
+            self.stamps[index] = second
+            for column in self.columns.values():
+                column[index] = 0
+        return index
+
+    def record(self, now, tokens=0, truncations=0, truncated_tokens=0, utilization=None):
+        index = self._slot(int(now))
+        self.columns["tokens"][index] += tokens
+        self.columns["truncations"][index] += truncations
+        self.columns["truncated_tokens"][index] += truncated_tokens
+        if utilization is not None:
+            self.columns["utilization_sum"][index] += utilization
+            self.columns["utilization_count"][index] += 1
+
+    def _window(self, now, seconds):
+        """Column values for the last `seconds` completed seconds, oldest first (0 for idle seconds)."""
+        current = int(now)
+        window = {name: [] for name in self.COLUMNS}
+        for second in range(current - seconds, current):
+            index = second % self.slots
+            fresh = self.stamps[index] == second
+            for name, column in self.columns.items():
+                window[name].append(column[index] if fresh else 0)
+        return window
+
+    def snapshot(self, now):
+        """Rollups over 1s/10s/1m plus the per-second series the dashboard charts."""
+        series = self._window(now, self.seconds)
+        rollups = {}
+        for label, seconds in self.ROLLUPS:
+            tokens = sum(series["tokens"][-seconds:])
+            utilization_count = sum(series["utilization_count"][-seconds:])
+            rollups[label] = {
+                "tokens": tokens,
+                "tokens_per_second": tokens / seconds,
+                "truncations": sum(series["truncations"][-seconds:]),
+                "truncated_tokens": sum(series["truncated_tokens"][-seconds:]),
+                "avg_context_utilization": (sum(series["utilization_sum"][-seconds:]) / utilization_count
+                                            if utilization_count else None),
+            }
+        utilization = [total / count if count else None
+                       for total, count in zip(series["utilization_sum"], series["utilization_count"])]
+        return {
+            "rollups": rollups,
+            "per_second": {
+                "tokens": series["tokens"],
+                "truncations": series["truncations"],
+                "context_utilization": utilization,
+            },
+        }
+
+# Guarded by metrics_lock, like metrics
+timeseries = SecondsRing(60)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PROMETHEUS_METRICS = [
+    # (exported name, type, help, metrics key)
+    ("context_analysis_token_count_operations_total", "counter", "Token counting operations.", "total_token_count_operations"),
+    ("context_analysis_tokens_counted_total", "counter", "Tokens counted across all operations.", "total_tokens_counted"),
+    ("context_analysis_context_simulations_total", "counter", "Context window simulations run.", "total_context_window_simulations"),
+    ("context_analysis_context_overflows_total", "counter", "Simulations whose input exceeded the context window.", "total_context_overflow_events"),
+    ("context_analysis_tokens_truncated_total", "counter", "Tokens dropped by truncation.", "total_tokens_truncated"),
+    ("context_analysis_context_utilization_percent", "gauge", "Context window utilization of the latest simulation.", "total_context_utilization"),
+    ("context_analysis_chars_per_token", "gauge", "Characters per token of the latest counted text.", "average_chars_per_token"),
+    ("context_analysis_token_cache_hits", "gauge", "Token count cache hits reported by the client process.", "token_cache_hits"),
+    ("context_analysis_token_cache_misses", "gauge", "Token count cache misses reported by the client process.", "token_cache_misses"),
+    ("context_analysis_last_update_timestamp_seconds", "gauge", "Unix time of the latest update.", "last_update_time"),
+]
+
+def render_prometheus():
+    """Render the in-memory metrics in the Prometheus text format."""
+    with metrics_lock:
+        values = [metrics[key] for _, _, _, key in PROMETHEUS_METRICS]
+    lines = []
+    for (name, metric_type, help_text, _), value in zip(PROMETHEUS_METRICS, values):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
 class DashboardHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         parsed_path = urlparse(self.path)
@@ -36,18 +142,30 @@ class DashboardHandler(BaseHTTPRequestHandler):
             self.send_header("Content-type", "application/json")
             self.end_headers()
             with metrics_lock:
-                self.wfile.write(json.dumps(metrics).encode())
+                body = dict(metrics, timeseries=timeseries.snapshot(time.time()))
+            self.wfile.write(json.dumps(body).encode())
+        elif parsed_path.path == "/metrics/prometheus":
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
         elif parsed_path.path == "/update":
             query_params = parse_qs(parsed_path.query)
+            now = time.time()
             with metrics_lock:
+                utilization = None
                 if "tokens" in query_params:
                     tokens = int(query_params["tokens"][0])
                     metrics["total_tokens_counted"] += tokens
-                    metrics["total_token_count_operations"] += 1
+                    # Batched counts report how many texts they covered
+                    metrics["total_token_count_operations"] += int(query_params.get("operations", ["1"])[0])
+                # Buffered clients send how many simulations/overflows a flush covers
                 if "context_simulation" in query_params:
-                    metrics["total_context_window_simulations"] += 1
+                    metrics["total_context_window_simulations"] += int(query_params["context_simulation"][0])
                 if "overflow" in query_params:
-                    metrics["total_context_overflow_events"] += 1
+                    metrics["total_context_overflow_events"] += int(query_params["overflow"][0])
                 if "truncated_tokens" in query_params:
                     metrics["total_tokens_truncated"] += int(query_params["truncated_tokens"][0])
                 if "context_used" in query_params and "context_size" in query_params:
@@ -60,7 +178,20 @@ class DashboardHandler(BaseHTTPRequestHandler):
                     tokens = int(query_params["tokens"][0])
                     if tokens > 0:
                         metrics["average_chars_per_token"] = chars / tokens
-                metrics["last_update_time"] = time.time()
+                if "cache_hits" in query_params and "cache_misses" in query_params:
+                    hits = int(query_params["cache_hits"][0])
+                    misses = int(query_params["cache_misses"][0])
+                    metrics["token_cache_hits"] = hits
+                    metrics["token_cache_misses"] = misses
+                    metrics["token_cache_hit_rate"] = (hits / (hits + misses)) * 100 if hits + misses > 0 else 0.0
+                timeseries.record(
+                    now,
+                    tokens=int(query_params.get("tokens", ["0"])[0]),
+                    truncations=int(query_params.get("overflow", ["0"])[0]),
+                    truncated_tokens=int(query_params.get("truncated_tokens", ["0"])[0]),
+                    utilization=utilization,
+                )
+                metrics["last_update_time"] = now
             self.send_response(200)
             self.send_header("Content-type", "text/plain")
             self.end_headers()
@@ -150,6 +281,30 @@ class DashboardHandler(BaseHTTPRequestHandler):
             border-radius: 5px;
             margin-top: 20px;
         }}
+        .chart-card {{
+            background: white;
+            border-radius: 10px;
+            padding: 20px;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            margin-bottom: 20px;
+        }}
+        .chart-card canvas {{
+            width: 100%;
+            height: 120px;
+        }}
+        .rollups {{
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 15px;
+        }}
+        .rollups th, .rollups td {{
+            text-align: right;
+            padding: 6px 10px;
+            border-bottom: 1px solid #eee;
+        }}
+        .rollups th:first-child, .rollups td:first-child {{
+            text-align: left;
+        }}
         .refresh-info {{
             text-align: center;
             color: rgba(255,255,255,0.8);
@@ -175,6 +330,10 @@ class DashboardHandler(BaseHTTPRequestHandler):
                         document.getElementById('total-truncated').textContent = data.total_tokens_truncated || 0;
                         document.getElementById('context-utilization').textContent = (data.total_context_utilization || 0).toFixed(2);
                         document.getElementById('avg-chars-token').textContent = (data.average_chars_per_token || 0).toFixed(2);
+                        document.getElementById('cache-hit-rate').textContent = (data.token_cache_hit_rate || 0).toFixed(1);
+                        if (data.timeseries) {{
+                            renderTimeseries(data.timeseries);
+                        }}
                         if (data.last_update_time) {{
                             const lastUpdate = new Date(data.last_update_time * 1000);
                             document.getElementById('last-update').textContent = lastUpdate.toLocaleTimeString();
@@ -185,6 +344,35 @@ class DashboardHandler(BaseHTTPRequestHandler):
                     console.error('Error fetching metrics:', error);
                 }});
         }}
+        function drawSeries(canvasId, values, color, maxValue) {{
+            const canvas = document.getElementById(canvasId);
+            const width = canvas.width = canvas.clientWidth;
+            const height = canvas.height = canvas.clientHeight;
+            const ctx = canvas.getContext('2d');
+            ctx.clearRect(0, 0, width, height);
+            const top = maxValue || Math.max(1, ...values.map(v => v || 0));
+            const barWidth = width / values.length;
+            ctx.fillStyle = color;
+            values.forEach((value, i) => {{
+                if (value === null) return;
+                const barHeight = (value / top) * (height - 2);
+                ctx.fillRect(i * barWidth, height - barHeight, Math.max(1, barWidth - 1), barHeight);
+            }});
+        }}
+        function renderTimeseries(ts) {{
+            for (const label of ['1s', '10s', '1m']) {{
+                const rollup = ts.rollups[label];
+                const row = document.getElementById('rollup-' + label);
+                const utilization = rollup.avg_context_utilization;
+                row.cells[1].textContent = rollup.tokens_per_second.toFixed(1);
+                row.cells[2].textContent = rollup.truncations;
+                row.cells[3].textContent = rollup.truncated_tokens;
+                row.cells[4].textContent = utilization === null ? '--' : utilization.toFixed(1) + '%';
+            }}
+            drawSeries('tokens-chart', ts.per_second.tokens, '#667eea');
+            drawSeries('truncations-chart', ts.per_second.truncations, '#e5533d');
+            drawSeries('utilization-chart', ts.per_second.context_utilization, '#2a9d8f', 100);
+        }}
         // Update immediately on load
         updateMetrics();
         // Then update every second
@@ -223,6 +411,25 @@ class DashboardHandler(BaseHTTPRequestHandler):
                 <div class="metric-label">Avg Chars/Token</div>
                 <div class="metric-value"><span id="avg-chars-token">0.00</span></div>
             </div>
+            <div class="metric-card">
+                <div class="metric-label">Token Cache Hit Rate</div>
+                <div class="metric-value"><span id="cache-hit-rate">0.0</span><span class="metric-unit">%</span></div>
+            </div>
+        </div>
+        <div class="chart-card">
+            <div class="metric-label">Last Minute</div>
+            <table class="rollups">
+                <tr><th>Window</th><th>Tokens/s</th><th>Truncations</th><th>Tokens Truncated</th><th>Avg Utilization</th></tr>
+                <tr id="rollup-1s"><td>1s</td><td>0</td><td>0</td><td>0</td><td>--</td></tr>
+                <tr id="rollup-10s"><td>10s</td><td>0</td><td>0</td><td>0</td><td>--</td></tr>
+                <tr id="rollup-1m"><td>1m</td><td>0</td><td>0</td><td>0</td><td>--</td></tr>
+            </table>
+            <div class="metric-label">Tokens counted per second</div>
+            <canvas id="tokens-chart"></canvas>
+            <div class="metric-label">Truncations per second</div>
+            <canvas id="truncations-chart"></canvas>
+            <div class="metric-label">Context utilization per second (%)</div>
+            <canvas id="utilization-chart"></canvas>
         </div>
         <div class="status">
             <div>Last Update: <span id="last-update">--</span></div>
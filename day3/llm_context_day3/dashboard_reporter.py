@@ -0,0 +1,119 @@
+# dashboard_reporter.py
+"""
+Buffered, non-blocking reporting to the context analysis dashboard.
+Counting tokens used to make one blocking HTTP call per operation; now every
+operation just adds to in-memory totals, and a background thread sends the
+accumulated totals as a single /update request every flush interval.
+"""
+import atexit
+import threading
+import requests
+
+class DashboardReporter:
+    """
+    Aggregates dashboard updates and flushes them from a background thread.
+
+    record() only takes a lock and adds numbers, so it costs the same whether the
+    dashboard is up, slow or down. Totals that fail to send are kept and merged into
+    the next flush; being sums, they take fixed memory however long the dashboard is away.
+    """
+
+    _SUMMED = ("tokens", "chars", "operations", "context_simulations", "overflows", "truncated_tokens")
+
+    def __init__(self, base_url, flush_interval=1.0, timeout=1.0):
+        self.url = f"{base_url.rstrip('/')}/update"
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.stats = {"recorded": 0, "flushes": 0, "failed_flushes": 0}
+        self._pending = self._empty()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="dashboard-reporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _empty(self):
+        pending = dict.fromkeys(self._SUMMED, 0)
+        pending.update(context_used=0, context_size=0, cache_stats=None)
+        return pending
+
+    def record(self, tokens=0, chars=0, operations=0, context_simulation=False, overflow=False,
+               truncated_tokens=0, context_used=0, context_size=0, cache_stats=None):
+        """Add one operation's numbers to the pending totals; never blocks on the network."""
+        with self._lock:
+            pending = self._pending
+            pending["tokens"] += tokens
+            pending["chars"] += chars
+            pending["operations"] += operations
+            pending["context_simulations"] += int(context_simulation)
+            pending["overflows"] += int(overflow)
+            pending["truncated_tokens"] += truncated_tokens
+            if context_used > 0 and context_size > 0:
+                # Utilization is a gauge: the latest simulation wins
+                pending["context_used"], pending["context_size"] = context_used, context_size
+            if cache_stats:
+                pending["cache_stats"] = (cache_stats["hits"], cache_stats["misses"])
+            self.stats["recorded"] += 1
+
+    def _params(self, pending):
+        params = {}
+        if pending["tokens"] > 0:
+            params["tokens"] = pending["tokens"]
+            params["operations"] = pending["operations"]
+            if pending["chars"] > 0:
+                params["chars"] = pending["chars"]
+        if pending["context_simulations"]:
+            params["context_simulation"] = pending["context_simulations"]
+        if pending["overflows"]:
+            params["overflow"] = pending["overflows"]
+        if pending["truncated_tokens"] > 0:
+            params["truncated_tokens"] = pending["truncated_tokens"]
+        if pending["context_size"] > 0:
+            params["context_used"] = pending["context_used"]
+            params["context_size"] = pending["context_size"]
+        if pending["cache_stats"]:
+            # Process-wide totals; the dashboard keeps the latest values
+            params["cache_hits"], params["cache_misses"] = pending["cache_stats"]
+        return params
+
+    def flush(self):
+        """Send everything recorded since the last successful flush; returns True on success."""
+        with self._lock:
+            pending, self._pending = self._pending, self._empty()
+        params = self._params(pending)
+        if not params:
+            return True
+        try:
+            self._session.get(self.url, params=params, timeout=self.timeout).raise_for_status()
+        except requests.RequestException:
+            self._merge_back(pending)
+            with self._lock:
+                self.stats["failed_flushes"] += 1
+            return False
+        with self._lock:
+            self.stats["flushes"] += 1
+        return True
+
+    def _merge_back(self, pending):
+        with self._lock:
+            current = self._pending
+            for name in self._SUMMED:
+                current[name] += pending[name]
+            if not current["context_size"]:
+                current["context_used"], current["context_size"] = pending["context_used"], pending["context_size"]
+            if current["cache_stats"] is None:
+                current["cache_stats"] = pending["cache_stats"]
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def close(self, timeout=2.0):
+        """Stop the flush thread and make one last attempt to send what's pending."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self.flush()
+        self._session.close()
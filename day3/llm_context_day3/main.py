@@ -1,34 +1,71 @@
 # main.py
 import tiktoken
 import os
+import itertools
+from tokenizer_registry import get_encoding
+from token_cache import token_count_cache
+from truncation import STRATEGIES, truncate
+from token_estimator import fits_within
+from stream_counting import DEFAULT_CHUNK_CHARS, count_stream, iter_file_chunks
+from context_packer import Segment, pack_segments, history_segments
 
 def count_tokens(text: str, model_name: str = "gpt-4") -> int:
     """Counts tokens for a given text using a specified model's tokenizer."""
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-        tokens = encoding.encode(text)
-        return len(tokens)
-    except KeyError:
-        print(f"Warning: Tokenizer for model '{model_name}' not found. Using 'cl100k_base' fallback.")
-        encoding = tiktoken.get_encoding("cl100k_base") # Fallback for common models
-        tokens = encoding.encode(text)
-        return len(tokens)
-
-def truncate_text_to_fit_context(text: str, max_tokens: int, model_name: str = "gpt-4") -> str:
+    encoding = get_encoding(model_name) # Cached; unknown models fall back to cl100k_base
+    return token_count_cache.count(text, encoding) # Repeated texts skip the encode
+
+def count_tokens_batch(texts, model_name: str = "gpt-4", workers: int = 4, chunk_size: int = 1000) -> list:
     """
-    Truncates text to fit within a maximum token limit.
-    Prioritizes keeping the end of the text (most recent information).
+    Counts tokens for many texts at once; returns a list of counts in input order.
+    Texts are encoded chunk_size at a time with tiktoken's encode_batch, which spreads
+    each chunk over `workers` threads (the tokenizer releases the GIL while encoding).
+    Only the counts are kept, so `texts` can be a generator over millions of documents.
+    """
+    encoding = get_encoding(model_name)
+    counts = []
+    texts = iter(texts)
+    while True:
+        chunk = list(itertools.islice(texts, chunk_size))
+        if not chunk:
+            break
+        counts.extend(len(tokens) for tokens in encoding.encode_batch(chunk, num_threads=workers))
+    return counts
+
+def count_tokens_stream(chunks, model_name: str = "gpt-4") -> int:
     """
-    encoding = tiktoken.encoding_for_model(model_name)
-    tokens = encoding.encode(text)
+    Counts tokens in text that arrives in pieces (an iterable of str), exactly as if
+    the pieces were joined and counted at once, holding roughly one piece in memory.
+    """
+    token_count, _ = count_stream(chunks, get_encoding(model_name))
+    return token_count
 
-    if len(tokens) <= max_tokens:
-        return text
+def count_tokens_file(path, model_name: str = "gpt-4", chunk_chars: int = DEFAULT_CHUNK_CHARS) -> int:
+    """Counts the tokens in a UTF-8 text file, reading it chunk_chars characters at a time."""
+    return count_tokens_stream(iter_file_chunks(path, chunk_chars), model_name)
 
-    # Truncate from the beginning to fit the max_tokens
-    truncated_tokens = tokens[-max_tokens:]
-    truncated_text = encoding.decode(truncated_tokens)
-    return truncated_text
+def truncate_text_to_fit_context(text: str, max_tokens: int, model_name: str = "gpt-4", return_count: bool = False,
+                                 strategy: str = "tail", ratio: float = 0.5, marker=None, estimate: bool = False):
+    """
+    Truncates text to fit within a maximum token limit.
+    By default prioritizes keeping the end of the text (most recent information); only a
+    tail window of the text is encoded (see truncation.truncate_tail), with the same
+    result as encoding everything. strategy="head", "head_tail" (with an ellipsis marker)
+    or "middle_out" keep other parts, see truncation.truncate for `ratio` and `marker`.
+    With return_count=True returns (text, token_count), the exact count of the returned text.
+    With estimate=True (and no return_count), a text the token estimator says clearly fits
+    is returned without encoding. The estimator's bound is statistical, so an unusual text
+    can slip through over the limit; the default always counts exactly.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown truncation strategy {strategy!r}; expected one of {STRATEGIES}")
+    encoding = get_encoding(model_name)
+    if estimate and not return_count:
+        fits, _ = fits_within(text, max_tokens, encoding, count=lambda full_text: token_count_cache.count(full_text, encoding))
+        if fits:
+            return text
+    encode = lambda full_text: token_count_cache.encode(full_text, encoding)
+    truncated_text, token_count = truncate(text, max_tokens, encoding, strategy, ratio, marker, encode=encode)
+    return (truncated_text, token_count) if return_count else truncated_text
 
 def simulate_llm_interaction(input_text: str, context_window_size: int, model_name: str = "gpt-4", expected_output_tokens: int = 100):
     """
@@ -45,8 +82,8 @@ def simulate_llm_interaction(input_text: str, context_window_size: int, model_na
     if initial_input_tokens > available_input_tokens:
         print(f"\n--- CONTEXT OVERFLOW DETECTED! ---")
         print(f"Original input ({initial_input_tokens} tokens) exceeds available input tokens ({available_input_tokens}).")
-        processed_input_text = truncate_text_to_fit_context(input_text, available_input_tokens, model_name)
-        processed_input_tokens = count_tokens(processed_input_text, model_name) # Recount after truncation
+        processed_input_text, processed_input_tokens = truncate_text_to_fit_context(
+            input_text, available_input_tokens, model_name, return_count=True) # No recount needed
         print(f"Text truncated to {processed_input_tokens} tokens to fit context.")
         print(f"Effective Input Text (first 200 chars): '{processed_input_text[:200]}...'")
     else:
@@ -64,6 +101,34 @@ def simulate_llm_interaction(input_text: str, context_window_size: int, model_na
     else:
         print(f"Context window utilization: {total_context_used}/{context_window_size} tokens ({total_context_used/context_window_size:.2%})")
 
+def simulate_llm_interaction_with_segments(segments, context_window_size: int, model_name: str = "gpt-4", expected_output_tokens: int = 100):
+    """
+    Simulates a request built from prioritized segments (see context_packer.Segment):
+    system prompt, history turns, retrieved documents and the question are packed into
+    the input budget in one pass, reusing cached per-segment counts. Returns the PackedContext.
+    """
+    print(f"\n--- Simulating LLM Interaction ({len(segments)} segments) ---")
+    print(f"Model: {model_name}, Context Window: {context_window_size} tokens")
+    print(f"Expected LLM Output Tokens: {expected_output_tokens}")
+
+    encoding = get_encoding(model_name)
+    available_input_tokens = context_window_size - expected_output_tokens
+    packed = pack_segments(segments, max(0, available_input_tokens), encoding,
+                           count=lambda text: token_count_cache.count(text, encoding))
+    for name, _, tokens in packed.segments:
+        print(f"  kept      {name}: {tokens} tokens")
+    for name, original_tokens, kept_tokens in packed.truncated:
+        print(f"  truncated {name}: {original_tokens} -> {kept_tokens} tokens")
+    for name, tokens in packed.dropped:
+        print(f"  dropped   {name}: {tokens} tokens")
+    if packed.dropped or packed.truncated:
+        print(f"\n--- CONTEXT OVERFLOW DETECTED! ---")
+
+    total_context_used = packed.tokens + expected_output_tokens
+    print(f"\nTokens actually sent to LLM: {packed.tokens} tokens ({max(0, available_input_tokens) - packed.tokens} of the input budget unused)")
+    print(f"Context window utilization: {total_context_used}/{context_window_size} tokens ({total_context_used/context_window_size:.2%})")
+    return packed
+
 if __name__ == "__main__":
     # Example texts to analyze
     short_text = "Hello, world! This is a short sentence."
@@ -88,8 +153,9 @@ if __name__ == "__main__":
         "Mixed Text": mixed_text
     }
 
-    for name, text in texts_to_analyze.items():
-        tokens = count_tokens(text)
+    # Counted in one batch call instead of one encode per text
+    token_counts = count_tokens_batch(list(texts_to_analyze.values()))
+    for (name, text), tokens in zip(texts_to_analyze.items(), token_counts):
         print(f"'{name}' ({len(text)} chars): {tokens} tokens")
         # Estimate character-to-token ratio (rough average)
         if tokens > 0:
@@ -113,3 +179,11 @@ if __name__ == "__main__":
     # Example 4: Output expectation too high
     print("\n----- Scenario 4: Output Expectation Too High -----")
     simulate_llm_interaction(short_text, context_window_size=50, expected_output_tokens=60)
+
+    # Example 5: Prioritized segments - system prompt and question always fit, history and documents fill the rest
+    print("\n----- Scenario 5: Packing Prompt Segments -----")
+    segments = ([Segment("system", "You are a concise assistant that explains LLM architecture.", priority=100)]
+                + history_segments([short_text, medium_text, mixed_text], priority=50)
+                + [Segment("document", long_text, priority=10, truncatable=True),
+                   Segment("question", "Why does the context window limit matter?", priority=90)])
+    simulate_llm_interaction_with_segments(segments, context_window_size=512)
@@ -0,0 +1,102 @@
+# stream_counting.py
+"""
+Token counting over streams and files without loading them whole.
+Text arrives in chunks; each chunk is encoded up to a point where the full text's
+pre-tokenization is guaranteed to start a new pre-token, and the remainder is
+carried into the next chunk. Summing the per-piece counts therefore gives exactly
+len(encoding.encode(full_text)).
+"""
+import re
+
+import regex
+
+DEFAULT_CHUNK_CHARS = 1024 * 1024
+# Only the end of a chunk is searched for a break point first; most text has one close by
+BREAK_SEARCH_CHARS = 4096
+
+# Safe breaks: before a single space that follows a non-space and precedes a letter
+# ("foo| bar"), and after a lone newline between a non-space and a letter ("foo\n|bar").
+# In the r50k/p50k/cl100k/o200k split patterns no pre-token spans either position.
+# The newline must follow a non-space: r50k/p50k split "\n\nbar" as "\n" "\n" "bar"
+# (\s+(?!\S) leaves the last newline to stand alone), but a chunk ending in "\n\n"
+# would see one "\n\n" pre-token.
+_SAFE_BREAK = re.compile(r"(?<=\S)(?= [^\W\d_])|(?<=\S\n)(?=[^\W\d_])")
+# Characters around a match position that _SAFE_BREAK looks at on either side
+_SAFE_BREAK_REACH = 2
+
+_pretoken_patterns = {}
+
+def _pretoken_pattern(encoding):
+    """The encoding's own pre-token split regex, compiled once per encoding."""
+    pattern = _pretoken_patterns.get(encoding.name)
+    if pattern is None:
+        pattern = _pretoken_patterns[encoding.name] = regex.compile(encoding._pat_str)
+    return pattern
+
+def first_safe_break(text: str, start: int = 0):
+    """Index of the first safe break at or after `start`, or None if there is none."""
+    match = _SAFE_BREAK.search(text, start)
+    return match.start() if match else None
+
+def _last_safe_break(text: str, scanned: int = 0):
+    """
+    Index of the last safe break in `text` (0 if none). text[:scanned] is known to hold
+    none, so only the rest is searched: its last BREAK_SEARCH_CHARS first, then the
+    part before them.
+    """
+    start = max(0, scanned - _SAFE_BREAK_REACH)
+    tail_start = max(start, len(text) - BREAK_SEARCH_CHARS)
+    for lo, hi in ((tail_start, len(text)), (start, tail_start + _SAFE_BREAK_REACH)):
+        cut = 0
+        for match in _SAFE_BREAK.finditer(text, lo, min(hi, len(text))):
+            cut = match.start()
+        if cut or lo == start:
+            return cut
+
+def _last_pretoken_break(text: str, encoding):
+    """
+    Fallback for text with no safe break (compact JSON, CJK, long symbol runs): split
+    `text`, which starts where a pre-token of the full text starts, with the encoding's
+    own pattern and return the start of its last pre-token that can be cut before
+    (0 if none). Text past the chunk can still change the last pre-token (o200k reads
+    "word'l" as "word" "'l" but "word'll" as one), so the cut is before an earlier one.
+    The pre-token before the cut must not end in whitespace: "\n\n" at the end of the
+    encoded piece would be one pre-token where "\n\n!" splits it in two.
+    """
+    cut = 0
+    previous = 0
+    for match in _pretoken_pattern(encoding).finditer(text):
+        if previous and not text[previous - 1].isspace():
+            cut = previous
+        previous = match.start()
+    return cut
+
+def count_stream(chunks, encoding) -> tuple:
+    """
+    Exact token count of the concatenation of `chunks` (an iterable of str).
+    Returns (tokens, chars). Memory is one chunk plus the text since the last break,
+    which is at most the last few pre-tokens when the chunk has no safe break.
+    """
+    tokens = 0
+    chars = 0
+    carry = ""
+    for chunk in chunks:
+        chars += len(chunk)
+        buffer = carry + chunk
+        # The carry holds no safe break (everything after the last cut was searched)
+        cut = _last_safe_break(buffer, len(carry)) or _last_pretoken_break(buffer, encoding)
+        if cut:
+            tokens += len(encoding.encode(buffer[:cut]))
+        carry = buffer[cut:]
+    if carry:
+        tokens += len(encoding.encode(carry))
+    return tokens, chars
+
+def iter_file_chunks(path, chunk_chars: int = DEFAULT_CHUNK_CHARS, encoding: str = "utf-8"):
+    """Yields the text of `path` chunk_chars characters at a time, line endings untranslated."""
+    with open(path, "r", encoding=encoding, newline="") as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
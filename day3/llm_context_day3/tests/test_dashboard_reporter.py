@@ -0,0 +1,106 @@
+import pytest
+import sys
+import os
+import copy
+import socket
+import time
+import threading
+from http.server import HTTPServer
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard
+from dashboard_reporter import DashboardReporter
+
+INITIAL_METRICS = copy.deepcopy(dashboard.metrics)
+
+@pytest.fixture
+def dashboard_url():
+    dashboard.metrics.clear()
+    dashboard.metrics.update(copy.deepcopy(INITIAL_METRICS))
+    dashboard.timeseries = dashboard.SecondsRing(60)
+    server = HTTPServer(('127.0.0.1', 0), dashboard.DashboardHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_updates_are_aggregated_into_one_flush(dashboard_url):
+    """Test that many recorded operations reach the dashboard as summed totals"""
+    reporter = DashboardReporter(dashboard_url, flush_interval=60)
+    for _ in range(100):
+        reporter.record(tokens=10, chars=40, operations=1)
+    for _ in range(3):
+        reporter.record(context_simulation=True, overflow=True, truncated_tokens=25)
+    reporter.record(context_used=50, context_size=200, cache_stats={"hits": 3, "misses": 1})
+    assert reporter.flush()
+    reporter.close()
+
+    assert reporter.stats["flushes"] == 1
+    assert dashboard.metrics["total_token_count_operations"] == 100
+    assert dashboard.metrics["total_tokens_counted"] == 1000
+    assert dashboard.metrics["average_chars_per_token"] == 4.0
+    assert dashboard.metrics["total_context_window_simulations"] == 3
+    assert dashboard.metrics["total_context_overflow_events"] == 3
+    assert dashboard.metrics["total_tokens_truncated"] == 75
+    assert dashboard.metrics["total_context_utilization"] == 25.0
+    assert dashboard.metrics["token_cache_hit_rate"] == 75.0
+
+def test_unresponsive_dashboard_never_blocks_record_and_keeps_totals():
+    """Test that recording stays fast while flushes hang, and unsent totals are kept"""
+    # Accepts connections but never answers, so every flush hangs until its timeout
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    reporter = DashboardReporter(f"http://127.0.0.1:{listener.getsockname()[1]}", flush_interval=60, timeout=0.3)
+    try:
+        reporter.record(tokens=1, operations=1)
+        hanging_flush = threading.Thread(target=reporter.flush)
+        hanging_flush.start()
+        start = time.perf_counter()
+        for _ in range(1000):
+            reporter.record(tokens=1, operations=1)
+        assert time.perf_counter() - start < 0.1
+        hanging_flush.join()
+        assert reporter.stats["failed_flushes"] == 1
+        assert reporter._pending["tokens"] == 1001
+    finally:
+        reporter._stopping.set()
+        listener.close()
+
+def test_seconds_ring_rolls_up_completed_seconds_and_reuses_slots():
+    """Test 1s/10s/1m rollups over completed seconds and that a slot is reset when its second comes round again"""
+    ring = dashboard.SecondsRing(60)
+    ring.record(1000.1, tokens=10)
+    ring.record(1000.9, tokens=5, truncations=1, truncated_tokens=40, utilization=50.0)
+    ring.record(1005.0, tokens=7, utilization=100.0)
+    # Second 1005 is still in progress, so it isn't counted yet
+    assert ring.snapshot(1005.5)["rollups"]["1s"]["tokens"] == 0
+    rollups = ring.snapshot(1006.0)["rollups"]
+    assert rollups["1s"]["tokens"] == 7
+    assert rollups["10s"] == {"tokens": 22, "tokens_per_second": 2.2, "truncations": 1,
+                              "truncated_tokens": 40, "avg_context_utilization": 75.0}
+    # Sixty-one seconds later the same slot holds only the new second's data
+    ring.record(1061.0, tokens=3)
+    snapshot = ring.snapshot(1062.0)
+    assert snapshot["rollups"]["1s"]["tokens"] == 3
+    assert snapshot["rollups"]["1m"]["tokens"] == 10
+    assert len(snapshot["per_second"]["tokens"]) == 60
+    assert len(ring.stamps) == 61
+
+def test_metrics_endpoint_exposes_timeseries(dashboard_url):
+    """Test that /metrics carries the rollups next to the totals"""
+    import requests
+    reporter = DashboardReporter(dashboard_url, flush_interval=60)
+    reporter.record(tokens=120, operations=3, overflow=True, truncated_tokens=30, context_used=90, context_size=100)
+    reporter.flush()
+    reporter.close()
+    # Rollups only cover completed seconds: wait for the recorded one to end
+    time.sleep(1.05 - time.time() % 1)
+    data = requests.get(f"{dashboard_url}/metrics", timeout=2).json()
+    assert data["total_tokens_counted"] == 120
+    assert data["timeseries"]["rollups"]["1m"]["tokens"] == 120
+    assert data["timeseries"]["rollups"]["1m"]["truncations"] == 1
+    assert data["timeseries"]["rollups"]["1m"]["avg_context_utilization"] == 90.0
@@ -5,7 +5,8 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from main_with_dashboard import count_tokens, truncate_text_to_fit_context, simulate_llm_interaction
+from main_with_dashboard import (count_tokens, count_tokens_batch, count_tokens_stream, count_tokens_file,
+                                 truncate_text_to_fit_context, simulate_llm_interaction)
 
 def test_count_tokens_short_text():
     """Test token counting with short text"""
@@ -54,3 +55,351 @@ def test_simulate_llm_interaction_overflow():
     text = "The quick brown fox jumps over the lazy dog. " * 100
     # Should not raise exception
     simulate_llm_interaction(text, context_window_size=50, expected_output_tokens=10)
+
+def test_tokenizer_registry_resolves_each_model_once(monkeypatch):
+    """Test that model -> encoding resolution is cached, including from many threads"""
+    import threading
+    import tiktoken
+    import tokenizer_registry
+
+    tokenizer_registry.clear()
+    calls = []
+    original = tiktoken.encoding_for_model
+    def counting_encoding_for_model(model_name):
+        calls.append(model_name)
+        return original(model_name)
+    monkeypatch.setattr(tiktoken, "encoding_for_model", counting_encoding_for_model)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(tokenizer_registry.get_encoding("gpt-4"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["gpt-4"]
+    assert all(encoding is results[0] for encoding in results)
+
+def test_tokenizer_registry_caches_fallback():
+    """Test that unknown models fall back to cl100k_base and the fallback is cached too"""
+    import tokenizer_registry
+
+    encoding = tokenizer_registry.get_encoding("not-a-real-model")
+    assert encoding.name == "cl100k_base"
+    assert tokenizer_registry.get_encoding("not-a-real-model") is encoding
+
+def test_count_tokens_batch_matches_count_tokens():
+    """Test that batch counting returns the same counts, in order, as one-at-a-time counting"""
+    texts = ["Hello, world!", "", "Привет мир! こんにちは世界！😊", "The quick brown fox jumps over the lazy dog. " * 20]
+    assert count_tokens_batch(texts, workers=2) == [count_tokens(text) for text in texts]
+
+def test_count_tokens_batch_accepts_generators_across_chunks():
+    """Test that a generator longer than one chunk is counted completely"""
+    texts = (f"document number {i}" for i in range(25))
+    counts = count_tokens_batch(texts, workers=4, chunk_size=10)
+    assert len(counts) == 25
+    assert counts[7] == count_tokens("document number 7")
+
+def test_token_count_cache_hits_on_repeated_text():
+    """Test that repeated texts are counted from the cache and hit rate is tracked"""
+    from token_cache import TokenCountCache
+    from tokenizer_registry import get_encoding
+
+    cache = TokenCountCache(max_entries=2)
+    encoding = get_encoding("gpt-4")
+    system_prompt = "You are a helpful assistant. " * 10
+    first = cache.count(system_prompt, encoding)
+    assert cache.count(system_prompt, encoding) == first == len(encoding.encode(system_prompt))
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+    assert cache.hit_rate() == 0.5
+
+    cache.count("other text", encoding)
+    cache.count("third text", encoding)
+    assert cache.snapshot()["entries"] == 2
+    assert cache.stats["evictions"] == 1
+
+def test_token_count_cache_keeps_arrays_for_hot_strings_within_cap():
+    """Test that token arrays are cached only for hot strings and stay under the byte cap"""
+    from token_cache import TokenCountCache
+    from tokenizer_registry import get_encoding
+
+    encoding = get_encoding("gpt-4")
+    text = "The quick brown fox jumps over the lazy dog. " * 5
+    cache = TokenCountCache(max_token_bytes=4 * len(encoding.encode(text)), hot_after=2)
+    assert cache.encode(text, encoding) == encoding.encode(text)
+    assert cache.snapshot()["token_arrays"] == 0
+    cache.encode(text, encoding)
+    assert cache.snapshot()["token_arrays"] == 1
+    assert cache.encode(text, encoding) == encoding.encode(text)
+    assert cache.stats["token_hits"] == 1
+
+    other = "A different hot string entirely. " * 5
+    cache.encode(other, encoding)
+    cache.encode(other, encoding)
+    assert cache.snapshot()["token_bytes"] <= cache.max_token_bytes
+
+def test_tail_window_truncation_matches_full_encode():
+    """Test that window truncation keeps exactly the tokens a full encode would keep"""
+    from tokenizer_registry import get_encoding
+    from truncation import truncate_tail
+
+    encoding = get_encoding("gpt-4")
+    texts = [
+        "The quick brown fox jumps over the lazy dog. " * 2000,
+        "Hello world! Привет мир! こんにちは世界！😊 1234567890   \n\n\t" * 500,
+        "x" * 20000,
+        " " * 5000 + "end",
+        "word " * 2000 + "\n" * 200,
+        "word " * 2000 + " " * 300,
+        ("word " * 300 + "\n" * 150 + "\t " * 100) * 5,
+        "Paragraph one ends here." + " " * 4000 + "and then it goes on. " * 200,
+    ]
+    for text in texts:
+        tokens = encoding.encode(text)
+        for max_tokens in (1, 17, 256, len(tokens) - 1, len(tokens) + 5):
+            expected = text if len(tokens) <= max_tokens else encoding.decode(tokens[-max_tokens:])
+            assert truncate_tail(text, max_tokens, encoding) == (expected, min(max_tokens, len(tokens)))
+
+def test_truncate_text_returns_count_when_asked():
+    """Test that return_count gives the kept token count without a recount"""
+    text = "The quick brown fox jumps over the lazy dog. " * 50
+    truncated, token_count = truncate_text_to_fit_context(text, 10, return_count=True)
+    assert token_count == 10
+    assert truncated == truncate_text_to_fit_context(text, 10)
+
+def test_token_estimator_bound_covers_exact_counts():
+    """Test that the calibrated estimate's confidence bound holds on unseen mixed-script text"""
+    import token_estimator
+    from tokenizer_registry import get_encoding
+
+    encoding = get_encoding("gpt-4")
+    token_estimator.clear()
+    model = token_estimator.calibrate(encoding)
+    assert model.relative_bound > 0
+    # Fresh prose-like texts and fresh identifier/log/code texts, neither used in the fit
+    for texts in (token_estimator.calibration_corpus(100, seed=1), token_estimator.holdout_corpus(100, seed=2)):
+        covered = 0
+        for text in texts:
+            estimate = token_estimator.estimate_tokens(text, encoding)
+            covered += estimate.low <= len(encoding.encode(text)) <= estimate.high
+        assert covered / len(texts) >= 0.95
+    assert token_estimator.estimate_tokens("", encoding) == (0, 0, 0)
+
+def test_token_estimator_calibrates_once_for_concurrent_first_callers(monkeypatch):
+    """Test that threads asking for an uncalibrated model share one calibration"""
+    import threading
+    import token_estimator
+    from tokenizer_registry import get_encoding
+
+    encoding = get_encoding("gpt-4")
+    token_estimator.clear()
+    calls = []
+    original = token_estimator._fit_model
+    def counting_fit_model(*args):
+        calls.append(args[0].name)
+        return original(*args)
+    monkeypatch.setattr(token_estimator, "_fit_model", counting_fit_model)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(token_estimator.model_for(encoding))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [encoding.name]
+    assert all(model is results[0] for model in results)
+
+def test_truncate_counts_exactly_unless_the_estimate_is_requested(monkeypatch):
+    """Test that the default path never trusts the estimator, so unusual text can't exceed the limit"""
+    import uuid
+    import main_with_dashboard
+    from tokenizer_registry import get_encoding
+
+    def fail(*args, **kwargs):
+        raise AssertionError("estimator consulted")
+
+    encoding = get_encoding("gpt-4")
+    text = " ".join(str(uuid.UUID(int=i * 7919)) + " " + format(i * 104729, "x") for i in range(40))
+    limit = len(encoding.encode(text)) - 1
+    with monkeypatch.context() as patch:
+        patch.setattr(main_with_dashboard, "fits_within", fail)
+        truncated = truncate_text_to_fit_context(text, limit)
+    assert len(encoding.encode(truncated)) <= limit
+    assert truncate_text_to_fit_context(text, limit, estimate=True) in (text, truncated)
+
+def test_fits_within_only_encodes_near_the_limit():
+    """Test that the pre-filter skips the exact count unless the limit is inside the bound"""
+    import token_estimator
+    from tokenizer_registry import get_encoding
+
+    encoding = get_encoding("gpt-4")
+    text = "The quick brown fox jumps over the lazy dog. " * 20
+    exact = len(encoding.encode(text))
+    counted = []
+    def count(full_text):
+        counted.append(full_text)
+        return len(encoding.encode(full_text))
+
+    estimate = token_estimator.estimate_tokens(text, encoding)
+    assert token_estimator.fits_within(text, estimate.high, encoding, count=count) == (True, None)
+    assert token_estimator.fits_within(text, estimate.low - 1, encoding, count=count) == (False, None)
+    assert counted == []
+    assert estimate.low < estimate.tokens < estimate.high
+    assert token_estimator.fits_within(text, estimate.tokens, encoding, count=count) == (exact <= estimate.tokens, exact)
+    assert counted == [text]
+
+def test_count_tokens_stream_matches_full_encode_across_chunk_edges():
+    """Test that chunked counting equals counting the joined text, whatever the chunk size"""
+    text = ("Hello world! Привет мир! こんにちは世界！😊 don't stop... 12345\r\n\n  tabs\there. " * 40)
+    expected = count_tokens(text)
+    for chunk_size in (1, 7, 64, 1000, len(text)):
+        chunks = (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+        assert count_tokens_stream(chunks) == expected
+    assert count_tokens_stream([]) == 0
+
+def test_count_stream_is_exact_for_blank_lines_in_every_encoding_family():
+    """Test that chunk edges around newline runs before a word never change the count"""
+    import tiktoken
+    from stream_counting import count_stream
+
+    text = "First paragraph.\n\nSecond paragraph\n\n\nthird\r\n\nfourth\nfifth \n\nsixth. " * 10
+    for name in ("r50k_base", "p50k_base", "cl100k_base", "o200k_base"):
+        encoding = tiktoken.get_encoding(name)
+        expected = len(encoding.encode(text))
+        assert count_stream(list(text), encoding)[0] == expected, name
+        for cut in range(len(text) // 10):
+            assert count_stream([text[:cut], text[cut:]], encoding)[0] == expected, (name, cut)
+
+def test_count_tokens_file_reads_in_chunks(tmp_path):
+    """Test that file counting matches the full encode and keeps line endings as written"""
+    path = tmp_path / "document.txt"
+    text = "First line.\r\nSecond line with ünïcödé and 😊.\n" * 500
+    path.write_bytes(text.encode("utf-8"))
+    assert count_tokens_file(path, chunk_chars=100) == count_tokens(text)
+
+def test_count_stream_carry_stays_bounded_without_safe_breaks():
+    """Test that compact JSONL and CJK text, which have no word breaks, are still encoded chunk by chunk"""
+    import json
+    from tokenizer_registry import get_encoding
+    from stream_counting import count_stream
+
+    class RecordingEncoding:
+        def __init__(self, encoding):
+            self.encoding = encoding
+            self.name = encoding.name
+            self._pat_str = encoding._pat_str
+            self.longest = 0
+
+        def encode(self, text):
+            self.longest = max(self.longest, len(text))
+            return self.encoding.encode(text)
+
+    encoding = get_encoding("gpt-4")
+    jsonl = "".join(json.dumps({"id": i, "tags": ["a", "b"], "ok": True}, separators=(",", ":")) + "\n"
+                    for i in range(3000))
+    cjk = "東京は日本の首都であり、多くの人が住んでいます。" * 4000
+    chunk_size = 4096
+    for text in (jsonl, cjk):
+        recording = RecordingEncoding(encoding)
+        chunks = (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+        assert count_stream(chunks, recording) == (len(encoding.encode(text)), len(text))
+        assert recording.longest < chunk_size + 100
+
+def test_pack_segments_fills_budget_by_priority():
+    """Test that segments are placed by priority, truncated to fill or dropped, and kept in input order"""
+    from context_packer import Segment, pack_segments, history_segments
+    from tokenizer_registry import get_encoding
+
+    encoding = get_encoding("gpt-4")
+    count = lambda text: len(encoding.encode(text))
+    system = "You are a helpful assistant."
+    question = "What is a context window?"
+    turns = ["First turn of the conversation. " * 5, "Second turn. " * 5, "Latest turn. " * 5]
+    document = "Retrieved document text about tokenization. " * 50
+    segments = ([Segment("system", system, priority=100)] + history_segments(turns, priority=50)
+                + [Segment("document", document, priority=10, truncatable=True), Segment("question", question, priority=90)])
+
+    budget = count(system) + count(question) + count(turns[2]) + count(turns[1]) + 20
+    packed = pack_segments(segments, budget, encoding, count=count)
+    assert [name for name, _, _ in packed.segments] == ["system", "history[1]", "history[2]", "document", "question"]
+    assert packed.tokens == budget
+    assert packed.dropped == [("history[0]", count(turns[0]))]
+    assert packed.truncated == [("document", count(document), 20)]
+    assert dict((name, text) for name, text, _ in packed.segments)["document"] == encoding.decode(encoding.encode(document)[-20:])
+
+def test_simulate_llm_interaction_with_segments_reuses_cached_counts():
+    """Test that repeated packing of the same segments is served from the token count cache"""
+    from context_packer import Segment
+    from token_cache import token_count_cache
+    from main_with_dashboard import simulate_llm_interaction_with_segments
+
+    segments = [Segment("system", "You are a helpful assistant. " * 3, priority=10),
+                Segment("question", "How many tokens is this question?", priority=5)]
+    simulate_llm_interaction_with_segments(segments, context_window_size=1024)
+    hits = token_count_cache.stats["hits"]
+    packed = simulate_llm_interaction_with_segments(segments, context_window_size=1024)
+    assert token_count_cache.stats["hits"] == hits + 2
+    assert packed.dropped == [] and packed.truncated == []
+
+def test_truncation_strategies_slice_one_encoding():
+    """Test head, head_tail and middle_out keep the expected token slices and report the count"""
+    from tokenizer_registry import get_encoding
+    from truncation import ELLIPSIS_MARKER
+
+    encoding = get_encoding("gpt-4")
+    text = " ".join(f"word{i}" for i in range(400))
+    tokens = encoding.encode(text)
+    marker_tokens = len(encoding.encode(ELLIPSIS_MARKER))
+
+    head, count = truncate_text_to_fit_context(text, 30, strategy="head", return_count=True)
+    assert (head, count) == (encoding.decode(tokens[:30]), 30)
+
+    both, count = truncate_text_to_fit_context(text, 30, strategy="head_tail", ratio=0.5, return_count=True)
+    kept = 30 - marker_tokens
+    head_part = round(kept * 0.5)
+    assert both == encoding.decode(tokens[:head_part]) + ELLIPSIS_MARKER + encoding.decode(tokens[-(kept - head_part):])
+    assert count == 30
+
+    middle, count = truncate_text_to_fit_context(text, 30, strategy="middle_out", return_count=True)
+    removed = len(tokens) - 30
+    head_part = round(len(tokens) * 0.5 - removed / 2)
+    assert middle == encoding.decode(tokens[:head_part]) + encoding.decode(tokens[-(30 - head_part):])
+    assert count == 30
+    # Centering the cut at either end degenerates to keeping the tail or the head
+    assert truncate_text_to_fit_context(text, 30, strategy="middle_out", ratio=0.0) == encoding.decode(tokens[-30:])
+    assert truncate_text_to_fit_context(text, 30, strategy="middle_out", ratio=1.0) == head
+
+def test_truncation_count_is_the_count_of_the_returned_text():
+    """Test that re-tokenization where slices are cut or joined never leaves the result over the limit"""
+    from tokenizer_registry import get_encoding
+
+    encoding = get_encoding("gpt-4")
+    text = "".join(f"abc{i}xyz😊世界{i * 37}Привет" for i in range(60))
+    for strategy in ("tail", "head", "head_tail", "middle_out"):
+        for max_tokens in range(5, 60, 3):
+            truncated, count = truncate_text_to_fit_context(text, max_tokens, strategy=strategy, return_count=True)
+            assert count == len(encoding.encode(truncated)) <= max_tokens, (strategy, max_tokens)
+
+def test_truncation_strategy_edge_cases():
+    """Test short texts pass through, oversized markers are dropped and unknown strategies are rejected"""
+    assert truncate_text_to_fit_context("Short text", 100, strategy="head_tail") == "Short text"
+    text = "The quick brown fox jumps over the lazy dog. " * 20
+    truncated, count = truncate_text_to_fit_context(text, 3, strategy="head_tail", marker=" [... many words omitted ...] ",
+                                                    return_count=True)
+    assert count == 3 and "omitted" not in truncated
+    with pytest.raises(ValueError):
+        truncate_text_to_fit_context(text, 10, strategy="sideways")
+
+def test_benchmark_report_structure(tmp_path):
+    """Test that a tiny benchmark run writes a JSON report with throughput and percentiles"""
+    import json
+    import benchmark
+
+    output = tmp_path / "results.json"
+    assert benchmark.main(["--docs", "5", "--models", "gpt-4", "--profiles", "short", "mixed", "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    assert [result["corpus"] for result in report["results"]] == ["short", "mixed"]
+    counted = report["results"][0]["benchmarks"]["count_tokens"]
+    assert counted["calls"] == 5 and counted["tokens"] > 0
+    assert {"tokens_per_sec", "p50_ms", "p90_ms", "p99_ms", "max_ms"} <= set(counted)
+    assert set(report["results"][1]["benchmarks"]) == {"count_tokens", "truncate_tail", "truncate_head_tail",
+                                                        "count_tokens_batch", "count_tokens_stream"}
@@ -0,0 +1,131 @@
+# token_cache.py
+"""
+Content-addressed memoization of token counts.
+System prompts, few-shot blocks and history turns are tokenized over and over;
+this LRU remembers their counts keyed on (encoding name, text digest), so a repeat
+costs one hash instead of a full encode. Strings that keep coming back can also
+have their encoded token arrays cached, for callers that need the tokens themselves.
+"""
+import os
+import array
+import hashlib
+import threading
+from collections import OrderedDict
+
+def text_digest(text: str) -> bytes:
+    """16-byte content digest; collisions are negligible at any realistic cache size."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+class TokenCountCache:
+    """
+    Two LRUs sharing one key space:
+    - counts: up to `max_entries` token counts (roughly 150 bytes each)
+    - token arrays: encoded tokens for strings seen at least `hot_after` times,
+      capped at `max_token_bytes` in total (4 bytes per token); 0 disables them
+    Safe to share between threads; encoding happens outside the lock.
+    """
+
+    def __init__(self, max_entries: int = 100_000, max_token_bytes: int = 16 * 1024 * 1024, hot_after: int = 2):
+        self.max_entries = max_entries
+        self.max_token_bytes = max_token_bytes
+        self.hot_after = hot_after
+        self._counts = OrderedDict()   # key -> [count, times seen]
+        self._tokens = OrderedDict()   # key -> array('I')
+        self._token_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "token_hits": 0, "token_misses": 0, "evictions": 0}
+
+    def _lookup(self, key):
+        # Caller must hold self._lock; returns the entry (and refreshes its recency) or None
+        entry = self._counts.get(key)
+        if entry is not None:
+            self._counts.move_to_end(key)
+            entry[1] += 1
+        return entry
+
+    def _store_count(self, key, count):
+        # Caller must hold self._lock
+        self._counts[key] = [count, 1]
+        while len(self._counts) > self.max_entries:
+            evicted, _ = self._counts.popitem(last=False)
+            self._drop_tokens(evicted)
+            self.stats["evictions"] += 1
+
+    def _drop_tokens(self, key):
+        tokens = self._tokens.pop(key, None)
+        if tokens is not None:
+            self._token_bytes -= tokens.itemsize * len(tokens)
+
+    def count(self, text: str, encoding) -> int:
+        """Token count of `text` under `encoding`, encoding it only on a miss."""
+        key = (encoding.name, text_digest(text))
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.stats["hits"] += 1
+                return entry[0]
+            self.stats["misses"] += 1
+        count = len(encoding.encode(text))
+        with self._lock:
+            self._store_count(key, count)
+        return count
+
+    def peek(self, text: str, encoding):
+        """Cached token count of `text`, or None; never encodes and doesn't touch the stats."""
+        with self._lock:
+            entry = self._counts.get((encoding.name, text_digest(text)))
+            return entry[0] if entry is not None else None
+
+    def encode(self, text: str, encoding) -> list:
+        """Tokens of `text`; served from the token-array cache once the string is hot."""
+        key = (encoding.name, text_digest(text))
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached is not None:
+                self._tokens.move_to_end(key)
+                self._lookup(key)
+                self.stats["token_hits"] += 1
+                return cached.tolist()
+            self.stats["token_misses"] += 1
+            entry = self._lookup(key)
+            hot = entry is not None and entry[1] >= self.hot_after
+        tokens = encoding.encode(text)
+        with self._lock:
+            if entry is None:
+                self._store_count(key, len(tokens))
+            size = 4 * len(tokens)
+            if hot and self.max_token_bytes and size <= self.max_token_bytes and key not in self._tokens:
+                self._tokens[key] = array.array("I", tokens)
+                self._token_bytes += size
+                while self._token_bytes > self.max_token_bytes:
+                    evicted, evicted_tokens = self._tokens.popitem(last=False)
+                    self._token_bytes -= evicted_tokens.itemsize * len(evicted_tokens)
+        return tokens
+
+    def hit_rate(self) -> float:
+        """Share of count lookups answered from the cache."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return self.stats["hits"] / lookups if lookups else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(entries=len(self._counts), token_arrays=len(self._tokens), token_bytes=self._token_bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self._tokens.clear()
+            self._token_bytes = 0
+            for name in self.stats:
+                self.stats[name] = 0
+
+# Shared by count_tokens / truncate_text_to_fit_context; sized via environment variables
+token_count_cache = TokenCountCache(
+    max_entries=int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "100000")),
+    max_token_bytes=int(os.getenv("TOKEN_CACHE_MAX_TOKEN_BYTES", str(16 * 1024 * 1024))),
+)
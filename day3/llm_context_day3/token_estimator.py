@@ -0,0 +1,265 @@
+# token_estimator.py
+"""
+Fast token-count estimates from character-class statistics.
+Letters, digits, punctuation, word breaks and Cyrillic/CJK/emoji characters are counted
+with a handful of C-speed byte scans (the class of a non-ASCII character follows from
+its UTF-8 length); a per-encoding linear model, calibrated once against a local corpus,
+turns those counts into an estimate with a confidence bound. The bound is measured on
+texts kept out of the fit, including a separately generated corpus of identifiers, logs
+and code unlike the calibration fragments. When the bound already says a text clearly
+fits (or clearly overflows) a limit, the exact encode is skipped.
+"""
+import math
+import uuid
+import base64
+import random
+import string
+import threading
+from collections import namedtuple
+
+# Byte classes; UTF-8 lead bytes stand for the whole character:
+# 2-byte sequences are mostly Cyrillic/Greek/accented Latin, 3-byte CJK and kana, 4-byte emoji
+_CLASS_BYTES = (
+    ("ascii_letters", string.ascii_letters.encode()),
+    ("digits", string.digits.encode()),
+    ("punctuation", string.punctuation.encode()),
+    ("tabs_etc", b"\t\r\x0b\x0c"),
+    ("cyrillic_etc", bytes(range(0xC0, 0xE0))),
+    ("cjk_etc", bytes(range(0xE0, 0xF0))),
+    ("emoji_etc", bytes(range(0xF0, 0xF8))),
+)
+FEATURES = tuple(name for name, _ in _CLASS_BYTES) + ("spaces", "newlines")
+_NON_ASCII_CLASSES = 3
+
+# Share of a caller-supplied calibration corpus held out to measure the error bound
+HOLDOUT_EVERY = 3
+# Relative-error quantile reported as the confidence bound
+BOUND_QUANTILE = 0.99
+# Absolute slack on top of the relative bound, so tiny texts aren't judged on a 1-token model
+ABSOLUTE_SLACK = 2
+
+TokenEstimate = namedtuple("TokenEstimate", ["tokens", "low", "high"])
+
+_models = {}
+_lock = threading.Lock()
+
+def features(text: str) -> list:
+    """Character-class counts of `text`, in FEATURES order."""
+    data = text.encode("utf-8", "surrogatepass")
+    classes = _CLASS_BYTES[:-_NON_ASCII_CLASSES] if text.isascii() else _CLASS_BYTES
+    counts = [len(data) - len(data.translate(None, members)) for _, members in classes]
+    counts.extend([0] * (len(_CLASS_BYTES) - len(classes)))
+    counts.append(data.count(b" "))
+    counts.append(data.count(b"\n"))
+    return counts
+
+def _solve(matrix, vector):
+    """Solves a small dense linear system by Gaussian elimination with partial pivoting."""
+    size = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda r: abs(rows[r][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        divisor = rows[column][column]
+        for r in range(column + 1, size):
+            factor = rows[r][column] / divisor
+            for c in range(column, size + 1):
+                rows[r][c] -= factor * rows[column][c]
+    solution = [0.0] * size
+    for r in reversed(range(size)):
+        solution[r] = (rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))) / rows[r][r]
+    return solution
+
+def _fit(samples):
+    """
+    Least-squares weights for (features, tokens) samples, each row scaled by 1/tokens so
+    the fit minimizes relative error; a small ridge term keeps unused classes at ~0.
+    """
+    size = len(FEATURES)
+    normal = [[0.0] * size for _ in range(size)]
+    target = [0.0] * size
+    for counts, tokens in samples:
+        scale = 1.0 / (tokens * tokens)
+        for i in range(size):
+            if counts[i]:
+                target[i] += counts[i] * tokens * scale
+                for j in range(size):
+                    normal[i][j] += counts[i] * counts[j] * scale
+    for i in range(size):
+        normal[i][i] += 1e-6
+    return _solve(normal, target)
+
+def _predict(weights, counts) -> float:
+    return max(0.0, sum(weight * count for weight, count in zip(weights, counts)))
+
+class EncodingModel:
+    """Calibrated weights for one encoding plus the relative error bound they achieved."""
+
+    def __init__(self, weights, relative_bound, samples):
+        self.weights = weights
+        self.relative_bound = relative_bound
+        self.samples = samples
+
+    def estimate(self, text: str) -> TokenEstimate:
+        tokens = _predict(self.weights, features(text))
+        if not text:
+            return TokenEstimate(0, 0, 0)
+        margin = tokens * self.relative_bound + ABSOLUTE_SLACK
+        return TokenEstimate(round(tokens), max(0, math.floor(tokens - margin)), math.ceil(tokens + margin))
+
+# Fragments the calibration corpus is assembled from, one list per script mix
+_FRAGMENTS = {
+    "english": [
+        "The quick brown fox jumps over the lazy dog.",
+        "Large Language Models, once confined to the realm of theoretical computer science, have permeated daily life.",
+        "Among these, the most fundamental are the concepts of tokenization and the context window.",
+        "We must understand how raw text transforms into the numerical sequences that LLMs consume.",
+        "Hello, world! This is a short sentence.",
+    ],
+    "russian": [
+        "Привет мир!",
+        "Большие языковые модели меняют наше взаимодействие с технологиями.",
+        "Контекстное окно определяет, сколько текста модель может учесть за один раз.",
+    ],
+    "japanese": ["こんにちは世界！", "大規模言語モデルは私たちの生活を変えています。", "トークン化とコンテキストウィンドウ"],
+    "chinese": ["你好，世界！", "大型语言模型正在改变我们与技术的互动方式。", "上下文窗口决定了模型能记住多少内容。"],
+    "korean": ["안녕하세요 세계!", "대규모 언어 모델은 우리의 일상을 바꾸고 있습니다."],
+    "emoji": ["😊", "🚀🔥", "👍 🎉", "❤️"],
+    "digits": ["1234567890", "3.14159", "2024-01-15", "$1,299.99", "42"],
+    "code": ['def count(text): return len(text.split())', '{"tokens": 128, "model": "gpt-4"}', "x = [i * 2 for i in range(10)]"],
+    "whitespace": ["\n\n", "    ", "\t", "\n"],
+}
+
+def calibration_corpus(samples: int = 600, seed: int = 0) -> list:
+    """Deterministic mixed-script corpus, modeled on the short/long/mixed texts in main.py."""
+    rng = random.Random(seed)
+    scripts = list(_FRAGMENTS)
+    corpus = []
+    for i in range(samples):
+        mix = rng.sample(scripts, rng.randint(1, 4))
+        target_length = rng.choice((20, 80, 300, 1500))
+        parts = []
+        length = 0
+        while length < target_length:
+            fragment = rng.choice(_FRAGMENTS[rng.choice(mix)])
+            parts.append(fragment)
+            length += len(fragment) + 1
+        corpus.append(" ".join(parts))
+    return corpus
+
+def holdout_corpus(samples: int = 300, seed: int = 1) -> list:
+    """
+    Deterministic corpus that shares nothing with calibration_corpus(): hex IDs, UUIDs,
+    base64, log lines, code and random words, alone or mixed. Used only to measure the
+    error bound, so the bound reflects text the model was not fitted on.
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 11))) for _ in range(200)]
+
+    def hex_id():
+        digits = rng.choice((8, 16, 32, 40, 64))
+        return f"{rng.getrandbits(4 * digits):0{digits}x}"
+
+    def random_uuid():
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+
+    def base64_blob():
+        return base64.b64encode(rng.randbytes(rng.randint(12, 96))).decode()
+
+    def log_line():
+        return (f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:"
+                f"{rng.randint(0, 59):02d}Z level={rng.choice(('INFO', 'WARN', 'ERROR'))} request_id={random_uuid()} "
+                f"latency_ms={rng.randint(1, 9999)} path=/api/v{rng.randint(1, 3)}/{rng.choice(words)}\n")
+
+    def code_line():
+        return (f"    if ({rng.choice(words)}[{rng.randint(0, 99)}] != {rng.choice(words)}_{rng.randint(0, 9)}) "
+                f"{{ return self.{rng.choice(words)}({rng.choice(words)}, {rng.randint(0, 999)}); }}\n")
+
+    def random_words():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(3, 15))) + rng.choice((". ", ", ", "! ", "\n"))
+
+    generators = (hex_id, random_uuid, base64_blob, log_line, code_line, random_words)
+    corpus = []
+    for _ in range(samples):
+        mix = rng.sample(generators, rng.randint(1, 3))
+        target_length = rng.choice((20, 80, 300, 1500))
+        parts = []
+        length = 0
+        while length < target_length:
+            part = rng.choice(mix)()
+            parts.append(part)
+            length += len(part) + 1
+        corpus.append(" ".join(parts))
+    return corpus
+
+def calibrate(encoding, corpus=None, holdout=None) -> EncodingModel:
+    """
+    Fits the estimator for `encoding` on `corpus` (default: calibration_corpus()) and
+    installs it. The BOUND_QUANTILE relative error on texts kept out of the fit becomes
+    the confidence bound: `holdout` if given, otherwise every HOLDOUT_EVERY-th text of
+    the corpus; with the default corpus, holdout_corpus() is added as well. Pass samples
+    of your real traffic as corpus and holdout for a tighter bound.
+    """
+    model = _fit_model(encoding, corpus, holdout)
+    with _lock:
+        _models[encoding.name] = model
+    return model
+
+def _fit_model(encoding, corpus, holdout) -> EncodingModel:
+    def measure(texts):
+        texts = [text for text in texts if text]
+        samples = [(features(text), len(tokens)) for text, tokens in zip(texts, encoding.encode_batch(texts))]
+        return [sample for sample in samples if sample[1] > 0]
+
+    samples = measure(corpus if corpus is not None else calibration_corpus())
+    if holdout is not None:
+        train, held_out = samples, [measure(holdout)]
+    else:
+        train = [sample for i, sample in enumerate(samples) if i % HOLDOUT_EVERY]
+        held_out = [[sample for i, sample in enumerate(samples) if not i % HOLDOUT_EVERY]]
+        if corpus is None:
+            held_out.append(measure(holdout_corpus()))
+    weights = _fit(train)
+    # Errors relative to the prediction, as the margin is applied to it; each held-out set
+    # must be covered on its own, so a small but badly predicted set isn't averaged away
+    relative_bound = 0.0
+    for held_out_samples in [group for group in held_out if group] or [train]:
+        errors = sorted(abs(_predict(weights, counts) - tokens) / max(_predict(weights, counts), 1.0)
+                        for counts, tokens in held_out_samples)
+        relative_bound = max(relative_bound, errors[min(len(errors) - 1, int(BOUND_QUANTILE * len(errors)))])
+    return EncodingModel(weights, relative_bound, len(samples))
+
+def model_for(encoding) -> EncodingModel:
+    """The calibrated model for `encoding`, calibrating on the built-in corpus on first use."""
+    model = _models.get(encoding.name)
+    if model is not None:
+        return model
+    with _lock:
+        # Another thread may have calibrated it while we waited
+        model = _models.get(encoding.name)
+        if model is None:
+            model = _models[encoding.name] = _fit_model(encoding, None, None)
+    return model
+
+def estimate_tokens(text: str, encoding) -> TokenEstimate:
+    """Estimated token count of `text` with a (low, high) confidence bound; never encodes."""
+    return model_for(encoding).estimate(text)
+
+def fits_within(text: str, max_tokens: int, encoding, count=None):
+    """
+    Whether `text` fits in max_tokens. Returns (fits, exact_count_or_None).
+    The exact count (via `count`, default len(encoding.encode(text))) is only computed
+    when max_tokens falls inside the estimate's confidence bound.
+    """
+    estimate = estimate_tokens(text, encoding)
+    if estimate.high <= max_tokens:
+        return True, None
+    if estimate.low > max_tokens:
+        return False, None
+    exact = count(text) if count is not None else len(encoding.encode(text))
+    return exact <= max_tokens, exact
+
+def clear():
+    """Forgets every calibrated model (mainly for tests)."""
+    with _lock:
+        _models.clear()
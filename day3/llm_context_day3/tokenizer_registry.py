@@ -0,0 +1,36 @@
+# tokenizer_registry.py
+"""
+Process-wide tokenizer registry.
+Resolves a model name to its tiktoken encoding once and hands back the same
+Encoding object on every later call, including the cl100k_base fallback for
+unknown models. Safe to call from many threads; each model is resolved exactly once.
+"""
+import threading
+import tiktoken
+
+FALLBACK_ENCODING = "cl100k_base"
+
+_encodings_by_model = {}
+_lock = threading.Lock()
+
+def get_encoding(model_name: str = "gpt-4") -> tiktoken.Encoding:
+    """Returns the cached tiktoken Encoding for model_name (cl100k_base if the model is unknown)."""
+    encoding = _encodings_by_model.get(model_name)
+    if encoding is not None:
+        return encoding
+    with _lock:
+        # Another thread may have resolved it while we waited
+        encoding = _encodings_by_model.get(model_name)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                print(f"Warning: Tokenizer for model '{model_name}' not found. Using '{FALLBACK_ENCODING}' fallback.")
+                encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+            _encodings_by_model[model_name] = encoding
+    return encoding
+
+def clear():
+    """Forgets every resolved model (mainly for tests)."""
+    with _lock:
+        _encodings_by_model.clear()
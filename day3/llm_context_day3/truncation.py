@@ -0,0 +1,125 @@
+# truncation.py
+"""
+Tail truncation that only encodes the end of the document.
+Keeping the last N tokens of a multi-megabyte text shouldn't cost a full encode:
+we encode a character window sized from a calibrated chars/token estimate, widen it
+only if it holds fewer than N tokens, and return exactly what encoding the whole
+text and slicing tokens[-N:] would have returned.
+"""
+import threading
+
+from stream_counting import first_safe_break
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+# Window slack over the estimate, so a typical estimate error doesn't force a second pass
+WINDOW_SLACK = 1.2
+
+_chars_per_token = {}
+_calibration_lock = threading.Lock()
+
+def chars_per_token(encoding_name: str) -> float:
+    """Current chars/token estimate for an encoding, learned from previous windows."""
+    return _chars_per_token.get(encoding_name, DEFAULT_CHARS_PER_TOKEN)
+
+def _calibrate(encoding_name: str, chars: int, tokens: int):
+    if tokens == 0:
+        return
+    with _calibration_lock:
+        previous = _chars_per_token.get(encoding_name)
+        observed = chars / tokens
+        # Moving average: adapts to the workload's script mix without jumping on one odd text
+        _chars_per_token[encoding_name] = observed if previous is None else 0.8 * previous + 0.2 * observed
+
+def truncate_tail(text: str, max_tokens: int, encoding, encode=None):
+    """
+    Keep the last max_tokens tokens of `text`. Returns (text, token_count).
+
+    Only a tail window of the text is encoded; the result is identical to
+    encoding.decode(encoding.encode(text)[-max_tokens:]). `encode` replaces
+    encoding.encode for the whole-text fallback (e.g. a caching encoder).
+    """
+    if max_tokens <= 0:
+        return "", 0
+    window = max(1, int(max_tokens * chars_per_token(encoding.name) * WINDOW_SLACK))
+    while window < len(text):
+        # Start the window at a safe break, where the full text also starts a new
+        # pre-token, so it encodes to exactly the full encode's tokens after that point.
+        # A start inside a pre-token (a long whitespace or letter run) splits differently.
+        start = first_safe_break(text, len(text) - window)
+        if start is not None:
+            tokens = encoding.encode(text[start:])
+            _calibrate(encoding.name, len(text) - start, len(tokens))
+            if len(tokens) >= max_tokens:
+                return encoding.decode(tokens[-max_tokens:]), max_tokens
+        # Too few tokens after the break (or no break in the window): widen it
+        window *= 2
+
+    tokens = (encode or encoding.encode)(text)
+    _calibrate(encoding.name, len(text), len(tokens))
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[-max_tokens:]), max_tokens
+
+STRATEGIES = ("tail", "head", "head_tail", "middle_out")
+ELLIPSIS_MARKER = "\n...\n"
+
+def _join_slices(tokens, budget: int, encoding, strategy: str, ratio: float, marker) -> str:
+    """The kept token slices of a non-tail strategy for `budget` tokens, decoded and joined."""
+    if strategy == "head":
+        return encoding.decode(tokens[:budget])
+    if marker is None:
+        marker = ELLIPSIS_MARKER if strategy == "head_tail" else ""
+    marker_tokens = len(encoding.encode(marker)) if marker else 0
+    if marker_tokens >= budget:
+        marker, marker_tokens = "", 0
+    budget -= marker_tokens
+    if strategy == "head_tail":
+        head = round(budget * ratio)
+    else:
+        removed = len(tokens) - budget
+        head = min(max(0, round(len(tokens) * ratio - removed / 2)), budget)
+    tail = budget - head
+    kept_tail = encoding.decode(tokens[-tail:]) if tail else ""
+    return encoding.decode(tokens[:head]) + marker + kept_tail
+
+def truncate(text: str, max_tokens: int, encoding, strategy: str = "tail", ratio: float = 0.5, marker=None, encode=None):
+    """
+    Cut `text` to max_tokens tokens with one of STRATEGIES. Returns (text, token_count).
+
+    - tail: keep the last tokens (truncate_tail, which skips the full encode)
+    - head: keep the first tokens
+    - head_tail: keep `ratio` of the budget from the start and the rest from the end,
+      joined by `marker` (default ELLIPSIS_MARKER)
+    - middle_out: remove one span whose center sits at `ratio` of the way through the
+      text (0.5 = the exact middle), joined by `marker` (default none)
+
+    The text is encoded once and the token array sliced. Decoded slices can re-tokenize
+    differently where they were cut or joined, so the returned text is encoded again:
+    token_count is its exact count, and if it came out over max_tokens the slices are
+    shrunk by the excess and cut again. A marker that wouldn't fit is left out.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown truncation strategy {strategy!r}; expected one of {STRATEGIES}")
+    if not 0 <= ratio <= 1:
+        raise ValueError(f"ratio must be between 0 and 1, got {ratio}")
+    if max_tokens <= 0:
+        return "", 0
+    if strategy == "tail":
+        kept, token_count = truncate_tail(text, max_tokens, encoding, encode=encode)
+        if kept is text:
+            return text, token_count
+        cut = lambda budget: truncate_tail(text, budget, encoding, encode=encode)[0]
+    else:
+        tokens = (encode or encoding.encode)(text)
+        if len(tokens) <= max_tokens:
+            return text, len(tokens)
+        cut = lambda budget: _join_slices(tokens, budget, encoding, strategy, ratio, marker)
+        kept = cut(max_tokens)
+
+    budget = max_tokens
+    while True:
+        token_count = len(encoding.encode(kept))
+        if token_count <= max_tokens or budget == 0:
+            return kept, token_count
+        budget = max(0, budget - (token_count - max_tokens))
+        kept = cut(budget)
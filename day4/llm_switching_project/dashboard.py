@@ -1,13 +1,19 @@
 # filename: dashboard.py
 import json
 import os
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string
 from flask_cors import CORS
+import metrics_log
+import metrics_db
+from prometheus_text import PROMETHEUS_CONTENT_TYPE, MetricsCache, append_metric, append_summary, timestamp_seconds
 
 app = Flask(__name__)
 CORS(app)
 
-METRICS_FILE = "metrics.json"
+METRICS_FILE = metrics_log.METRICS_FILE
+# Must match the backend llm_switcher writes to (see METRICS_BACKEND there)
+METRICS_BACKEND = os.getenv("METRICS_BACKEND", "jsonl")
+metrics_store = metrics_db if METRICS_BACKEND == "sqlite" else metrics_log
 
 DASHBOARD_HTML = """
 <!DOCTYPE html>
@@ -245,34 +251,46 @@ DASHBOARD_HTML = """
 """
 
 def load_metrics():
-    """Load metrics from JSON file."""
-    if os.path.exists(METRICS_FILE):
-        try:
-            with open(METRICS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {
-                "total_requests": 0,
-                "openai_requests": 0,
-                "anthropic_requests": 0,
-                "total_latency_ms": 0,
-                "openai_latency_ms": 0,
-                "anthropic_latency_ms": 0,
-                "errors": 0,
-                "last_request_time": None,
-                "requests": []
-            }
-    return {
-        "total_requests": 0,
-        "openai_requests": 0,
-        "anthropic_requests": 0,
-        "total_latency_ms": 0,
-        "openai_latency_ms": 0,
-        "anthropic_latency_ms": 0,
-        "errors": 0,
-        "last_request_time": None,
-        "requests": []
-    }
+    """Load metrics: the metrics.json snapshot plus the event log written since."""
+    return _metrics_cache.metrics()
+
+# --- Prometheus exposition ---
+# jsonl: re-parses metrics.json only after a compaction, otherwise replays just the new log lines;
+# sqlite: re-queries the aggregate tables only when another connection has committed
+_metrics_reader = metrics_store.MetricsReader()
+
+def _reader_version():
+    _metrics_reader.read()
+    return _metrics_reader.version
+
+def _reader_metrics():
+    # A copy, so responses being serialized never see a later read's updates
+    return json.loads(json.dumps(_metrics_reader.read()))
+
+def render_prometheus(metrics):
+    """Render counters, gauges and the latency summary in the Prometheus text format."""
+    lines = []
+    append_metric(lines, "llm_switcher_requests_total", "counter", "LLM requests sent, by provider.", [
+        ('{provider="openai"}', metrics.get("openai_requests", 0)),
+        ('{provider="anthropic"}', metrics.get("anthropic_requests", 0)),
+    ])
+    append_metric(lines, "llm_switcher_errors_total", "counter", "LLM requests that failed.", [
+        ("", metrics.get("errors", 0)),
+    ])
+    append_metric(lines, "llm_switcher_latency_seconds_total", "counter", "Cumulative request latency, by provider.", [
+        ('{provider="openai"}', metrics.get("openai_latency_ms", 0) / 1000),
+        ('{provider="anthropic"}', metrics.get("anthropic_latency_ms", 0) / 1000),
+    ])
+    append_metric(lines, "llm_switcher_last_request_timestamp_seconds", "gauge", "Unix time of the most recent request.", [
+        ("", timestamp_seconds(metrics.get("last_request_time"))),
+    ])
+    append_summary(lines, "llm_switcher_request_latency_seconds", "Request latency; quantiles over the last 100 requests.",
+                   [(entry.get("latency_ms") or 0) / 1000 for entry in metrics.get("requests", [])],
+                   metrics.get("total_latency_ms", 0) / 1000, metrics.get("total_requests", 0))
+    return "\n".join(lines) + "\n"
+
+# Scrapes reuse the rendered text until the metrics change
+_metrics_cache = MetricsCache(_reader_version, _reader_metrics, render_prometheus)
 
 @app.route('/')
 def dashboard():
@@ -290,6 +308,11 @@ def get_metrics():
     response.headers['Expires'] = '0'
     return response
 
+@app.route('/metrics/prometheus')
+def prometheus_metrics():
+    """Prometheus text-format exposition of the cached metrics."""
+    return Response(_metrics_cache.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     print("Starting LLM Switcher Dashboard on http://localhost:5000")
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -1,77 +1,28 @@
 # filename: llm_switcher.py
 import os
 import argparse
-import json
 import time
-from datetime import datetime
 from openai import OpenAI
 from anthropic import Anthropic
+import metrics_log
+import metrics_db
 
-METRICS_FILE = "metrics.json"
+METRICS_FILE = metrics_log.METRICS_FILE
+# "jsonl": metrics.json snapshot + event log (metrics_log); "sqlite": metrics_db
+METRICS_BACKEND = os.getenv("METRICS_BACKEND", "jsonl")
+metrics_store = metrics_db if METRICS_BACKEND == "sqlite" else metrics_log
 
 def load_metrics():
-    """Load metrics from JSON file."""
-    if os.path.exists(METRICS_FILE):
-        try:
-            with open(METRICS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {
-                "total_requests": 0,
-                "openai_requests": 0,
-                "anthropic_requests": 0,
-                "total_latency_ms": 0,
-                "openai_latency_ms": 0,
-                "anthropic_latency_ms": 0,
-                "errors": 0,
-                "last_request_time": None,
-                "requests": []
-            }
-    return {
-        "total_requests": 0,
-        "openai_requests": 0,
-        "anthropic_requests": 0,
-        "total_latency_ms": 0,
-        "openai_latency_ms": 0,
-        "anthropic_latency_ms": 0,
-        "errors": 0,
-        "last_request_time": None,
-        "requests": []
-    }
+    """Load metrics from the configured backend."""
+    return metrics_store.load_metrics()
 
 def save_metrics(metrics):
-    """Save metrics to JSON file."""
-    with open(METRICS_FILE, 'w') as f:
-        json.dump(metrics, f, indent=2)
+    """Save metrics, replacing what the backend holds."""
+    metrics_store.save_metrics(metrics)
 
 def update_metrics(provider, latency_ms, success=True):
-    """Update metrics with new request data."""
-    metrics = load_metrics()
-    metrics["total_requests"] += 1
-    metrics["total_latency_ms"] += latency_ms
-    metrics["last_request_time"] = datetime.now().isoformat()
-    
-    if provider == "openai":
-        metrics["openai_requests"] += 1
-        metrics["openai_latency_ms"] += latency_ms
-    elif provider == "anthropic":
-        metrics["anthropic_requests"] += 1
-        metrics["anthropic_latency_ms"] += latency_ms
-    
-    if not success:
-        metrics["errors"] += 1
-    
-    # Keep last 100 requests
-    metrics["requests"].append({
-        "provider": provider,
-        "latency_ms": latency_ms,
-        "success": success,
-        "timestamp": datetime.now().isoformat()
-    })
-    if len(metrics["requests"]) > 100:
-        metrics["requests"] = metrics["requests"][-100:]
-    
-    save_metrics(metrics)
+    """Update metrics with new request data (one appended event; see metrics_log / metrics_db)."""
+    metrics_store.append_event(provider, latency_ms, success=success)
 
 def generate_text_openai(prompt: str, api_key: str, model: str = "gpt-3.5-turbo") -> str:
     """Generates text using OpenAI's API."""
@@ -0,0 +1,168 @@
+# filename: metrics_db.py
+"""
+SQLite metrics backend (METRICS_BACKEND=sqlite).
+
+Every request is one row in `requests`, indexed by provider and by time. An insert
+trigger keeps `provider_totals` up to date in the same transaction, so the dashboard
+answers from a handful of aggregate rows plus the newest 100 requests by primary key:
+constant work however many requests have been recorded. The database runs in WAL
+mode, so any number of processes can write while the dashboard reads.
+
+Same interface as metrics_log: load_metrics, save_metrics, append_event, MetricsReader.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from metrics_log import RECENT_REQUESTS, empty_metrics
+
+DB_FILE = os.getenv("METRICS_DB", "metrics.sqlite3")
+BUSY_TIMEOUT_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY,
+    provider TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    success INTEGER NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_by_provider ON requests (provider, id);
+CREATE INDEX IF NOT EXISTS requests_by_time ON requests (timestamp);
+
+CREATE TABLE IF NOT EXISTS provider_totals (
+    provider TEXT PRIMARY KEY,
+    requests INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    errors INTEGER NOT NULL,
+    last_request_time TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS requests_update_totals AFTER INSERT ON requests
+BEGIN
+    INSERT INTO provider_totals (provider, requests, latency_ms, errors, last_request_time)
+    VALUES (NEW.provider, 1, NEW.latency_ms, NEW.success = 0, NEW.timestamp)
+    ON CONFLICT (provider) DO UPDATE SET
+        requests = requests + 1,
+        latency_ms = latency_ms + excluded.latency_ms,
+        errors = errors + excluded.errors,
+        last_request_time = max(coalesce(last_request_time, ''), excluded.last_request_time);
+END;
+"""
+
+_local = threading.local()
+
+def connect(path=None):
+    """A new connection with WAL enabled and the schema in place."""
+    connection = sqlite3.connect(path or DB_FILE, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+                                 check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+def _connection():
+    # One connection per thread and process (a forked child must not reuse its parent's)
+    key = (os.getpid(), DB_FILE)
+    if getattr(_local, "key", None) != key:
+        _local.connection = connect()
+        _local.key = key
+    return _local.connection
+
+def append_event(provider, latency_ms, success=True):
+    """Record one request; the trigger updates the aggregates in the same transaction."""
+    event = {
+        "provider": provider,
+        "latency_ms": latency_ms,
+        "success": success,
+        "timestamp": datetime.now().isoformat()
+    }
+    _connection().execute(
+        "INSERT INTO requests (provider, latency_ms, success, timestamp) VALUES (?, ?, ?, ?)",
+        (provider, latency_ms, int(success), event["timestamp"]),
+    )
+    return event
+
+def _read_metrics(connection):
+    """Metrics dict from the aggregate rows and the newest RECENT_REQUESTS requests."""
+    metrics = empty_metrics()
+    connection.execute("BEGIN")  # One consistent read snapshot across both queries
+    try:
+        totals = connection.execute(
+            "SELECT provider, requests, latency_ms, errors, last_request_time FROM provider_totals").fetchall()
+        recent = connection.execute(
+            "SELECT provider, latency_ms, success, timestamp FROM requests ORDER BY id DESC LIMIT ?",
+            (RECENT_REQUESTS,)).fetchall()
+    finally:
+        connection.execute("COMMIT")
+    for provider, requests, latency_ms, errors, last_request_time in totals:
+        metrics["total_requests"] += requests
+        metrics["total_latency_ms"] += latency_ms
+        metrics["errors"] += errors
+        if provider in ("openai", "anthropic"):
+            metrics[f"{provider}_requests"] = requests
+            metrics[f"{provider}_latency_ms"] = latency_ms
+        if last_request_time and (metrics["last_request_time"] or "") < last_request_time:
+            metrics["last_request_time"] = last_request_time
+    metrics["requests"] = [
+        {"provider": provider, "latency_ms": latency_ms, "success": bool(success), "timestamp": timestamp}
+        for provider, latency_ms, success, timestamp in reversed(recent)
+    ]
+    return metrics
+
+def load_metrics():
+    """Current metrics, from the aggregate table (constant time)."""
+    return _read_metrics(_connection())
+
+def save_metrics(metrics):
+    """Replace the stored metrics with `metrics` (its totals and recent requests)."""
+    connection = _connection()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute("DELETE FROM requests")
+        connection.executemany(
+            "INSERT INTO requests (provider, latency_ms, success, timestamp) VALUES (?, ?, ?, ?)",
+            [(r["provider"], r["latency_ms"], int(r["success"]), r["timestamp"]) for r in metrics.get("requests", [])],
+        )
+        # The trigger counted only the recent requests; the totals come from the dict
+        connection.execute("DELETE FROM provider_totals")
+        for provider in ("openai", "anthropic"):
+            connection.execute(
+                "INSERT INTO provider_totals (provider, requests, latency_ms, errors, last_request_time) VALUES (?, ?, ?, 0, ?)",
+                (provider, metrics.get(f"{provider}_requests", 0), metrics.get(f"{provider}_latency_ms", 0),
+                 metrics.get("last_request_time")),
+            )
+        # Errors aren't split by provider in the dict; keep them on one row so the sum is right
+        connection.execute("UPDATE provider_totals SET errors = ? WHERE provider = 'openai'", (metrics.get("errors", 0),))
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+class MetricsReader:
+    """
+    Dashboard-side reader with the same interface as metrics_log.MetricsReader.
+    PRAGMA data_version tells it whether any other connection has committed since
+    the last read; if not, the previous result is returned without querying.
+    Not thread-safe; callers serialize read() themselves.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._key = None
+        self._data_version = None
+        self._metrics = None
+        self.version = 0
+
+    def read(self):
+        if self._key != (os.getpid(), DB_FILE):
+            self._connection = connect()
+            self._key = (os.getpid(), DB_FILE)
+            self._data_version = None
+        data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version or self._metrics is None:
+            self._metrics = _read_metrics(self._connection)
+            self._data_version = data_version
+            self.version += 1
+        return self._metrics
@@ -0,0 +1,299 @@
+# filename: metrics_log.py
+"""
+Append-only metrics storage: a JSONL event log compacted into a snapshot.
+
+update_metrics used to load, modify and rewrite all of metrics.json on every request,
+which costs O(file) per call and loses updates when processes race. Now each request
+appends one line to metrics.events.jsonl; once the log passes COMPACT_AFTER_BYTES its
+events are folded into metrics.json and a fresh log is started. Readers take the
+snapshot and replay the log tail after it.
+
+Every log starts with a header line holding a random generation id. The snapshot
+records which log (by generation) and how many bytes of it it already includes, so a
+crash at any point of a compaction never double-counts or loses events. Inode numbers
+would not do: a recreated log can reuse the inode of the one it replaced.
+Processes coordinate through flock on metrics.lock: appends and reads share it,
+compaction takes it exclusively.
+"""
+import os
+import json
+import uuid
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_FILE = "metrics.json"
+EVENTS_FILE = "metrics.events.jsonl"
+LOCK_FILE = "metrics.lock"
+COMPACT_AFTER_BYTES = int(os.getenv("METRICS_COMPACT_AFTER_BYTES", str(256 * 1024)))
+RECENT_REQUESTS = 100
+
+def empty_metrics():
+    return {
+        "total_requests": 0,
+        "openai_requests": 0,
+        "anthropic_requests": 0,
+        "total_latency_ms": 0,
+        "openai_latency_ms": 0,
+        "anthropic_latency_ms": 0,
+        "errors": 0,
+        "last_request_time": None,
+        "requests": []
+    }
+
+def apply_event(metrics, event):
+    """Fold one request event into the metrics dict (in place)."""
+    provider = event["provider"]
+    latency_ms = event["latency_ms"]
+    metrics["total_requests"] += 1
+    metrics["total_latency_ms"] += latency_ms
+    metrics["last_request_time"] = event["timestamp"]
+    if provider == "openai":
+        metrics["openai_requests"] += 1
+        metrics["openai_latency_ms"] += latency_ms
+    elif provider == "anthropic":
+        metrics["anthropic_requests"] += 1
+        metrics["anthropic_latency_ms"] += latency_ms
+    if not event["success"]:
+        metrics["errors"] += 1
+    # Keep last 100 requests
+    metrics["requests"].append(event)
+    if len(metrics["requests"]) > RECENT_REQUESTS:
+        del metrics["requests"][:-RECENT_REQUESTS]
+
+@contextmanager
+def _locked(exclusive=False):
+    with open(LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _read_snapshot():
+    """
+    (metrics, log position) from metrics.json, or (None, None) if there is no snapshot.
+    The position is None for a snapshot written without one (see _adopt_snapshot) and
+    {} for an unreadable one, whose metrics are then rebuilt from the whole log.
+    """
+    try:
+        with open(METRICS_FILE, "r") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None, None
+    except ValueError:
+        return empty_metrics(), {}
+    position = snapshot.pop("_log", None)
+    metrics = empty_metrics()
+    metrics.update(snapshot)
+    return metrics, position
+
+def _write_snapshot(metrics, log_generation, log_offset):
+    snapshot = dict(metrics, _log={"generation": log_generation, "offset": log_offset})
+    tmp_path = f"{METRICS_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(tmp_path, METRICS_FILE)
+
+def _read_generation(f):
+    """(generation id, header length) of an open log; (None, 0) for a log without a header."""
+    f.seek(0)
+    line = f.readline()
+    if line.endswith(b"\n"):
+        try:
+            header = json.loads(line)
+        except ValueError:
+            header = None
+        if isinstance(header, dict) and "generation" in header:
+            return header["generation"], len(line)
+    return None, 0
+
+def _log_position():
+    """(generation, size) of the current log, or (None, 0) if there is none."""
+    try:
+        with open(EVENTS_FILE, "rb") as f:
+            generation, _ = _read_generation(f)
+            return generation, os.fstat(f.fileno()).st_size
+    except FileNotFoundError:
+        return None, 0
+
+def _new_log(path):
+    """Write an empty log with a fresh generation header; returns (generation, header length)."""
+    generation = uuid.uuid4().hex
+    header = (json.dumps({"generation": generation}) + "\n").encode()
+    with open(path, "wb") as f:
+        f.write(header)
+    return generation, len(header)
+
+def _create_log():
+    # Exclusive, so appenders (which hold the shared lock) never see a log without its header
+    with _locked(exclusive=True):
+        if not os.path.exists(EVENTS_FILE):
+            tmp_path = f"{EVENTS_FILE}.tmp"
+            _new_log(tmp_path)
+            os.replace(tmp_path, EVENTS_FILE)
+
+def _read_events(f, offset):
+    """Events from byte `offset` of an open log; a partially written last line is left for later."""
+    f.seek(offset)
+    events = []
+    for line in f:
+        if not line.endswith(b"\n"):
+            break
+        offset += len(line)
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue  # A corrupt line shouldn't hide every later event
+    return events, offset
+
+def _adopt_snapshot():
+    """
+    Pin a metrics.json that has no log position to the current end of the log. Such a
+    file was written by something other than this module (start.sh, a hand edit, a
+    version before the log) to set the metrics outright, so events already logged are
+    superseded by it, as with save_metrics().
+    """
+    with _locked(exclusive=True):
+        metrics, position = _read_snapshot()
+        if metrics is not None and position is None:
+            generation, size = _log_position()
+            _write_snapshot(metrics, generation, size)
+
+def _start_offset(position, generation, header_end):
+    # The snapshot already includes `offset` bytes of the log it names; any other log is all new
+    if position and position.get("generation") == generation:
+        return max(position["offset"], header_end)
+    return header_end
+
+class MetricsReader:
+    """
+    Incremental reader: remembers the snapshot it parsed and how far into the log it
+    has replayed, so each read() only parses events appended since the last one.
+    Not thread-safe; callers serialize read() themselves.
+    """
+
+    def __init__(self):
+        self._snapshot_key = None
+        self._position = None
+        self._log_generation = None
+        self._log_offset = None
+        self._metrics = None
+        self.version = 0  # Bumped whenever read() returns changed metrics
+
+    def read(self):
+        while True:
+            metrics = self._read()
+            if metrics is not None:
+                return metrics
+            _adopt_snapshot()
+
+    def _read(self):
+        """Current metrics, or None if the snapshot must be adopted first."""
+        with _locked():
+            try:
+                stat = os.stat(METRICS_FILE)
+                snapshot_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                snapshot_key = None
+            if snapshot_key is None:
+                # No snapshot means no metrics: the log only counts relative to one
+                if self._metrics is None or self._snapshot_key is not None:
+                    self._snapshot_key = None
+                    self._metrics = empty_metrics()
+                    self.version += 1
+                return self._metrics
+            if snapshot_key != self._snapshot_key:
+                metrics, position = _read_snapshot()
+                if position is None:
+                    return None
+                self._metrics, self._position = metrics, position
+                self._snapshot_key = snapshot_key
+                self._log_offset = None
+                self.version += 1
+            try:
+                with open(EVENTS_FILE, "rb") as f:
+                    generation, header_end = _read_generation(f)
+                    if self._log_offset is None or generation != self._log_generation:
+                        self._log_generation = generation
+                        self._log_offset = _start_offset(self._position, generation, header_end)
+                    events, self._log_offset = _read_events(f, self._log_offset)
+            except FileNotFoundError:
+                events = []
+            for event in events:
+                apply_event(self._metrics, event)
+            if events:
+                self.version += 1
+            return self._metrics
+
+def load_metrics():
+    """Current metrics: the snapshot plus every event logged after it."""
+    return MetricsReader().read()
+
+def save_metrics(metrics):
+    """Replace the stored metrics with `metrics`; events already in the log are superseded."""
+    with _locked(exclusive=True):
+        generation, size = _log_position()
+        _write_snapshot(metrics, generation, size)
+
+def append_event(provider, latency_ms, success=True):
+    """Log one request; compacts the log into the snapshot once it is big enough."""
+    event = {
+        "provider": provider,
+        "latency_ms": latency_ms,
+        "success": success,
+        "timestamp": datetime.now().isoformat()
+    }
+    if not os.path.exists(METRICS_FILE):
+        # Start (or restart after a reset) from an empty snapshot that skips any stale log
+        with _locked(exclusive=True):
+            if not os.path.exists(METRICS_FILE):
+                generation, size = _log_position()
+                _write_snapshot(empty_metrics(), generation, size)
+    line = (json.dumps(event) + "\n").encode()
+    while True:
+        with _locked():
+            try:
+                # O_APPEND: concurrent writers each land their whole line at the end
+                fd = os.open(EVENTS_FILE, os.O_WRONLY | os.O_APPEND)
+            except FileNotFoundError:
+                fd = None
+            if fd is not None:
+                try:
+                    os.write(fd, line)
+                    size = os.fstat(fd).st_size
+                finally:
+                    os.close(fd)
+                break
+        _create_log()
+    if size >= COMPACT_AFTER_BYTES:
+        compact()
+    return event
+
+def compact():
+    """Fold the log into the snapshot and start a new log."""
+    with _locked(exclusive=True):
+        metrics, position = _read_snapshot()
+        if metrics is None:
+            metrics = empty_metrics()
+        elif position is None:
+            # A snapshot without a position supersedes everything logged before it
+            generation, size = _log_position()
+            position = {"generation": generation, "offset": size}
+        try:
+            with open(EVENTS_FILE, "rb") as f:
+                generation, header_end = _read_generation(f)
+                events, offset = _read_events(f, _start_offset(position, generation, header_end))
+        except FileNotFoundError:
+            return
+        if not events and offset == header_end:
+            return
+        for event in events:
+            apply_event(metrics, event)
+        # 1. Snapshot now covers `offset` bytes of this log; 2. swap in an empty log.
+        # A crash between the two leaves a snapshot that skips exactly what it folded.
+        _write_snapshot(metrics, generation, offset)
+        tmp_path = f"{EVENTS_FILE}.tmp"
+        new_generation, new_header_end = _new_log(tmp_path)
+        os.replace(tmp_path, EVENTS_FILE)
+        _write_snapshot(metrics, new_generation, new_header_end)
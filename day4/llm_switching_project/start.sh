@@ -35,9 +35,10 @@ source venv/bin/activate
 # Check for duplicate services
 check_duplicate_services
 
-# Initialize metrics file if it doesn't exist
+# Initialize metrics file if it doesn't exist (through metrics_log, so a leftover
+# metrics.events.jsonl from before a reset isn't counted again)
 if [ ! -f "metrics.json" ]; then
-    echo '{"total_requests": 0, "openai_requests": 0, "anthropic_requests": 0, "total_latency_ms": 0, "openai_latency_ms": 0, "anthropic_latency_ms": 0, "errors": 0, "last_request_time": null, "requests": []}' > metrics.json
+    python -c "import metrics_log; metrics_log.save_metrics(metrics_log.empty_metrics())"
 fi
 
 # Start dashboard in background
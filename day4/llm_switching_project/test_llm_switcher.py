@@ -3,8 +3,12 @@ import unittest
 import os
 import json
 import sys
+import tempfile
+import multiprocessing
 from unittest.mock import patch, MagicMock
 import llm_switcher
+import metrics_log
+import metrics_db
 
 class TestLLMSwitcher(unittest.TestCase):
     
@@ -107,5 +111,164 @@ class TestLLMSwitcher(unittest.TestCase):
         metrics = llm_switcher.load_metrics()
         self.assertEqual(metrics["errors"], 1)
 
+def _append_events(count):
+    for i in range(count):
+        metrics_log.append_event("openai" if i % 2 else "anthropic", 10.0, success=i % 5 != 0)
+
+class TestMetricsLog(unittest.TestCase):
+
+    def setUp(self):
+        """Work in a scratch directory with a small compaction threshold."""
+        self.original_cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.original_threshold = metrics_log.COMPACT_AFTER_BYTES
+        metrics_log.COMPACT_AFTER_BYTES = 2000
+
+    def tearDown(self):
+        metrics_log.COMPACT_AFTER_BYTES = self.original_threshold
+        os.chdir(self.original_cwd)
+        self.tmp.cleanup()
+
+    def test_events_are_compacted_into_snapshot(self):
+        """Test that the log is folded into metrics.json once it passes the threshold."""
+        _append_events(50)
+        metrics = metrics_log.load_metrics()
+        self.assertEqual(metrics["total_requests"], 50)
+        self.assertEqual(metrics["anthropic_requests"], 25)
+        self.assertEqual(metrics["errors"], 10)
+        self.assertLess(os.path.getsize(metrics_log.EVENTS_FILE), 2000)
+        with open(metrics_log.METRICS_FILE) as f:
+            self.assertGreater(json.load(f)["total_requests"], 0)
+
+    def test_concurrent_processes_lose_no_events(self):
+        """Test that appends from several processes, with compactions in between, are all counted."""
+        processes = [multiprocessing.get_context("fork").Process(target=_append_events, args=(100,)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        metrics = metrics_log.load_metrics()
+        self.assertEqual(metrics["total_requests"], 400)
+        self.assertEqual(metrics["errors"], 80)
+        self.assertEqual(len(metrics["requests"]), 100)
+
+    def test_crash_between_snapshot_and_log_swap_does_not_double_count(self):
+        """Test that a snapshot covering part of the still-present log skips exactly that part."""
+        metrics_log.COMPACT_AFTER_BYTES = 10 ** 9
+        _append_events(10)
+        folded = metrics_log.load_metrics()
+        generation, size = metrics_log._log_position()
+        # Step 1 of a compaction happened, step 2 (new log) never did
+        metrics_log._write_snapshot(folded, generation, size)
+        _append_events(3)
+        self.assertEqual(metrics_log.load_metrics()["total_requests"], 13)
+
+    def test_recreated_log_with_same_inode_is_read_from_the_start(self):
+        """Test that a new log reusing the old log's inode isn't skipped by the snapshot's offset."""
+        metrics_log.COMPACT_AFTER_BYTES = 10 ** 9
+        _append_events(10)
+        reader = metrics_log.MetricsReader()
+        metrics_log.save_metrics(reader.read())
+        inode = os.stat(metrics_log.EVENTS_FILE).st_ino
+        # Rewritten in place, so the recreated log keeps the inode the snapshot was pinned to
+        metrics_log._new_log(metrics_log.EVENTS_FILE)
+        self.assertEqual(os.stat(metrics_log.EVENTS_FILE).st_ino, inode)
+        _append_events(3)
+        self.assertEqual(metrics_log.load_metrics()["total_requests"], 13)
+        self.assertEqual(reader.read()["total_requests"], 13)
+
+    def test_snapshot_without_log_position_resets_metrics(self):
+        """Test that a metrics.json written outside metrics_log (start.sh after a reset) doesn't replay the old log."""
+        metrics_log.COMPACT_AFTER_BYTES = 10 ** 9
+        _append_events(5)
+        reader = metrics_log.MetricsReader()
+        self.assertEqual(reader.read()["total_requests"], 5)
+        os.remove(metrics_log.METRICS_FILE)
+        with open(metrics_log.METRICS_FILE, "w") as f:
+            json.dump(metrics_log.empty_metrics(), f)
+        self.assertEqual(metrics_log.load_metrics()["total_requests"], 0)
+        self.assertEqual(reader.read()["total_requests"], 0)
+        _append_events(2)
+        self.assertEqual(metrics_log.load_metrics()["total_requests"], 2)
+        metrics_log.compact()
+        self.assertEqual(reader.read()["total_requests"], 2)
+
+    def test_reader_replays_only_new_events(self):
+        """Test that an incremental reader picks up appends and compactions."""
+        reader = metrics_log.MetricsReader()
+        _append_events(5)
+        self.assertEqual(reader.read()["total_requests"], 5)
+        version = reader.version
+        self.assertEqual(reader.read()["total_requests"], 5)
+        self.assertEqual(reader.version, version)
+        _append_events(60)
+        self.assertEqual(reader.read()["total_requests"], 65)
+
+def _append_db_events(path, count):
+    metrics_db.DB_FILE = path
+    for i in range(count):
+        metrics_db.append_event("openai" if i % 2 else "anthropic", 10.0, success=i % 5 != 0)
+
+class TestMetricsDB(unittest.TestCase):
+
+    def setUp(self):
+        """Point the SQLite backend at a scratch database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original_db = metrics_db.DB_FILE
+        metrics_db.DB_FILE = os.path.join(self.tmp.name, "metrics.sqlite3")
+
+    def tearDown(self):
+        metrics_db.DB_FILE = self.original_db
+        self.tmp.cleanup()
+
+    def test_aggregates_follow_inserts(self):
+        """Test that the trigger-maintained totals match the recorded requests."""
+        _append_db_events(metrics_db.DB_FILE, 250)
+        metrics = metrics_db.load_metrics()
+        self.assertEqual(metrics["total_requests"], 250)
+        self.assertEqual(metrics["openai_requests"], 125)
+        self.assertEqual(metrics["anthropic_latency_ms"], 1250.0)
+        self.assertEqual(metrics["errors"], 50)
+        self.assertEqual(len(metrics["requests"]), 100)
+        self.assertEqual(metrics["last_request_time"], metrics["requests"][-1]["timestamp"])
+
+    def test_concurrent_processes_lose_no_rows(self):
+        """Test that several writer processes share the WAL database safely."""
+        processes = [multiprocessing.get_context("fork").Process(target=_append_db_events, args=(metrics_db.DB_FILE, 100))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        metrics = metrics_db.load_metrics()
+        self.assertEqual(metrics["total_requests"], 400)
+        self.assertEqual(metrics["errors"], 80)
+        connection = metrics_db.connect()
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(connection.execute("SELECT count(*) FROM requests").fetchone()[0], 400)
+
+    def test_save_and_load_round_trip(self):
+        """Test that saved totals are what load_metrics reports."""
+        metrics_db.save_metrics({
+            "total_requests": 5, "openai_requests": 3, "anthropic_requests": 2,
+            "total_latency_ms": 1000, "openai_latency_ms": 600, "anthropic_latency_ms": 400,
+            "errors": 1, "last_request_time": None, "requests": []
+        })
+        loaded = metrics_db.load_metrics()
+        self.assertEqual((loaded["total_requests"], loaded["openai_requests"], loaded["errors"]), (5, 3, 1))
+        self.assertEqual(loaded["total_latency_ms"], 1000)
+
+    def test_reader_requeries_only_after_commits(self):
+        """Test that the dashboard reader reuses its result until another connection writes."""
+        reader = metrics_db.MetricsReader()
+        self.assertEqual(reader.read()["total_requests"], 0)
+        version = reader.version
+        reader.read()
+        self.assertEqual(reader.version, version)
+        metrics_db.append_event("openai", 42.0)
+        self.assertEqual(reader.read()["total_requests"], 1)
+        self.assertEqual(reader.version, version + 1)
+
 if __name__ == '__main__':
     unittest.main()
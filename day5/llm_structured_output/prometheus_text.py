@@ -0,0 +1,93 @@
+# prometheus_text.py
+"""
+Prometheus text-format (0.0.4) exposition helpers for dashboard.py.
+Each day ships as its own container, so every dashboard project carries an identical
+copy of this module. The dashboard keeps its own render function; this module caches
+the parsed metrics and the rendered body, and formats metric families.
+"""
+import os
+import threading
+from datetime import datetime
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+def file_version(path):
+    """Change key for a metrics file: its mtime and size, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class MetricsCache:
+    """
+    Parsed metrics and their rendered exposition, reloaded only when version() changes.
+    The metrics and the body rendered from them are read, replaced and cached under one
+    lock, so a scrape never caches a body rendered from older metrics than the cache holds.
+    """
+
+    def __init__(self, version, load, render):
+        self._version = version
+        self._load = load
+        self._render = render
+        self._lock = threading.Lock()
+        self._key = None
+        self._metrics = None
+        self._body = None
+
+    def _refresh(self):
+        # Caller must hold self._lock
+        key = self._version()
+        if self._metrics is None or key != self._key:
+            self._key = key
+            self._metrics = self._load()
+            self._body = None
+
+    def metrics(self):
+        """Current metrics, reloaded if they changed since the last call."""
+        with self._lock:
+            self._refresh()
+            return self._metrics
+
+    def prometheus(self):
+        """Current metrics rendered in the Prometheus text format."""
+        with self._lock:
+            self._refresh()
+            if self._body is None:
+                self._body = self._render(self._metrics)
+            return self._body
+
+def prometheus_value(value):
+    if isinstance(value, bool) or value is None:
+        value = int(bool(value))
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+def append_metric(lines, name, metric_type, help_text, samples):
+    """Append one metric family; samples are (labels, value) pairs, labels like '{type="pdf"}' or ''."""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        lines.append(f"{name}{labels} {prometheus_value(value)}")
+
+def append_summary(lines, name, help_text, recent_seconds, total_seconds, count):
+    """
+    Latency summary: _sum and _count are the stored all-time totals, the quantiles cover
+    only the recent requests kept in metrics.json (a sliding window, as client libraries do).
+    """
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} summary")
+    ordered = sorted(recent_seconds)
+    if ordered:
+        for quantile in LATENCY_QUANTILES:
+            value = ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+            lines.append(f'{name}{{quantile="{quantile}"}} {prometheus_value(value)}')
+    lines.append(f"{name}_sum {prometheus_value(total_seconds)}")
+    lines.append(f"{name}_count {prometheus_value(count)}")
+
+def timestamp_seconds(iso_time):
+    """Unix time of an ISO-8601 timestamp, or 0 if it is missing or malformed."""
+    try:
+        return datetime.fromisoformat(iso_time).timestamp()
+    except (TypeError, ValueError):
+        return 0
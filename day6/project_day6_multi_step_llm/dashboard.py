@@ -1,7 +1,8 @@
 import json
 import os
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string
 from flask_cors import CORS
+from prometheus_text import PROMETHEUS_CONTENT_TYPE, MetricsCache, append_metric, append_summary, file_version, timestamp_seconds
 
 app = Flask(__name__)
 CORS(app)
@@ -302,6 +303,34 @@ def load_metrics():
         "requests": []
     }
 
+# --- Prometheus exposition ---
+def render_prometheus(metrics):
+    """Render counters, gauges and the latency summary in the Prometheus text format."""
+    lines = []
+    append_metric(lines, "multi_step_requests_total", "counter", "Articles sent through the pipeline.", [
+        ("", metrics.get("total_requests", 0)),
+    ])
+    append_metric(lines, "multi_step_processing_total", "counter", "Pipeline runs by result.", [
+        ('{result="success"}', metrics.get("successful_processing", 0)),
+        ('{result="failure"}', metrics.get("failed_processing", 0)),
+    ])
+    append_metric(lines, "multi_step_steps_completed_total", "counter", "Completed pipeline steps, by step.", [
+        ('{step="summary"}', metrics.get("step1_summaries", 0)),
+        ('{step="rewrite"}', metrics.get("step2_rewrites", 0)),
+        ('{step="keywords"}', metrics.get("step3_keywords", 0)),
+    ])
+    append_metric(lines, "multi_step_last_request_timestamp_seconds", "gauge", "Unix time of the most recent request.", [
+        ("", timestamp_seconds(metrics.get("last_request_time"))),
+    ])
+    append_summary(lines, "multi_step_request_latency_seconds", "End-to-end pipeline latency; quantiles over the last 100 requests.",
+                   [(entry.get("latency_ms") or 0) / 1000 for entry in metrics.get("requests", [])],
+                   metrics.get("total_latency_ms", 0) / 1000, metrics.get("total_requests", 0))
+    return "\n".join(lines) + "\n"
+
+# Scrapes are answered from metrics.json as parsed on its last change: the file is only
+# re-read when its mtime or size differs, and the rendered text is reused until then
+_metrics_cache = MetricsCache(lambda: file_version(METRICS_FILE), load_metrics, render_prometheus)
+
 @app.route('/')
 def dashboard():
     """Serve the dashboard HTML."""
@@ -326,6 +355,11 @@ def update_metrics():
     """API endpoint to trigger metrics refresh (for compatibility)."""
     return jsonify({"status": "ok"})
 
+@app.route('/metrics/prometheus')
+def prometheus_metrics():
+    """Prometheus text-format exposition of the cached metrics."""
+    return Response(_metrics_cache.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     print("Starting Multi-Step LLM Article Processor Dashboard on http://localhost:5000")
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -1,8 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import os
+import threading
 
 app = Flask(__name__)
 chat_histories = {} # Store history: {session_id: ["User: msg1", "AI: resp1", ...]}
+# Counters for /metrics/prometheus; chat_histories only holds the current window
+counters = {"chat_requests": 0, "session_resets": 0}
+counters_lock = threading.Lock()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
 # In a real production system, this would be a more sophisticated LLM integration.
 # For this hands-on, we simulate to focus on memory management.
@@ -40,6 +46,8 @@ def chat():
     if not session_id:
         return jsonify({"error": "session_id is required"}), 400
 
+    with counters_lock:
+        counters["chat_requests"] += 1
     if session_id not in chat_histories:
         chat_histories[session_id] = []
 
@@ -71,6 +79,8 @@ def reset_session():
     session_id = request.json.get('session_id')
     if session_id in chat_histories:
         del chat_histories[session_id]
+        with counters_lock:
+            counters["session_resets"] += 1
         return jsonify({"message": f"Session {session_id} reset."})
     return jsonify({"message": f"Session {session_id} not found."}), 404
 
@@ -87,6 +97,24 @@ def metrics():
     })
 
 
+@app.route('/metrics/prometheus', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text-format exposition of the in-memory session state."""
+    with counters_lock:
+        snapshot = dict(counters)
+    lines = []
+    for name, metric_type, help_text, value in (
+        ("memory_chat_requests_total", "counter", "Chat requests handled.", snapshot["chat_requests"]),
+        ("memory_session_resets_total", "counter", "Sessions reset through /reset.", snapshot["session_resets"]),
+        ("memory_active_sessions", "gauge", "Sessions with stored history.", len(chat_histories)),
+        ("memory_messages", "gauge", "Messages held across all session windows.", sum(len(h) for h in chat_histories.values())),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return Response("\n".join(lines) + "\n", content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.route('/dashboard', methods=['GET'])
 @app.route('/', methods=['GET'])
 def dashboard():
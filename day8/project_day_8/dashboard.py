@@ -1,7 +1,8 @@
 import json
 import os
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string
 from flask_cors import CORS
+from prometheus_text import PROMETHEUS_CONTENT_TYPE, MetricsCache, append_metric, append_summary, file_version, timestamp_seconds
 
 app = Flask(__name__)
 CORS(app)
@@ -253,6 +254,35 @@ def load_metrics():
         "requests": []
     }
 
+# --- Prometheus exposition ---
+def render_prometheus(metrics):
+    """Render counters, gauges and the latency summary in the Prometheus text format."""
+    lines = []
+    append_metric(lines, "reliable_parsing_requests_total", "counter", "Parsing requests processed.", [
+        ("", metrics.get("total_requests", 0)),
+    ])
+    append_metric(lines, "reliable_parsing_results_total", "counter", "Parsing attempts by final result.", [
+        ('{result="success"}', metrics.get("successful_parsing", 0)),
+        ('{result="failure"}', metrics.get("failed_parsing", 0)),
+    ])
+    append_metric(lines, "reliable_parsing_retry_attempts_total", "counter", "Retries issued after a failed parse.", [
+        ("", metrics.get("retry_attempts", 0)),
+    ])
+    append_metric(lines, "reliable_parsing_validation_errors_total", "counter", "Responses that failed schema validation.", [
+        ("", metrics.get("validation_errors", 0)),
+    ])
+    append_metric(lines, "reliable_parsing_last_request_timestamp_seconds", "gauge", "Unix time of the most recent request.", [
+        ("", timestamp_seconds(metrics.get("last_request_time"))),
+    ])
+    append_summary(lines, "reliable_parsing_request_latency_seconds", "Request latency; quantiles over the last 100 requests.",
+                   [(entry.get("latency_ms") or 0) / 1000 for entry in metrics.get("requests", [])],
+                   metrics.get("total_latency_ms", 0) / 1000, metrics.get("total_requests", 0))
+    return "\n".join(lines) + "\n"
+
+# Scrapes are answered from metrics.json as parsed on its last change: the file is only
+# re-read when its mtime or size differs, and the rendered text is reused until then
+_metrics_cache = MetricsCache(lambda: file_version(METRICS_FILE), load_metrics, render_prometheus)
+
 @app.route('/')
 def dashboard():
     """Serve the dashboard HTML."""
@@ -273,6 +303,11 @@ def update_metrics():
     """API endpoint to trigger metrics refresh."""
     return jsonify({"status": "ok"})
 
+@app.route('/metrics/prometheus')
+def prometheus_metrics():
+    """Prometheus text-format exposition of the cached metrics."""
+    return Response(_metrics_cache.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     print("Starting Reliable Output Parsing Dashboard on http://localhost:5000")
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -1,7 +1,8 @@
 import json
 import os
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string
 from flask_cors import CORS
+from prometheus_text import PROMETHEUS_CONTENT_TYPE, MetricsCache, append_metric, file_version, timestamp_seconds
 
 app = Flask(__name__)
 CORS(app)
@@ -143,6 +144,29 @@ def load_metrics():
         "requests": []
     }
 
+# --- Prometheus exposition ---
+def render_prometheus(metrics):
+    """Render counters and gauges in the Prometheus text format."""
+    lines = []
+    append_metric(lines, "cost_tracker_prompts_total", "counter", "Prompts sent.", [
+        ("", metrics.get("total_prompts", 0)),
+    ])
+    append_metric(lines, "cost_tracker_tokens_total", "counter", "Tokens used, by direction.", [
+        ('{direction="input"}', metrics.get("total_input_tokens", 0)),
+        ('{direction="output"}', metrics.get("total_output_tokens", 0)),
+    ])
+    append_metric(lines, "cost_tracker_estimated_cost_dollars_total", "counter", "Estimated spend in USD.", [
+        ("", metrics.get("total_estimated_cost", 0.0)),
+    ])
+    append_metric(lines, "cost_tracker_last_request_timestamp_seconds", "gauge", "Unix time of the most recent request.", [
+        ("", timestamp_seconds(metrics.get("last_request_time"))),
+    ])
+    return "\n".join(lines) + "\n"
+
+# Scrapes are answered from metrics.json as parsed on its last change: the file is only
+# re-read when its mtime or size differs, and the rendered text is reused until then
+_metrics_cache = MetricsCache(lambda: file_version(METRICS_FILE), load_metrics, render_prometheus)
+
 @app.route('/')
 def dashboard():
     return render_template_string(DASHBOARD_HTML)
@@ -160,6 +184,11 @@ def get_metrics():
 def update_metrics():
     return jsonify({"status": "ok"})
 
+@app.route('/metrics/prometheus')
+def prometheus_metrics():
+    """Prometheus text-format exposition of the cached metrics."""
+    return Response(_metrics_cache.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     print("Starting LLM Cost Tracker Dashboard on http://localhost:5000")
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,109 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import importlib.util
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_PROJECTS = [
+    "day4/llm_switching_project",
+    "day5/llm_structured_output",
+    "day6/project_day6_multi_step_llm",
+    "day8/project_day_8",
+    "day9/llm_cost_tracker",
+    "day10/langchain_chat_app",
+    "day11/rag_imperative_day11",
+    "day12/rag_document_loaders",
+]
+
+def _copy_project(project, destination):
+    """Copy what the project's container gets: the files its Dockerfile COPYs, else the whole directory."""
+    source = os.path.join(REPO_ROOT, project)
+    dockerfile = os.path.join(source, "Dockerfile")
+    copied = []
+    if os.path.exists(dockerfile):
+        with open(dockerfile) as f:
+            copied = [match.group(1) for match in re.finditer(r"^COPY\s+(\S+)\s+\S+\s*$", f.read(), re.M)]
+    if "." in copied or "dashboard.py" not in copied:
+        shutil.copytree(source, destination, ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+    else:
+        os.makedirs(destination)
+        for name in copied:
+            shutil.copy(os.path.join(source, name), destination)
+
+@pytest.mark.parametrize("project", DASHBOARD_PROJECTS)
+def test_dashboard_imports_from_its_own_directory(project, tmp_path):
+    """Test that each dashboard serves /metrics/prometheus with nothing but its own project on the path"""
+    pytest.importorskip("flask")
+    pytest.importorskip("flask_cors")
+    destination = tmp_path / "app"
+    _copy_project(project, destination)
+    script = ("import dashboard\n"
+              "response = dashboard.app.test_client().get('/metrics/prometheus')\n"
+              "assert response.status_code == 200, response.status_code\n"
+              "assert b'# TYPE' in response.data\n")
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    result = subprocess.run([sys.executable, "-c", script], cwd=destination, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+def test_prometheus_text_copies_are_identical():
+    """Test that the per-project copies of prometheus_text.py haven't drifted apart"""
+    contents = set()
+    for project in DASHBOARD_PROJECTS:
+        with open(os.path.join(REPO_ROOT, project, "prometheus_text.py")) as f:
+            contents.add(f.read())
+    assert len(contents) == 1
+
+def _load_prometheus_text():
+    path = os.path.join(REPO_ROOT, DASHBOARD_PROJECTS[0], "prometheus_text.py")
+    spec = importlib.util.spec_from_file_location("prometheus_text", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_prometheus_value_formats_bools_ints_and_floats():
+    """Test that bools and None become 1/0 and numbers keep their type"""
+    prometheus_text = _load_prometheus_text()
+    assert prometheus_text.prometheus_value(True) == "1"
+    assert prometheus_text.prometheus_value(False) == "0"
+    assert prometheus_text.prometheus_value(None) == "0"
+    assert prometheus_text.prometheus_value(3) == "3"
+    assert prometheus_text.prometheus_value(0.25) == "0.25"
+
+    lines = []
+    prometheus_text.append_metric(lines, "loader_healthy", "gauge", "Whether the loader is up.", [("", True)])
+    assert lines == ["# HELP loader_healthy Whether the loader is up.", "# TYPE loader_healthy gauge", "loader_healthy 1"]
+
+def test_metrics_cache_never_serves_a_body_older_than_its_metrics():
+    """Test that a reload between two scrapes is always reflected in the rendered body"""
+    prometheus_text = _load_prometheus_text()
+    state = {"version": 0}
+    renders = []
+
+    def render(metrics):
+        renders.append(metrics["version"])
+        return f"version {metrics['version']}\n"
+
+    cache = prometheus_text.MetricsCache(lambda: state["version"], lambda: dict(state), render)
+    assert cache.prometheus() == "version 0\n"
+    assert cache.prometheus() == "version 0\n"
+    assert renders == [0]
+
+    def scrape():
+        for _ in range(200):
+            cache.prometheus()
+
+    threads = [threading.Thread(target=scrape) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for version in range(1, 50):
+        state["version"] = version
+    for thread in threads:
+        thread.join()
+    assert cache.prometheus() == "version 49\n"
+    assert cache.metrics() == {"version": 49}